@@ -0,0 +1,386 @@
+"""
+analytics.py
+-------------------
+Graph analytics over the merged knowledge graph.
+
+Provides:
+- PageRank (power iteration on a SciPy sparse matrix)
+- Degree (in / out / total, counting parallel relations)
+- Betweenness (exact for small graphs, source-sampled for large ones)
+- Communities (Louvain for small graphs, sparse label propagation for large ones)
+- Connected components (scipy.sparse.csgraph)
+- Node roles from the event ontology (event / figure / place / date)
+- top_k(): ranked "key figures", "key events", ... for the UI
+
+Every result is cached per graph and invalidated when the graph changes
+(G.graph["version"], bumped by IncrementalGraph, plus node/edge counts).
+"""
+
+import threading
+import weakref
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import networkx as nx
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+
+
+# Above these sizes the exact / pure-Python algorithms are replaced
+BETWEENNESS_SAMPLES = 500
+LOUVAIN_MAX_NODES = 50000
+
+# Ontology domains / ranges → node roles (subject role, object role)
+PREDICATE_ROLES = {
+    "occurredIn": ("event", "place"),
+    "occurredOn": ("event", "date"),
+    "hasParticipant": ("event", "figure"),
+    "hasOutcome": ("event", "event"),
+    "relatedToEvent": ("event", "event"),
+    "followedBy": ("event", "event"),
+    "precededBy": ("event", "event"),
+    "practicedBy": (None, "figure"),
+    "originatedIn": (None, "place"),
+}
+
+
+# ------------------------------------------------------
+# Cache (per graph object, keyed by graph version)
+# ------------------------------------------------------
+_CACHE_LOCK = threading.Lock()
+_CACHE: "weakref.WeakKeyDictionary[nx.Graph, Dict]" = weakref.WeakKeyDictionary()
+
+
+def graph_version(G: nx.Graph) -> Tuple[int, int, int]:
+    return (G.graph.get("version", 0), G.number_of_nodes(), G.number_of_edges())
+
+
+def _cached(G: nx.Graph, name: str, params: tuple, compute: Callable[[], Any]) -> Any:
+    version = graph_version(G)
+    with _CACHE_LOCK:
+        entry = _CACHE.get(G)
+        if entry is None or entry["version"] != version:
+            entry = _CACHE[G] = {"version": version, "results": {}}
+        if (name, params) in entry["results"]:
+            return entry["results"][(name, params)]
+
+    result = compute()
+
+    with _CACHE_LOCK:
+        if _CACHE.get(G) is entry:
+            entry["results"][(name, params)] = result
+    return result
+
+
+def clear_cache():
+    with _CACHE_LOCK:
+        _CACHE.clear()
+
+
+# ------------------------------------------------------
+# Sparse adjacency
+# ------------------------------------------------------
+def graph_matrix(G: nx.Graph) -> Tuple[List[str], sparse.csr_matrix]:
+    """
+    (nodes, A) where A[i, j] = number of relations i → j.
+    """
+    def compute():
+        nodes = list(G.nodes())
+        index = {n: i for i, n in enumerate(nodes)}
+        rows = np.fromiter((index[u] for u, _ in G.edges()), dtype=np.int64)
+        cols = np.fromiter((index[v] for _, v in G.edges()), dtype=np.int64)
+        A = sparse.csr_matrix(
+            (np.ones(len(rows)), (rows, cols)),
+            shape=(len(nodes), len(nodes))
+        )
+        A.sum_duplicates()
+        return nodes, A
+
+    return _cached(G, "matrix", (), compute)
+
+
+# ------------------------------------------------------
+# Centrality
+# ------------------------------------------------------
+def pagerank(G: nx.Graph, alpha: float = 0.85, tol: float = 1e-8, max_iter: int = 100) -> Dict[str, float]:
+    """
+    PageRank by sparse power iteration (dangling mass spread uniformly).
+    """
+    def compute():
+        nodes, A = graph_matrix(G)
+        n = len(nodes)
+        if n == 0:
+            return {}
+
+        out = np.asarray(A.sum(axis=1)).ravel()
+        dangling = out == 0
+        inv_out = np.divide(1.0, out, out=np.zeros_like(out), where=~dangling)
+        AT = A.T.tocsr()
+
+        x = np.full(n, 1.0 / n)
+        for _ in range(max_iter):
+            x_new = alpha * (AT @ (x * inv_out))
+            x_new += (alpha * x[dangling].sum() + (1 - alpha)) / n
+            if np.abs(x_new - x).sum() < n * tol:
+                x = x_new
+                break
+            x = x_new
+
+        return dict(zip(nodes, (x / x.sum()).tolist()))
+
+    return _cached(G, "pagerank", (alpha, tol, max_iter), compute)
+
+
+def degree(G: nx.Graph) -> Dict[str, Dict[str, int]]:
+    """
+    {node: {"in", "out", "total"}} counting parallel relations.
+    """
+    def compute():
+        nodes, A = graph_matrix(G)
+        out = np.asarray(A.sum(axis=1)).ravel().astype(int)
+        inn = np.asarray(A.sum(axis=0)).ravel().astype(int)
+        return {
+            n: {"in": int(i), "out": int(o), "total": int(i + o)}
+            for n, i, o in zip(nodes, inn, out)
+        }
+
+    return _cached(G, "degree", (), compute)
+
+
+def _undirected(G: nx.Graph) -> nx.Graph:
+    """Simple undirected view with relation counts as weights."""
+    def compute():
+        H = nx.Graph()
+        H.add_nodes_from(G.nodes())
+        weights = Counter((u, v) if u <= v else (v, u) for u, v in G.edges() if u != v)
+        H.add_weighted_edges_from((u, v, w) for (u, v), w in weights.items())
+        return H
+
+    return _cached(G, "undirected", (), compute)
+
+
+def betweenness(G: nx.Graph, samples: int = BETWEENNESS_SAMPLES, seed: int = 42) -> Dict[str, float]:
+    """
+    Betweenness on the undirected graph; above `samples` nodes it is
+    estimated from `samples` random source nodes.
+    """
+    def compute():
+        H = _undirected(G)
+        k = samples if H.number_of_nodes() > samples else None
+        return nx.betweenness_centrality(H, k=k, seed=seed, normalized=True)
+
+    return _cached(G, "betweenness", (samples, seed), compute)
+
+
+# ------------------------------------------------------
+# Structure
+# ------------------------------------------------------
+def components(G: nx.Graph) -> List[List[str]]:
+    """
+    Weakly connected components, largest first.
+    """
+    def compute():
+        nodes, A = graph_matrix(G)
+        if not nodes:
+            return []
+        _, labels = connected_components(A, directed=True, connection="weak")
+        groups: Dict[int, List[str]] = {}
+        for node, label in zip(nodes, labels.tolist()):
+            groups.setdefault(label, []).append(node)
+        return sorted(groups.values(), key=len, reverse=True)
+
+    return _cached(G, "components", (), compute)
+
+
+def _label_propagation(A: sparse.csr_matrix, max_iter: int = 20, seed: int = 42) -> np.ndarray:
+    """
+    Synchronous weighted label propagation on a symmetric sparse matrix.
+    Each round, every node takes the label with the largest total neighbor
+    weight (its own label counts half an edge), until fewer than 0.1 % of
+    the labels change.
+    """
+    n = A.shape[0]
+    rng = np.random.default_rng(seed)
+    A = A.tocoo()
+    rows = np.concatenate([A.row, np.arange(n)]).astype(np.int64)
+    cols = np.concatenate([A.col, np.arange(n)]).astype(np.int64)
+    weights = np.concatenate([A.data, np.full(n, 0.5)])
+    labels = np.arange(n)
+
+    for _ in range(max_iter):
+        # Group (node, neighbor label) pairs and sum their weights
+        keys, inverse = np.unique(rows * n + labels[cols], return_inverse=True)
+        # Tiny random jitter breaks ties between neighbor labels
+        scores = np.bincount(inverse, weights=weights) + rng.random(len(keys)) * 1e-6
+        key_rows = keys // n
+
+        best = np.lexsort((-scores, key_rows))
+        first = np.ones(len(best), dtype=bool)
+        first[1:] = key_rows[best][1:] != key_rows[best][:-1]
+
+        new = labels.copy()
+        new[key_rows[best][first]] = keys[best][first] % n
+        changed = np.count_nonzero(new != labels)
+        labels = new
+        if changed <= n * 1e-3:
+            break
+
+    return labels
+
+
+def communities(G: nx.Graph, seed: int = 42) -> List[List[str]]:
+    """
+    Thematic clusters, largest first: Louvain up to LOUVAIN_MAX_NODES
+    nodes, sparse label propagation above.
+    """
+    def compute():
+        if G.number_of_nodes() == 0:
+            return []
+
+        if G.number_of_nodes() <= LOUVAIN_MAX_NODES:
+            found = nx.community.louvain_communities(_undirected(G), weight="weight", seed=seed)
+            return sorted((list(c) for c in found), key=len, reverse=True)
+
+        nodes, A = graph_matrix(G)
+        A = (A + A.T).tocsr()
+        A = (A - sparse.diags(A.diagonal())).tocsr()
+        A.eliminate_zeros()
+        labels = _label_propagation(A, seed=seed)
+        groups: Dict[int, List[str]] = {}
+        for node, label in zip(nodes, labels.tolist()):
+            groups.setdefault(label, []).append(node)
+        return sorted(groups.values(), key=len, reverse=True)
+
+    return _cached(G, "communities", (seed,), compute)
+
+
+# ------------------------------------------------------
+# Roles & ranking
+# ------------------------------------------------------
+def node_roles(G: nx.Graph) -> Dict[str, str]:
+    """
+    Node → "event" | "figure" | "place" | "date" | "entity", from the
+    domain / range of the predicates it takes part in.
+    """
+    def compute():
+        roles: Dict[str, str] = {}
+        for u, v, attrs in G.edges(data=True):
+            subject_role, object_role = PREDICATE_ROLES.get(attrs.get("predicate", ""), (None, None))
+            # "event" is the strongest evidence for a subject
+            if subject_role and roles.get(u) != "event":
+                roles[u] = subject_role
+            if object_role and v not in roles:
+                roles[v] = object_role
+        return {n: roles.get(n, "entity") for n in G.nodes()}
+
+    return _cached(G, "roles", (), compute)
+
+
+def ranked_nodes(G: nx.Graph) -> Tuple[List[str], Dict[str, int]]:
+    """
+    All nodes by descending PageRank, plus node → rank position
+    (stable paging order for the graph-data API).
+    """
+    def compute():
+        ranks = pagerank(G)
+        order = sorted(G.nodes(), key=lambda n: -ranks.get(n, 0.0))
+        return order, {n: i for i, n in enumerate(order)}
+
+    return _cached(G, "ranked_nodes", (), compute)
+
+
+METRICS = {
+    "pagerank": lambda G: pagerank(G),
+    "degree": lambda G: {n: d["total"] for n, d in degree(G).items()},
+    "betweenness": lambda G: betweenness(G),
+}
+
+
+def top_k(
+    G: nx.Graph,
+    metric: str = "pagerank",
+    k: int = 20,
+    role: Optional[str] = None,
+    theme: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Highest-scoring nodes, optionally only one role ("event" = key
+    events, "figure" = key figures, ...) and/or one theme.
+    Date literals are skipped unless role="date".
+    """
+    if metric not in METRICS:
+        raise ValueError(f"❌ Unknown metric: {metric} (expected one of {sorted(METRICS)})")
+
+    def compute():
+        scores = METRICS[metric](G)
+        roles = node_roles(G)
+        ranked = []
+        for node, score in sorted(scores.items(), key=lambda x: x[1], reverse=True):
+            node_role = roles.get(node, "entity")
+            if role is not None and node_role != role:
+                continue
+            if role is None and node_role == "date":
+                continue
+            attrs = G.nodes[node]
+            themes = attrs.get("themes") or [attrs.get("theme", "")]
+            if theme is not None and theme not in themes:
+                continue
+            ranked.append({
+                "node": node,
+                "score": score,
+                "role": node_role,
+                "themes": themes,
+                "sources": attrs.get("sources") or [attrs.get("source", "")],
+            })
+            if len(ranked) >= k:
+                break
+        return ranked
+
+    return _cached(G, "top_k", (metric, k, role, theme), compute)
+
+
+def community_summary(G: nx.Graph, k: int = 10, members: int = 5) -> List[Dict[str, Any]]:
+    """
+    The k largest communities with their dominant theme and
+    highest-PageRank members.
+    """
+    def compute():
+        ranks = pagerank(G)
+        summary = []
+        for i, community in enumerate(communities(G)[:k]):
+            themes = Counter(
+                t for n in community
+                for t in (G.nodes[n].get("themes") or [G.nodes[n].get("theme", "")]) if t
+            )
+            summary.append({
+                "id": i,
+                "size": len(community),
+                "theme": themes.most_common(1)[0][0] if themes else "",
+                "top_members": sorted(community, key=lambda n: ranks.get(n, 0.0), reverse=True)[:members],
+            })
+        return summary
+
+    return _cached(G, "community_summary", (k, members), compute)
+
+
+# ------------------------------------------------------
+# Module Test
+# ------------------------------------------------------
+if __name__ == "__main__":
+    from kg.graph_builder import build_graph_from_triples
+
+    triples = [
+        {"subject": "معركة الكرامة", "predicate": "occurredIn", "object": "الكرامة", "span": "..."},
+        {"subject": "معركة الكرامة", "predicate": "occurredOn", "object": "1968-03-21", "span": "..."},
+        {"subject": "معركة الكرامة", "predicate": "hasParticipant", "object": "الجيش الأردني", "span": "..."},
+        {"subject": "أحداث أيلول", "predicate": "hasParticipant", "object": "الجيش الأردني", "span": "..."},
+        {"subject": "أحداث أيلول", "predicate": "hasParticipant", "object": "وصفي التل", "span": "..."},
+        {"subject": "أحداث أيلول", "predicate": "occurredIn", "object": "عمان", "span": "..."},
+    ]
+    G = build_graph_from_triples(triples, "event", "dbo:Event", source_file="sample.pdf")
+
+    print("Key figures:", top_k(G, "pagerank", k=3, role="figure"))
+    print("Key events:", top_k(G, "degree", k=3, role="event"))
+    print("Communities:", community_summary(G))
+    print("Components:", components(G))
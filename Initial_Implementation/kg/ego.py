@@ -0,0 +1,161 @@
+"""
+ego.py
+-------------------
+k-hop ego-network extraction over the fact index (kg/query.py).
+
+Starting from one entity, the network grows hop by hop along edges in
+both directions. Edges can be filtered by predicate, theme and source
+document, and dated events / dates outside a time range are skipped
+(kg/timeline.py). Every hop admits only the best candidates until
+`max_nodes` is reached, ranked either by the weight of their links into
+the network (number of supporting facts) or by a centrality score
+(kg/analytics.py), so the result stays small however large the KG is.
+"""
+
+from collections import Counter
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+
+from kg.query import KGIndex, Fact
+from kg.timeline import TimelineIndex
+
+
+def _edge_weight(attrs: Dict[str, Any]) -> int:
+    return attrs.get("count") or len(attrs.get("provenance") or ()) or 1
+
+
+def _edge_values(attrs: Dict[str, Any], field: str) -> Set[str]:
+    """Sources / themes of an edge, from the merged lists or the provenance."""
+    values = set(attrs.get(field + "s") or ())
+    values.update(p.get(field, "") for p in attrs.get("provenance") or ())
+    values.add(attrs.get(field, ""))
+    return values - {""}
+
+
+def ego_network(
+    index: KGIndex,
+    center: str,
+    hops: int = 2,
+    predicate: Optional[str] = None,
+    theme: Optional[str] = None,
+    source: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    timeline: Optional[TimelineIndex] = None,
+    scores: Optional[Dict[str, float]] = None,
+    max_nodes: int = 200,
+    max_edges: int = 2000
+) -> Dict[str, Any]:
+    """
+    Ego network of `center` (matched like KGIndex labels).
+
+    Args:
+        hops: radius (edges followed in both directions)
+        predicate / theme / source: keep only matching edges
+        start / end: date range; needs `timeline`
+        scores: node → centrality used for ranking (default: link weight)
+        max_nodes / max_edges: result caps
+
+    Returns {"center", "nodes": [{id, hop, score}], "edges": [facts],
+    "truncated"}. Raises KeyError for an unknown center.
+    """
+    centers = index.resolve(center)
+    if not centers:
+        raise KeyError(f"❌ Unknown node: {center}")
+
+    P = index.resolve(predicate)
+    excluded: Set[str] = set()
+    if start or end:
+        if timeline is None:
+            raise ValueError("❌ A date range needs a timeline index")
+        excluded = timeline.dated_outside(start, end)
+
+    def edge_ok(fact: Fact) -> bool:
+        if P is not None and fact[1] not in P:
+            return False
+        attrs = index.attrs.get(fact, {})
+        if theme and theme not in _edge_values(attrs, "theme"):
+            return False
+        if source and source not in _edge_values(attrs, "source"):
+            return False
+        return True
+
+    def incident(node: str) -> Iterator[Tuple[Fact, str]]:
+        for p_, objects in index.spo.get(node, {}).items():
+            for o_ in objects:
+                yield (node, p_, o_), o_
+        for s_, predicates in index.osp.get(node, {}).items():
+            for p_ in predicates:
+                yield (s_, p_, node), s_
+
+    hop_of: Dict[str, int] = {c: 0 for c in centers}
+    score_of: Dict[str, float] = {c: (scores or {}).get(c, 0.0) for c in centers}
+    frontier = set(centers)
+    truncated = False
+
+    for hop in range(1, hops + 1):
+        candidates: Counter = Counter()
+        for node in frontier:
+            for fact, other in incident(node):
+                if other not in hop_of and other not in excluded and edge_ok(fact):
+                    candidates[other] += _edge_weight(index.attrs.get(fact, {}))
+
+        room = max_nodes - len(hop_of)
+        if scores is not None:
+            ranked = sorted(candidates, key=lambda n: (scores.get(n, 0.0), candidates[n]), reverse=True)
+        else:
+            ranked = [n for n, _ in candidates.most_common()]
+        if len(ranked) > room:
+            truncated = True
+            ranked = ranked[:max(room, 0)]
+
+        for n in ranked:
+            hop_of[n] = hop
+            score_of[n] = scores.get(n, 0.0) if scores is not None else candidates[n]
+        frontier = set(ranked)
+        if not frontier:
+            break
+
+    # Induced edges, strongest first
+    edges = [
+        fact
+        for node in hop_of
+        for fact, other in incident(node)
+        if fact[0] == node and other in hop_of and edge_ok(fact)
+    ]
+    edges.sort(key=lambda f: _edge_weight(index.attrs.get(f, {})), reverse=True)
+    if len(edges) > max_edges:
+        truncated = True
+        edges = edges[:max_edges]
+
+    return {
+        "center": sorted(centers),
+        "nodes": [
+            {"id": n, "hop": h, "score": score_of[n]}
+            for n, h in sorted(hop_of.items(), key=lambda x: (x[1], -score_of[x[0]]))
+        ],
+        "edges": [
+            {**index.fact_dict(f), "weight": _edge_weight(index.attrs.get(f, {}))}
+            for f in edges
+        ],
+        "truncated": truncated
+    }
+
+
+# ------------------------------------------------------
+# Module Test
+# ------------------------------------------------------
+if __name__ == "__main__":
+    from kg.graph_builder import build_graph_from_triples
+
+    triples = [
+        {"subject": "معركة الكرامة", "predicate": "hasParticipant", "object": "الملك الحسين", "span": "..."},
+        {"subject": "معركة الكرامة", "predicate": "occurredOn", "object": "1968-03-21", "span": "..."},
+        {"subject": "أحداث أيلول", "predicate": "hasParticipant", "object": "الملك الحسين", "span": "..."},
+        {"subject": "أحداث أيلول", "predicate": "occurredOn", "object": "1970-09", "span": "..."},
+        {"subject": "أحداث أيلول", "predicate": "hasParticipant", "object": "وصفي التل", "span": "..."},
+    ]
+    G = build_graph_from_triples(triples, "event", "dbo:Event", source_file="sample.pdf")
+    index = KGIndex.from_graph(G)
+
+    print(ego_network(index, "الملك الحسين", hops=2))
+    print(ego_network(index, "الملك الحسين", hops=2, start="1970", end="1971", timeline=TimelineIndex.from_graph(G)))
@@ -1,7 +1,8 @@
 """
 graph_builder.py
 -------------------
-Converts validated triples into a directed NetworkX knowledge graph.
+Converts validated triples into a directed NetworkX knowledge graph
+(MultiDiGraph: one edge per subject–predicate–object, keyed by predicate).
 
 Each triple:
 {
@@ -13,14 +14,27 @@ Each triple:
 
 Produces:
 - nodes for subjects + objects
-- directed edges for predicates
+- directed edges for predicates (parallel relations are kept)
 - metadata: theme, tbox, span
+- per-edge provenance list: every (source, span, theme, tbox) occurrence
+- merged graphs aggregate sources / themes / counts instead of overwriting
+- IncrementalGraph: add / replace / delete one source document in place
 
 This module is independent of visualization.
 """
 
+import functools
+import gc
+import json
+import os
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
 import networkx as nx
-from typing import List, Dict, Any
+import numpy as np
+from typing import List, Dict, Any, Union, Set, Tuple
+
+from kg.triple_store import TripleStore
 
 
 # ------------------------------------------------------
@@ -34,11 +48,86 @@ def normalize_label(label: str) -> str:
     return " ".join(label.split()).strip()
 
 
+# ------------------------------------------------------
+# Provenance helpers
+# ------------------------------------------------------
+PROVENANCE_FIELDS = ("source", "span", "theme", "tbox")
+
+EdgeKey = Tuple[str, str, str]
+
+
+def _provenance(source_file: str, span: str, theme: str, tbox: str) -> Dict[str, str]:
+    return {"source": source_file, "span": span, "theme": theme, "tbox": tbox}
+
+
+def _merge_provenance(target: List[Dict[str, str]], entries: List[Dict[str, str]]):
+    """Appends provenance entries that are not already present."""
+    for entry in entries:
+        if entry not in target:
+            target.append(entry)
+
+
+def _json_list(value: Any) -> Any:
+    """Decodes a list that GEXF / GraphML stored as a JSON string."""
+    if isinstance(value, str) and value.startswith("["):
+        try:
+            return json.loads(value)
+        except ValueError:
+            pass
+    return value
+
+
+def edge_provenance(attrs: Dict[str, Any]) -> List[Dict[str, str]]:
+    """
+    Provenance list of an edge: decoded when it was stored as JSON,
+    synthesized from the flat attributes when missing or malformed.
+    """
+    provenance = _json_list(attrs.get("provenance"))
+    if not isinstance(provenance, list) or not all(isinstance(p, dict) for p in provenance):
+        provenance = None
+    return provenance or [{f: str(attrs.get(f) or "") for f in PROVENANCE_FIELDS}]
+
+
+def iter_keyed_edges(G: nx.DiGraph):
+    """
+    Yields (u, v, key, attrs) for MultiDiGraphs and plain DiGraphs
+    (the key of a DiGraph edge is its predicate).
+    """
+    if G.is_multigraph():
+        yield from G.edges(keys=True, data=True)
+    else:
+        for u, v, attrs in G.edges(data=True):
+            yield u, v, attrs.get("predicate", ""), attrs
+
+
+def _node_attrs(label: str, theme: str, tbox: str, source_file: str) -> Dict[str, Any]:
+    return {
+        "label": label,
+        "theme": theme,
+        "tbox": tbox,
+        "source": source_file,
+        "type": "entity"
+    }
+
+
+def _edge_attrs(predicate: str, provenance: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Flat attributes describe the first occurrence (used for styling);
+    `provenance` lists every (source, span, theme, tbox) occurrence.
+    """
+    return {
+        "label": predicate,
+        "predicate": predicate,
+        **provenance,
+        "provenance": [provenance]
+    }
+
+
 # ------------------------------------------------------
 # Add a single triple to a graph
 # ------------------------------------------------------
 def add_triple(
-    G: nx.DiGraph,
+    G: nx.MultiDiGraph,
     triple: Dict[str, Any],
     theme: str = "",
     tbox: str = "",
@@ -47,8 +136,14 @@ def add_triple(
     """
     Inserts subject, object and predicate edge into the graph.
     Applies styling metadata to nodes and edges.
+    A per-triple "theme" (set by per-segment generation) overrides `theme`.
+
+    Edges are keyed by predicate: parallel relations between the same
+    entities are kept, and a repeated fact only extends its provenance.
     """
 
+    theme = triple.get("theme") or theme
+
     subject = normalize_label(triple["subject"])
     predicate = normalize_label(triple["predicate"])
     object_ = normalize_label(triple["object"])
@@ -56,90 +151,511 @@ def add_triple(
 
     # Add nodes
     if subject not in G:
-        G.add_node(
-            subject,
-            label=subject,
-            theme=theme,
-            tbox=tbox,
-            source=source_file,
-            type="entity"
-        )
+        G.add_node(subject, **_node_attrs(subject, theme, tbox, source_file))
 
     if object_ not in G:
-        G.add_node(
-            object_,
-            label=object_,
-            theme=theme,
-            tbox=tbox,
-            source=source_file,
-            type="entity"
-        )
+        G.add_node(object_, **_node_attrs(object_, theme, tbox, source_file))
 
     # Add edge (semantic relation)
-    G.add_edge(
-        subject,
-        object_,
-        label=predicate,
-        predicate=predicate,
-        theme=theme,
-        tbox=tbox,
-        span=span,
-        source=source_file
-    )
+    provenance = _provenance(source_file, span, theme, tbox)
+    if G.has_edge(subject, object_, key=predicate):
+        _merge_provenance(G.edges[subject, object_, predicate]["provenance"], [provenance])
+    else:
+        G.add_edge(subject, object_, key=predicate, **_edge_attrs(predicate, provenance))
 
 
 # ------------------------------------------------------
 # Build a graph from a list of triples
 # ------------------------------------------------------
 def build_graph_from_triples(
-    triples: List[Dict[str, Any]],
+    triples: Union[List[Dict[str, Any]], TripleStore],
     theme: str,
     tbox: str,
     source_file: str = ""
-) -> nx.DiGraph:
+) -> nx.MultiDiGraph:
     """
-    Creates a new graph from triples.
+    Creates a new graph from triples (list of dicts or a TripleStore).
+    A triple's own "source" (TripleStore rows) overrides `source_file`.
+    Nodes and edges are collected first and inserted in bulk.
     """
 
-    G = nx.DiGraph()
+    if isinstance(triples, TripleStore):
+        return _build_graph_from_store(triples, theme, tbox, source_file)
+
+    nodes: Dict[str, Dict[str, Any]] = {}
+    edges: Dict[tuple, Dict[str, Any]] = {}
 
     for t in triples:
-        add_triple(G, t, theme, tbox, source_file)
+        t_theme = t.get("theme") or theme
+        t_source = t.get("source") or source_file
+
+        subject = normalize_label(t["subject"])
+        predicate = normalize_label(t["predicate"])
+        object_ = normalize_label(t["object"])
+
+        for label in (subject, object_):
+            if label not in nodes:
+                nodes[label] = _node_attrs(label, t_theme, tbox, t_source)
+
+        provenance = _provenance(t_source, t.get("span", ""), t_theme, tbox)
+        key = (subject, object_, predicate)
+        if key in edges:
+            _merge_provenance(edges[key]["provenance"], [provenance])
+        else:
+            edges[key] = _edge_attrs(predicate, provenance)
+
+    G = nx.MultiDiGraph()
+    G.add_nodes_from(nodes.items())
+    G.add_edges_from((u, v, p, attrs) for (u, v, p), attrs in edges.items())
 
     return G
 
 
+def _build_graph_from_store(
+    store: TripleStore,
+    theme: str,
+    tbox: str,
+    source_file: str = ""
+) -> nx.MultiDiGraph:
+    """
+    build_graph_from_triples over the ID columns: labels are normalized
+    once per distinct string, duplicate provenance rows are dropped with
+    np.unique, and only the surviving rows are decoded.
+    """
+    strings = store.strings
+    n = len(store)
+    if not n:
+        return nx.MultiDiGraph()
+
+    s = store.map_column("subject", normalize_label)
+    p = store.map_column("predicate", normalize_label)
+    o = store.map_column("object", normalize_label)
+    themes = store.column("theme")
+    themes = np.where(themes != 0, themes, strings.intern(theme))
+    sources = store.column("source")
+    sources = np.where(sources != 0, sources, strings.intern(source_file))
+    spans = store.column("span")
+
+    # Nodes: first mention (subject before object) carries the attributes
+    mentions = np.column_stack([s, o]).ravel()
+    labels, first = np.unique(mentions, return_index=True)
+    order = np.argsort(first, kind="stable")
+    rows = first[order] // 2
+    nodes = [
+        (label, _node_attrs(label, th, tbox, src))
+        for label, th, src in zip(
+            strings.lookup_many(labels[order]),
+            strings.lookup_many(themes[rows]),
+            strings.lookup_many(sources[rows])
+        )
+    ]
+
+    # Edges: one provenance entry per distinct (fact, source, span, theme)
+    records = np.column_stack([s, o, p, sources, spans, themes])
+    _, first = np.unique(records, axis=0, return_index=True)
+    records = records[np.sort(first)]
+
+    edges: Dict[tuple, Dict[str, Any]] = {}
+    lookup = strings.strings
+    for u, v, key, src, span, th in records.tolist():
+        provenance = _provenance(lookup[src], lookup[span], lookup[th], tbox)
+        attrs = edges.get((u, v, key))
+        if attrs is None:
+            edges[(u, v, key)] = _edge_attrs(lookup[key], provenance)
+        else:
+            attrs["provenance"].append(provenance)
+
+    G = nx.MultiDiGraph()
+    G.add_nodes_from(nodes)
+    G.add_edges_from((lookup[u], lookup[v], lookup[key], attrs) for (u, v, key), attrs in edges.items())
+    return G
+
+
 # ------------------------------------------------------
 # Merge multiple triple graphs
 # ------------------------------------------------------
-def merge_graphs(graphs: List[nx.DiGraph]) -> nx.DiGraph:
+# Aggregated attributes (kept as sorted lists so they serialize cleanly):
+# - nodes: "sources", "themes", "count" (number of source documents,
+#   the same rule IncrementalGraph applies)
+# - edges: "sources", "themes", "count" (number of provenance occurrences)
+
+
+MERGE_FAN_IN = 8
+
+
+def _values(attrs: Dict[str, Any], plural: str, singular: str) -> List[str]:
+    """Existing aggregated list, or the single flat value."""
+    values = _json_list(attrs.get(plural))
+    if isinstance(values, list):
+        return values
+    value = attrs.get(singular)
+    return [value] if value else []
+
+
+def _marker(entry: Dict[str, str]) -> tuple:
+    return tuple(entry.get(f, "") for f in PROVENANCE_FIELDS)
+
+
+def _distinct(entries: List[Dict[str, str]], seen: Set[tuple] = None) -> List[Dict[str, str]]:
+    """Entries whose marker is not in `seen` yet (`seen` is updated)."""
+    seen = set() if seen is None else seen
+    out = []
+    for entry in entries:
+        marker = _marker(entry)
+        if marker not in seen:
+            seen.add(marker)
+            out.append(entry)
+    return out
+
+
+def _edge_aggregates(provenance: List[Dict[str, str]]) -> Dict[str, Any]:
+    """Provenance plus the sources / themes / count derived from it."""
+    if len(provenance) == 1:
+        source, theme = provenance[0].get("source"), provenance[0].get("theme")
+        sources, themes = [source] if source else [], [theme] if theme else []
+    else:
+        sources = sorted({p["source"] for p in provenance if p.get("source")})
+        themes = sorted({p["theme"] for p in provenance if p.get("theme")})
+    return {"provenance": provenance, "sources": sources, "themes": themes, "count": len(provenance)}
+
+
+def _without_gc(fn):
     """
-    Combines multiple NetworkX graphs into one.
+    Pauses the cyclic garbage collector while `fn` runs. A merge
+    allocates a few containers per node / edge record and none of them
+    form cycles, yet every full collection would rescan all of them and
+    the input graphs; on large merges that cost more than the merge.
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            if enabled:
+                gc.enable()
+    return wrapper
+
+
+@_without_gc
+def _merge_tables(graphs: List[nx.DiGraph]) -> nx.MultiDiGraph:
+    """
+    One pass over the concatenated node / edge records of all graphs,
+    grouped by key in hash tables; aggregates are built per group.
+    Each edge group is its output attribute dict, complete from the
+    first occurrence; only edges that several graphs contribute to are
+    deduplicated and re-aggregated at the end.
     """
 
-    G = nx.DiGraph()
-
+    # Nodes: key → first attrs; key → (sources, themes)
+    node_attrs: Dict[str, Dict[str, Any]] = {}
+    node_values: Dict[str, Tuple[Set[str], Set[str]]] = {}
     for g in graphs:
         for node, attrs in g.nodes(data=True):
-            if node not in G:
-                G.add_node(node, **attrs)
-            else:
-                # Merge metadata if needed
-                G.nodes[node].update(attrs)
+            values = node_values.get(node)
+            if values is None:
+                node_attrs[node] = attrs
+                values = node_values[node] = (set(), set())
+            if "sources" in attrs or "themes" in attrs:
+                values[0].update(_values(attrs, "sources", "source"))
+                values[1].update(_values(attrs, "themes", "theme"))
+                continue
+            # Single-document graph: flat values only
+            source, theme = attrs.get("source"), attrs.get("theme")
+            if source:
+                values[0].add(source)
+            if theme:
+                values[1].add(theme)
+
+    # Edges: (u, v, key) → merged attrs; markers of edges seen more than once
+    edges: Dict[EdgeKey, Dict[str, Any]] = {}
+    shared: Dict[EdgeKey, Set[tuple]] = {}
+    for g in graphs:
+        records = g.edges(keys=True, data=True) if g.is_multigraph() else iter_keyed_edges(g)
+        for u, v, key, attrs in records:
+            entries = attrs.get("provenance")
+            if not isinstance(entries, list):
+                entries = edge_provenance(attrs)
+            k = (u, v, key)
+            merged = edges.get(k)
+            if merged is None:
+                if len(entries) == 1:
+                    entry = entries[0]
+                    source, theme = entry.get("source"), entry.get("theme")
+                    edges[k] = {
+                        **attrs, "provenance": [entry], "sources": [source] if source else [],
+                        "themes": [theme] if theme else [], "count": 1
+                    }
+                else:
+                    edges[k] = {**attrs, **_edge_aggregates(_distinct(entries))}
+                continue
+            markers = shared.get(k)
+            if markers is None:
+                markers = shared[k] = {_marker(entry) for entry in merged["provenance"]}
+            merged["provenance"].extend(_distinct(entries, markers))
+
+    for k in shared:
+        edges[k].update(_edge_aggregates(edges[k]["provenance"]))
+
+    G = nx.MultiDiGraph()
+    G.add_nodes_from(
+        (node, {**node_attrs[node], "sources": sorted(sources), "themes": sorted(themes), "count": len(sources)})
+        for node, (sources, themes) in node_values.items()
+    )
+    # add_edge directly: MultiDiGraph.add_edges_from updates each edge
+    # through the adjacency views
+    add_edge = G.add_edge
+    for (u, v, key), merged in edges.items():
+        add_edge(u, v, key, **merged)
+    return G
 
-        for u, v, attrs in g.edges(data=True):
-            if not G.has_edge(u, v):
-                G.add_edge(u, v, **attrs)
-            else:
-                # Merge edge metadata
-                G.edges[u, v].update(attrs)
 
-    return G
+def merge_graphs(
+    graphs: List[nx.DiGraph],
+    parallel: bool = False,
+    workers: int = None,
+    fan_in: int = MERGE_FAN_IN
+) -> nx.MultiDiGraph:
+    """
+    Combines multiple NetworkX graphs into one MultiDiGraph.
+
+    Node and edge records of all graphs are grouped by key (node label /
+    (subject, object, predicate)) in one pass. Instead of
+    last-writer-wins, shared entities and facts aggregate:
+    - sources / themes: sorted sets of every contributing value
+    - count: source documents of a node / provenance occurrences of an edge
+    - provenance: every (source, span, theme, tbox) of an edge
+    Other attributes come from the first occurrence.
+
+    parallel=True merges in a tree: groups of `fan_in` graphs are merged
+    concurrently in worker processes, then the partial results are
+    merged the same way until one graph is left. The merge is
+    associative, so the result is the same; it only pays off on
+    multi-core hosts, since partial graphs are pickled between processes.
+    """
+
+    graphs = list(graphs)
+
+    if not parallel or len(graphs) <= fan_in:
+        return _merge_tables(graphs)
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while len(graphs) > fan_in:
+            groups = [graphs[i:i + fan_in] for i in range(0, len(graphs), fan_in)]
+            graphs = list(pool.map(_merge_tables, groups))
+
+    return _merge_tables(graphs)
+
+
+# ------------------------------------------------------
+# Incremental updates (per source document)
+# ------------------------------------------------------
+class IncrementalGraph:
+    """
+    Wraps a merged MultiDiGraph with the bookkeeping needed to add,
+    replace or delete one document's contribution without a rebuild:
+
+    - source_edges: source file → keys of the edges it mentions
+    - node_refs:    node → number of incident edges (0 → node removed)
+    - node_values:  node → Counter of ("source" | "theme", value) over its
+                    incident edges, so node sources/themes stay exact
+
+    Every mutation costs time proportional to the document's edges, and
+    increments G.graph["version"] (used to invalidate derived caches).
+    Methods return {"added", "updated", "removed"} edge-key sets so
+    indexes built on the graph (KGIndex) can be patched.
+    """
+
+    def __init__(self, G: nx.MultiDiGraph = None):
+        self.G = G if G is not None else nx.MultiDiGraph()
+        if not self.G.is_multigraph():
+            self.G = merge_graphs([self.G])
+        self.G.graph["version"] = int(self.G.graph.get("version") or 0)
+
+        self.source_edges: Dict[str, Set[EdgeKey]] = defaultdict(set)
+        self.node_refs: Counter = Counter()
+        self.node_values: Dict[str, Counter] = defaultdict(Counter)
+
+        # A wrapped graph may come from a snapshot, GEXF / GraphML (lists
+        # stored as JSON strings) or an older merge: aggregates are
+        # rebuilt from the provenance instead of trusted
+        for u, v, key, attrs in self.G.edges(keys=True, data=True):
+            attrs["provenance"] = edge_provenance(attrs)
+            attrs.setdefault("predicate", key)
+            self._refresh_edge(attrs)
+            self._track(u, v, key, attrs, +1)
+
+        for node in self.G.nodes():
+            if self.node_refs[node] > 0:
+                self._refresh_node(node)
+
+    # ---------------- bookkeeping ----------------
+    @property
+    def version(self) -> int:
+        return self.G.graph["version"]
+
+    def sources(self) -> List[str]:
+        return sorted(s for s, keys in self.source_edges.items() if keys)
+
+    @staticmethod
+    def _edge_values(attrs: Dict[str, Any]) -> Set[Tuple[str, str]]:
+        values = set()
+        for p in attrs.get("provenance", []):
+            if p.get("source"):
+                values.add(("source", p["source"]))
+            if p.get("theme"):
+                values.add(("theme", p["theme"]))
+        return values
+
+    def _track(self, u: str, v: str, key: str, attrs: Dict[str, Any], sign: int):
+        """Adds (sign=+1) or withdraws (sign=-1) one edge's contribution."""
+        values = self._edge_values(attrs)
+        for _, source in (x for x in values if x[0] == "source"):
+            if sign > 0:
+                self.source_edges[source].add((u, v, key))
+            else:
+                self.source_edges[source].discard((u, v, key))
+        for node in (u, v):
+            self.node_refs[node] += sign
+            counter = self.node_values[node]
+            for value in values:
+                counter[value] += sign
+                if counter[value] <= 0:
+                    del counter[value]
+
+    def _refresh_node(self, node: str):
+        attrs = self.G.nodes[node]
+        counter = self.node_values.get(node, {})
+        attrs["sources"] = sorted(v for kind, v in counter if kind == "source")
+        attrs["themes"] = sorted(v for kind, v in counter if kind == "theme")
+        attrs["count"] = len(attrs["sources"])
+        if attrs["sources"] and attrs.get("source") not in attrs["sources"]:
+            attrs["source"] = attrs["sources"][0]
+        if attrs["themes"] and attrs.get("theme") not in attrs["themes"]:
+            attrs["theme"] = attrs["themes"][0]
+
+    @staticmethod
+    def _refresh_edge(attrs: Dict[str, Any]):
+        provenance = attrs["provenance"]
+        attrs["sources"] = sorted({p["source"] for p in provenance if p.get("source")})
+        attrs["themes"] = sorted({p["theme"] for p in provenance if p.get("theme")})
+        attrs["count"] = len(provenance)
+        # Flat attributes follow the first remaining occurrence
+        attrs.update({f: provenance[0].get(f, "") for f in PROVENANCE_FIELDS})
+
+    def _bump(self):
+        self.G.graph["version"] = self.version + 1
+
+    # ---------------- mutations ----------------
+    def remove_source(self, source: str) -> Dict[str, Set[EdgeKey]]:
+        """
+        Deletes one document's provenance; edges left without provenance
+        are removed, then nodes without incident edges are collected.
+        """
+        changes = {"added": set(), "updated": set(), "removed": set()}
+        touched_nodes = set()
+
+        for u, v, key in list(self.source_edges.pop(source, ())):
+            if not self.G.has_edge(u, v, key):
+                continue
+            attrs = self.G.edges[u, v, key]
+            self._track(u, v, key, attrs, -1)
+            touched_nodes.update((u, v))
+
+            attrs["provenance"] = [p for p in attrs["provenance"] if p.get("source") != source]
+            if attrs["provenance"]:
+                self._refresh_edge(attrs)
+                self._track(u, v, key, attrs, +1)
+                changes["updated"].add((u, v, key))
+            else:
+                self.G.remove_edge(u, v, key)
+                changes["removed"].add((u, v, key))
+
+        for node in touched_nodes:
+            if self.node_refs[node] <= 0:
+                self.G.remove_node(node)
+                self.node_refs.pop(node, None)
+                self.node_values.pop(node, None)
+            else:
+                self._refresh_node(node)
+
+        if touched_nodes:
+            self._bump()
+        return changes
+
+    def add_source(
+        self,
+        source: str,
+        triples: Union[List[Dict[str, Any]], TripleStore],
+        theme: str = "",
+        tbox: str = ""
+    ) -> Dict[str, Set[EdgeKey]]:
+        """
+        Merges one document's triples (existing provenance is kept).
+        """
+        changes = {"added": set(), "updated": set(), "removed": set()}
+        doc = build_graph_from_triples(triples, theme, tbox, source_file=source)
+
+        for node, attrs in doc.nodes(data=True):
+            if node not in self.G:
+                self.G.add_node(node, **attrs)
+
+        for u, v, key, attrs in doc.edges(keys=True, data=True):
+            if self.G.has_edge(u, v, key):
+                existing = self.G.edges[u, v, key]
+                self._track(u, v, key, existing, -1)
+                _merge_provenance(existing["provenance"], attrs["provenance"])
+                self._refresh_edge(existing)
+                self._track(u, v, key, existing, +1)
+                changes["updated"].add((u, v, key))
+            else:
+                self.G.add_edge(u, v, key=key, **attrs)
+                self._refresh_edge(self.G.edges[u, v, key])
+                self._track(u, v, key, self.G.edges[u, v, key], +1)
+                changes["added"].add((u, v, key))
+
+        for node in doc.nodes():
+            self._refresh_node(node)
+
+        if doc.number_of_nodes():
+            self._bump()
+        return changes
+
+    def upsert_source(
+        self,
+        source: str,
+        triples: Union[List[Dict[str, Any]], TripleStore],
+        theme: str = "",
+        tbox: str = ""
+    ) -> Dict[str, Set[EdgeKey]]:
+        """
+        Replaces one document's contribution with `triples`.
+        """
+        removed = self.remove_source(source)
+        added = self.add_source(source, triples, theme, tbox)
+
+        # An edge removed and re-added in the same call was updated
+        readded = removed["removed"] & added["added"]
+        return {
+            "added": added["added"] - readded,
+            "updated": (removed["updated"] | added["updated"] | readded) - (removed["removed"] - readded),
+            "removed": removed["removed"] - readded,
+        }
 
 
 # ------------------------------------------------------
 # Export NetworkX Graph
 # ------------------------------------------------------
+def _flatten_attrs(attrs: Dict[str, Any]) -> Dict[str, Any]:
+    """GEXF/GraphML only store scalars: lists/dicts become JSON strings."""
+    return {
+        k: json.dumps(v, ensure_ascii=False) if isinstance(v, (list, dict, set, tuple)) else v
+        for k, v in attrs.items()
+    }
+
+
 def export_graph(
     G: nx.DiGraph,
     folder: str = "triples/",
@@ -150,20 +666,27 @@ def export_graph(
     - GEXF (Gephi)
     - GraphML
 
+    List attributes (edge provenance) are written as JSON strings.
     Returns dict of saved paths.
     """
 
-    import os
     os.makedirs(folder, exist_ok=True)
 
+    H = G.__class__()
+    H.add_nodes_from((n, _flatten_attrs(a)) for n, a in G.nodes(data=True))
+    if G.is_multigraph():
+        H.add_edges_from((u, v, k, _flatten_attrs(a)) for u, v, k, a in G.edges(keys=True, data=True))
+    else:
+        H.add_edges_from((u, v, _flatten_attrs(a)) for u, v, a in G.edges(data=True))
+
     paths = {}
 
     gexf_path = os.path.join(folder, f"{basename}.gexf")
-    nx.write_gexf(G, gexf_path, encoding="utf-8")
+    nx.write_gexf(H, gexf_path, encoding="utf-8")
     paths["gexf"] = gexf_path
 
     graphml_path = os.path.join(folder, f"{basename}.graphml")
-    nx.write_graphml(G, graphml_path, encoding="utf-8")
+    nx.write_graphml(H, graphml_path, encoding="utf-8")
     paths["graphml"] = graphml_path
 
     return paths
@@ -1,26 +1,49 @@
 """
 graph_visualiser.py
 -----------------------
-Visualizes a semantic knowledge graph (NetworkX DiGraph) using PyVis.
+Visualizes a semantic knowledge graph (NetworkX MultiDiGraph) using PyVis.
 
 Features:
 - Arabic + English font support
 - Node coloring by theme or T-Box class
-- Predicate-labeled edges
-- Tooltip metadata (span, source file)
+- Predicate-labeled edges (parallel relations drawn separately)
+- Tooltip metadata (span, source files)
 - Browser auto-open or return HTML path
+- Large-graph mode: server-side layout (no browser physics), low-degree
+  nodes folded into "+N" clusters, optional top-k subgraph by PageRank
+- Named layouts: positions persisted under triples/layouts/ and reused;
+  after an update only the new nodes are placed (next to their neighbors)
+- graph_data(): compact vis-network nodes / edges JSON (paged by PageRank,
+  or one node's neighborhood) for static/kg_viewer.html
 
 Requires:
 - NetworkX graph built by graph_builder.py
 """
 
+import json
+import math
 import os
 import webbrowser
-from typing import Optional
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
 from pyvis.network import Network
 import networkx as nx
 
+from kg.analytics import pagerank, ranked_nodes
+
+
+# Above this many nodes the browser cannot run physics interactively
+LARGE_GRAPH_NODES = 1500
+
+# Persisted layouts: name → {node: (x, y)} in layout units
+LAYOUT_DIR = os.path.join("triples", "layouts")
+_LAYOUTS: Dict[str, Dict[str, Tuple[float, float]]] = {}
+
+# Above this share of unplaced nodes the layout is recomputed from scratch
+RELAYOUT_RATIO = 0.5
+
 
 # ------------------------------------------------------
 # Theme-based color palette
@@ -31,27 +54,386 @@ THEME_COLORS = {
     "other": "#ffe66d",        # yellow
     None: "#b2bec3"            # default gray
 }
+CLUSTER_COLOR = "#636e72"
+
+
+# ------------------------------------------------------
+# Level of detail (large graphs)
+# ------------------------------------------------------
+def level_of_detail(G: nx.Graph, top_k: Optional[int] = None, min_degree: int = 2) -> nx.DiGraph:
+    """
+    Simplified drawing graph:
+    - optionally only the top_k nodes by PageRank (induced subgraph)
+    - parallel relations collapsed into one edge (count, predicates)
+    - nodes with fewer than `min_degree` neighbors are folded into one
+      "+N" cluster node per hub (their best-connected neighbor)
+    """
+    keep = set(G.nodes())
+    if top_k is not None and top_k < len(keep):
+        ranks = pagerank(G)
+        keep = set(sorted(ranks, key=ranks.get, reverse=True)[:top_k])
+
+    H = nx.DiGraph()
+    H.add_nodes_from((n, G.nodes[n]) for n in keep)
+
+    predicates: Dict[Tuple[str, str], Counter] = defaultdict(Counter)
+    for u, v, attrs in G.edges(data=True):
+        if u in keep and v in keep:
+            predicates[(u, v)][attrs.get("predicate", "")] += 1
+    H.add_edges_from(
+        (u, v, {"predicate": counts.most_common(1)[0][0], "predicates": dict(counts), "count": sum(counts.values())})
+        for (u, v), counts in predicates.items()
+    )
+
+    # Fold low-degree nodes into one cluster per hub (hubs are never folded)
+    neighbors = {n: set(H.predecessors(n)) | set(H.successors(n)) for n in H.nodes()}
+    leaves = defaultdict(list)
+    for n, near in neighbors.items():
+        if 0 < len(near) < min_degree:
+            hub = max(near, key=lambda m: len(neighbors[m]))
+            if len(neighbors[hub]) >= min_degree:
+                leaves[hub].append(n)
+
+    for hub, members in leaves.items():
+        if len(members) < 2:
+            continue
+        H.remove_nodes_from(members)
+        # Keyed by hub (not size) so the cluster keeps its cached position
+        cluster = f"cluster:{hub}"
+        H.add_node(
+            cluster, cluster=True, label=f"+{len(members)}",
+            members=sorted(members), theme=H.nodes[hub].get("theme")
+        )
+        H.add_edge(hub, cluster, predicate="", count=len(members))
+
+    return H
+
+
+def force_layout(
+    G: nx.Graph,
+    iterations: int = 60,
+    seed: int = 42,
+    samples: int = 64,
+    pos: Optional[Dict[str, Tuple[float, float]]] = None,
+    fixed: Optional[set] = None
+) -> Dict[str, Tuple[float, float]]:
+    """
+    Vectorized Fruchterman-Reingold layout in a unit square.
+    Attraction runs over all edges; repulsion is estimated from `samples`
+    random nodes per iteration, so each step is O(E + N * samples).
+
+    `pos` gives starting positions; nodes in `fixed` do not move, and
+    only the others pay for force computation (incremental placement).
+    """
+    nodes = list(G.nodes())
+    n = len(nodes)
+    if n == 0:
+        return {}
+    if n == 1 and not pos:
+        return {nodes[0]: (0.5, 0.5)}
+
+    index = {node: i for i, node in enumerate(nodes)}
+    src = np.fromiter((index[u] for u, v in G.edges() if u != v), dtype=np.int64)
+    dst = np.fromiter((index[v] for u, v in G.edges() if u != v), dtype=np.int64)
+
+    rng = np.random.default_rng(seed)
+    xy = rng.random((n, 2))
+    for node, p in (pos or {}).items():
+        if node in index:
+            xy[index[node]] = p
+
+    moving = np.array([node not in (fixed or ()) for node in nodes])
+    rows = np.nonzero(moving)[0]
+    touching = moving[src] | moving[dst]
+    src, dst = src[touching], dst[touching]
+
+    k = 1.0 / math.sqrt(n)
+    samples = max(min(samples, n - 1), 1)
+    temperature = 0.1
+
+    for step in range(iterations):
+        disp = np.zeros((n, 2))
+
+        # Repulsion k² / d from a random sample, scaled up to all nodes
+        others = rng.integers(0, n, size=samples)
+        delta = xy[rows, None, :] - xy[None, others, :]
+        dist2 = np.maximum((delta ** 2).sum(axis=2), 1e-9)
+        disp[rows] += (delta * (k * k / dist2)[:, :, None]).sum(axis=1) * ((n - 1) / samples)
+
+        # Attraction d² / k along edges
+        delta = xy[src] - xy[dst]
+        dist = np.maximum(np.sqrt((delta ** 2).sum(axis=1)), 1e-9)
+        pull = delta * (dist / k)[:, None]
+        np.add.at(disp, src, -pull)
+        np.add.at(disp, dst, pull)
+
+        step_disp = disp[rows]
+        length = np.maximum(np.sqrt((step_disp ** 2).sum(axis=1)), 1e-9)
+        xy[rows] += step_disp / length[:, None] * np.minimum(length, temperature)[:, None]
+        temperature = 0.1 * (1 - (step + 1) / iterations) + 1e-3
+
+    if not fixed:
+        xy -= xy.min(axis=0)
+        xy /= max(xy.max(), 1e-9)
+    return {node: (float(x), float(y)) for node, (x, y) in zip(nodes, xy)}
+
+
+# ------------------------------------------------------
+# Persisted layouts
+# ------------------------------------------------------
+def _layout_path(name: str) -> str:
+    return os.path.join(LAYOUT_DIR, f"{name}.json")
+
+
+def load_layout(name: str) -> Dict[str, Tuple[float, float]]:
+    """Stored positions for a named layout (memory first, then disk)."""
+    if name not in _LAYOUTS:
+        path = _layout_path(name)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                _LAYOUTS[name] = {n: tuple(p) for n, p in json.load(f).items()}
+        else:
+            _LAYOUTS[name] = {}
+    return _LAYOUTS[name]
+
+
+def save_layout(name: str, positions: Dict[str, Tuple[float, float]]):
+    _LAYOUTS[name] = positions
+    os.makedirs(LAYOUT_DIR, exist_ok=True)
+    tmp = _layout_path(name) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(positions, f, ensure_ascii=False)
+    os.replace(tmp, _layout_path(name))
+
+
+def cached_layout(G: nx.Graph, name: Optional[str] = None, seed: int = 42) -> Dict[str, Tuple[float, float]]:
+    """
+    Positions for every node of G, reusing the named layout:
+    - nothing new → stored positions as-is (no layout work)
+    - a few new nodes → placed at the mean of their placed neighbors,
+      then refined with the old nodes held fixed
+    - mostly new (> RELAYOUT_RATIO) → full layout
+    Positions of nodes no longer drawn are kept, so switching between
+    views (e.g. top-k and full) stays stable.
+    """
+    stored = load_layout(name) if name else {}
+    placed = {n: stored[n] for n in G.nodes() if n in stored}
+    new = [n for n in G.nodes() if n not in stored]
+
+    if not new:
+        return placed
+
+    if len(new) > RELAYOUT_RATIO * G.number_of_nodes():
+        pos = force_layout(G, seed=seed)
+    else:
+        rng = np.random.default_rng(seed)
+        spread = 1.0 / math.sqrt(G.number_of_nodes())
+        start = dict(placed)
+        for node in new:
+            near = [start[m] for m in nx.all_neighbors(G, node) if m in start]
+            center = np.mean(near, axis=0) if near else rng.random(2)
+            start[node] = tuple(center + rng.normal(0, spread, 2))
+        pos = force_layout(G, iterations=20, seed=seed, pos=start, fixed=set(placed))
+
+    if name:
+        save_layout(name, {**stored, **pos})
+    return pos
+
+
+def _visualize_large(
+    G: nx.Graph,
+    output_file: str,
+    height: str,
+    width: str,
+    top_k: Optional[int],
+    min_degree: int,
+    layout: Optional[str]
+) -> Network:
+    """
+    PyVis network with precomputed positions and physics disabled.
+    Nodes / edges are appended directly: Network.add_node / add_edge
+    check membership against lists, which is quadratic.
+    """
+    H = level_of_detail(G, top_k=top_k, min_degree=min_degree)
+    pos = cached_layout(H, layout)
+    ranks = pagerank(H)
+    top_rank = max(ranks.values(), default=1.0)
+    scale = 300 * math.sqrt(max(H.number_of_nodes(), 1))
+
+    net = Network(
+        height=height,
+        width=width,
+        directed=True,
+        bgcolor="#111111",
+        font_color="white"
+    )
+
+    for node, attrs in H.nodes(data=True):
+        x, y = pos[node]
+        if attrs.get("cluster"):
+            members = attrs["members"]
+            title = "<br>".join(members[:30]) + ("<br>…" if len(members) > 30 else "")
+            color, size = CLUSTER_COLOR, 10 + 2 * math.log2(len(members))
+        else:
+            source = ", ".join(attrs.get("sources") or [attrs.get("source", "")])
+            title = f"<b>{node}</b><br>Theme: {attrs.get('theme')}<br>Source: {source}<br>"
+            color = THEME_COLORS.get(attrs.get("theme"), THEME_COLORS[None])
+            size = 8 + 32 * math.sqrt(ranks.get(node, 0.0) / top_rank)
+
+        options = {
+            "id": node, "label": attrs.get("label", node), "title": title, "color": color, "shape": "dot",
+            "size": size, "x": x * scale, "y": y * scale, "physics": False,
+            "font": {"color": "white"}
+        }
+        net.nodes.append(options)
+        net.node_ids.append(node)
+        net.node_map[node] = options
+
+    for u, v, attrs in H.edges(data=True):
+        predicates = attrs.get("predicates") or {}
+        net.edges.append({
+            "from": u, "to": v, "arrows": "to", "color": "#888888",
+            "width": 1 + math.log2(attrs.get("count", 1)),
+            "title": "<br>".join(f"{p} ×{c}" for p, c in predicates.items()) or f"×{attrs.get('count', 1)}"
+        })
+
+    net.set_options("""
+    {
+        "physics": { "enabled": false },
+        "nodes": {
+            "font": { "face": "Arial", "size": 14 }
+        },
+        "edges": {
+            "smooth": false
+        },
+        "interaction": { "hideEdgesOnDrag": true, "tooltipDelay": 200 }
+    }
+    """)
+    return net
+
+
+# ------------------------------------------------------
+# vis-network JSON (no HTML, no disk writes)
+# ------------------------------------------------------
+def _vis_node(G: nx.Graph, node: str, ranks: Dict[str, float], top_rank: float, pos, scale: float) -> Dict[str, Any]:
+    attrs = G.nodes[node]
+    item = {
+        "id": node,
+        "label": node,
+        "theme": attrs.get("theme"),
+        "color": THEME_COLORS.get(attrs.get("theme"), THEME_COLORS[None]),
+        "size": round(8 + 32 * math.sqrt(ranks.get(node, 0.0) / top_rank), 1)
+    }
+    if node in pos:
+        x, y = pos[node]
+        item.update(x=round(x * scale, 1), y=round(y * scale, 1))
+    return item
+
+
+def _vis_edge(u: str, v: str, key, attrs: Dict[str, Any]) -> Dict[str, Any]:
+    # Stable id → the client can merge pages / expansions without duplicates
+    return {"id": f"{u}|{key}|{v}", "from": u, "to": v, "label": attrs.get("predicate", "")}
+
+
+def graph_data(
+    G: nx.Graph,
+    offset: int = 0,
+    limit: int = 500,
+    expand: Optional[str] = None,
+    layout: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    One page of vis-network data.
+
+    Paging: nodes in PageRank order [offset, offset + limit), plus every
+    edge between them and the nodes of earlier pages, so appending pages
+    in order yields the induced subgraph.
+    Expansion (`expand` = node id): that node, its `limit` highest-ranked
+    neighbors and the edges between it and them.
+    Positions come from the named layout when one is given. The lookup
+    is read-only: nodes the stored layout has not placed yet are sent
+    without x / y (layouts are computed by run_all_pdfs.py and on the
+    snapshot path, see cached_layout).
+    """
+    ranks = pagerank(G)
+    top_rank = max(ranks.values(), default=1.0)
+    order, position = ranked_nodes(G)
+    pos = load_layout(layout) if layout else {}
+    scale = 300 * math.sqrt(max(G.number_of_nodes(), 1))
+    multi = G.is_multigraph()
+
+    def incident(node):
+        out = G.out_edges(node, keys=True, data=True) if multi else ((u, v, 0, a) for u, v, a in G.out_edges(node, data=True))
+        inn = G.in_edges(node, keys=True, data=True) if multi else ((u, v, 0, a) for u, v, a in G.in_edges(node, data=True))
+        return out, inn
+
+    edges: List[Dict[str, Any]] = []
+    if expand is not None:
+        if expand not in G:
+            raise KeyError(f"❌ Unknown node: {expand}")
+        near = sorted(set(nx.all_neighbors(G, expand)) - {expand}, key=position.get)[:limit]
+        nodes = [expand] + near
+        keep = set(nodes)
+        out, inn = incident(expand)
+        edges = [_vis_edge(u, v, k, a) for u, v, k, a in out if v in keep]
+        edges += [_vis_edge(u, v, k, a) for u, v, k, a in inn if u in keep and u != expand]
+    else:
+        nodes = order[offset:offset + limit]
+        end = offset + len(nodes)
+        for node in nodes:
+            out, inn = incident(node)
+            # out-edges reach this and earlier pages; in-edges only earlier pages
+            edges += [_vis_edge(u, v, k, a) for u, v, k, a in out if position[v] < end]
+            edges += [_vis_edge(u, v, k, a) for u, v, k, a in inn if position[u] < offset]
+
+    return {
+        "nodes": [_vis_node(G, n, ranks, top_rank, pos, scale) for n in nodes],
+        "edges": edges,
+        "total": G.number_of_nodes(),
+        "offset": offset if expand is None else 0,
+        "limit": limit,
+        "version": G.graph.get("version", 0)
+    }
 
 
 # ------------------------------------------------------
 # Convert NetworkX to PyVis
 # ------------------------------------------------------
 def visualize_graph(
-    G: nx.DiGraph,
+    G: nx.MultiDiGraph,
     output_file: str = "graph_visualization.html",
     height: str = "850px",
     width: str = "100%",
-    show: bool = True
+    show: bool = True,
+    large: Optional[bool] = None,
+    top_k: Optional[int] = None,
+    min_degree: int = 2,
+    layout: Optional[str] = None
 ) -> str:
     """
     Converts a NetworkX graph into an interactive PyVis HTML file.
 
     Args:
-        G: NetworkX DiGraph
+        G: NetworkX MultiDiGraph (or DiGraph)
         output_file: where to save the HTML
         show: auto-open browser?
+        large: large-graph mode (default: above LARGE_GRAPH_NODES nodes or with top_k)
+        top_k: only draw the top_k nodes by PageRank
+        min_degree: leaves with fewer neighbors are folded into clusters
+        layout: name of a persisted layout; positions are reused and baked
+                into the HTML (physics off)
     """
 
+    if large is None:
+        large = top_k is not None or G.number_of_nodes() > LARGE_GRAPH_NODES
+
+    if large:
+        net = _visualize_large(G, output_file, height, width, top_k, min_degree, layout)
+        net.save_graph(output_file)
+        if show:
+            webbrowser.open("file://" + os.path.realpath(output_file))
+        return output_file
+
     net = Network(
         height=height,
         width=width,
@@ -69,13 +451,16 @@ def visualize_graph(
         damping=0.85
     )
 
+    pos = cached_layout(G, layout) if layout else {}
+    scale = 300 * math.sqrt(max(G.number_of_nodes(), 1))
+
     # ------------------------------------------------------
     # Add Nodes
     # ------------------------------------------------------
     for node, attrs in G.nodes(data=True):
         theme = attrs.get("theme")
         tbox = attrs.get("tbox")
-        source = attrs.get("source", "")
+        source = ", ".join(attrs.get("sources") or [attrs.get("source", "")])
         color = THEME_COLORS.get(theme, THEME_COLORS[None])
 
         title_html = f"""
@@ -85,13 +470,19 @@ def visualize_graph(
         Source: {source}<br>
         """
 
+        placement = {}
+        if node in pos:
+            x, y = pos[node]
+            placement = {"x": x * scale, "y": y * scale, "physics": False}
+
         net.add_node(
             node,
             label=node,
             title=title_html,
             color=color,
             shape="dot",
-            size=25
+            size=25,
+            **placement
         )
 
     # ------------------------------------------------------
@@ -101,11 +492,13 @@ def visualize_graph(
         predicate = attrs.get("predicate", "")
         span = attrs.get("span", "")
         theme = attrs.get("theme", "")
+        sources = attrs.get("sources") or sorted({p.get("source", "") for p in attrs.get("provenance", [])} - {""})
 
         title_html = f"""
         <b>{predicate}</b><br>
         Theme: {theme}<br>
         Span: {span}<br>
+        Sources: {", ".join(sources) or attrs.get("source", "")}<br>
         """
 
         net.add_edge(
@@ -0,0 +1,250 @@
+"""
+query.py
+-------------------
+Indexed fact lookup over the merged knowledge graph.
+
+Three hash indexes are kept in sync:
+- SPO: subject → predicate → {objects}
+- POS: predicate → object → {subjects}
+- OSP: object → subject → {predicates}
+
+Any (subject, predicate, object) pattern with wildcards is answered from
+the index that binds the most terms, so lookups never scan every edge.
+Also provides 1–2 hop neighborhood expansion and paging.
+
+Labels are matched after Arabic normalization, so "عمّان" finds "عمان".
+"""
+
+from collections import Counter, defaultdict
+from functools import lru_cache
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+import networkx as nx
+
+from pipeline.text_normalizer import clean_text
+
+
+WILDCARDS = {None, "", "?", "*"}
+
+Fact = Tuple[str, str, str]
+
+
+@lru_cache(maxsize=1 << 20)
+def _key(label: str) -> str:
+    """Normalized lookup key for a node or predicate label (memoized)."""
+    return clean_text(label)
+
+
+# ------------------------------------------------------
+# Index
+# ------------------------------------------------------
+class KGIndex:
+    """
+    SPO / POS / OSP hash indexes over graph facts.
+    """
+
+    def __init__(self):
+        self.spo: Dict[str, Dict[str, Set[str]]] = defaultdict(lambda: defaultdict(set))
+        self.pos: Dict[str, Dict[str, Set[str]]] = defaultdict(lambda: defaultdict(set))
+        self.osp: Dict[str, Dict[str, Set[str]]] = defaultdict(lambda: defaultdict(set))
+        self.attrs: Dict[Fact, Dict[str, Any]] = {}
+        # normalized → {label: number of fact positions using it}
+        self.aliases: Dict[str, Counter] = defaultdict(Counter)
+        self.count = 0
+
+    # ---------------- building ----------------
+    @classmethod
+    def from_graph(cls, G: nx.MultiDiGraph) -> "KGIndex":
+        index = cls()
+        for u, v, attrs in G.edges(data=True):
+            index.add_fact(u, attrs.get("predicate", ""), v, attrs)
+        return index
+
+    def add_fact(self, s: str, p: str, o: str, attrs: Dict[str, Any] = None):
+        fact = (s, p, o)
+        if fact not in self.attrs:
+            self.spo[s][p].add(o)
+            self.pos[p][o].add(s)
+            self.osp[o][s].add(p)
+            for label in fact:
+                self.aliases[_key(label)][label] += 1
+            self.count += 1
+        self.attrs[fact] = dict(attrs or {})
+
+    def remove_fact(self, s: str, p: str, o: str):
+        fact = (s, p, o)
+        if fact not in self.attrs:
+            return
+        del self.attrs[fact]
+        self.count -= 1
+
+        for index, a, b, c in ((self.spo, s, p, o), (self.pos, p, o, s), (self.osp, o, s, p)):
+            index[a][b].discard(c)
+            if not index[a][b]:
+                del index[a][b]
+            if not index[a]:
+                del index[a]
+
+        for label in fact:
+            key = _key(label)
+            labels = self.aliases[key]
+            labels[label] -= 1
+            if labels[label] <= 0:
+                del labels[label]
+            if not labels:
+                del self.aliases[key]
+
+    # ---------------- lookup ----------------
+    def resolve(self, label: Optional[str]) -> Optional[Set[str]]:
+        """
+        Maps a user label to the stored labels it matches.
+        None means wildcard; an empty set means no match.
+        """
+        if label in WILDCARDS:
+            return None
+        if label in self.spo or label in self.pos or label in self.osp:
+            return {label}
+        return set(self.aliases.get(_key(label), ()))
+
+    def iter_match(self, s: Optional[str] = None, p: Optional[str] = None, o: Optional[str] = None) -> Iterator[Fact]:
+        """
+        Yields facts matching the pattern (None / "?" / "*" = wildcard).
+        """
+        S, P, O = self.resolve(s), self.resolve(p), self.resolve(o)
+
+        if S is not None:
+            for s_ in S:
+                for p_, objects in self.spo.get(s_, {}).items():
+                    if P is not None and p_ not in P:
+                        continue
+                    for o_ in (objects & O if O is not None else objects):
+                        yield (s_, p_, o_)
+        elif P is not None:
+            for p_ in P:
+                for o_, subjects in self.pos.get(p_, {}).items():
+                    if O is not None and o_ not in O:
+                        continue
+                    for s_ in subjects:
+                        yield (s_, p_, o_)
+        elif O is not None:
+            for o_ in O:
+                for s_, predicates in self.osp.get(o_, {}).items():
+                    for p_ in predicates:
+                        yield (s_, p_, o_)
+        else:
+            yield from self.attrs.keys()
+
+    def count_match(self, s: Optional[str] = None, p: Optional[str] = None, o: Optional[str] = None) -> int:
+        S, P, O = self.resolve(s), self.resolve(p), self.resolve(o)
+
+        # Fast counts for the common single-bound patterns
+        if S is not None and P is None and O is None:
+            return sum(len(objs) for s_ in S for objs in self.spo.get(s_, {}).values())
+        if P is not None and S is None and O is None:
+            return sum(len(subs) for p_ in P for subs in self.pos.get(p_, {}).values())
+        if O is not None and S is None and P is None:
+            return sum(len(preds) for o_ in O for preds in self.osp.get(o_, {}).values())
+        if S is None and P is None and O is None:
+            return self.count
+
+        return sum(1 for _ in self.iter_match(s, p, o))
+
+    def fact_dict(self, fact: Fact) -> Dict[str, Any]:
+        s, p, o = fact
+        attrs = self.attrs.get(fact, {})
+        return {
+            **{k: v for k, v in attrs.items() if k not in ("label", "predicate")},
+            "subject": s,
+            "predicate": p,
+            "object": o,
+        }
+
+    def match(
+        self,
+        s: Optional[str] = None,
+        p: Optional[str] = None,
+        o: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 100
+    ) -> Dict[str, Any]:
+        """
+        Paged pattern query.
+        Returns {"total", "offset", "limit", "results": [fact dicts]}.
+        """
+        facts = islice(self.iter_match(s, p, o), offset, offset + limit)
+        return {
+            "total": self.count_match(s, p, o),
+            "offset": offset,
+            "limit": limit,
+            "results": [self.fact_dict(f) for f in facts],
+        }
+
+    def neighborhood(
+        self,
+        node: str,
+        hops: int = 1,
+        predicate: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 200
+    ) -> Dict[str, Any]:
+        """
+        Facts within `hops` (1 or 2) of `node`, following edges in both
+        directions. Optional predicate filter, paged like match().
+        """
+        hops = max(1, min(int(hops), 2))
+        P = self.resolve(predicate)
+
+        frontier = self.resolve(node) or set()
+        seen_nodes = set(frontier)
+        facts: List[Fact] = []
+        seen_facts: Set[Fact] = set()
+
+        for _ in range(hops):
+            next_frontier = set()
+            for n in frontier:
+                for p_, objects in self.spo.get(n, {}).items():
+                    if P is not None and p_ not in P:
+                        continue
+                    for o_ in objects:
+                        fact = (n, p_, o_)
+                        if fact not in seen_facts:
+                            seen_facts.add(fact)
+                            facts.append(fact)
+                        next_frontier.add(o_)
+                for s_, predicates in self.osp.get(n, {}).items():
+                    for p_ in predicates:
+                        if P is not None and p_ not in P:
+                            continue
+                        fact = (s_, p_, n)
+                        if fact not in seen_facts:
+                            seen_facts.add(fact)
+                            facts.append(fact)
+                        next_frontier.add(s_)
+            frontier = next_frontier - seen_nodes
+            seen_nodes |= next_frontier
+
+        return {
+            "total": len(facts),
+            "nodes": len(seen_nodes),
+            "offset": offset,
+            "limit": limit,
+            "results": [self.fact_dict(f) for f in facts[offset:offset + limit]],
+        }
+
+
+# ------------------------------------------------------
+# Module Test
+# ------------------------------------------------------
+if __name__ == "__main__":
+    from kg.graph_builder import build_graph_from_triples
+
+    triples = [
+        {"subject": "احداث ايلول", "predicate": "occurredIn", "object": "عمان", "span": "..."},
+        {"subject": "احداث ايلول", "predicate": "hasParticipant", "object": "الجيش الاردني", "span": "..."},
+        {"subject": "معركه الكرامه", "predicate": "hasParticipant", "object": "الجيش الاردني", "span": "..."},
+    ]
+    index = KGIndex.from_graph(build_graph_from_triples(triples, "event", "dbo:Event"))
+
+    print(index.match(p="occurredIn", o="عمّان"))
+    print(index.neighborhood("معركه الكرامه", hops=2))
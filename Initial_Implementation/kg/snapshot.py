@@ -0,0 +1,550 @@
+"""
+snapshot.py
+-------------------
+Compact binary snapshot of the merged knowledge graph.
+
+Layout (one folder):
+- meta.json          counts, column names, dtypes, graph attributes
+- strings.bin        zlib-compressed string dictionary ("\0"-separated,
+                     ID 0 = attribute not set)
+- nodes.<attr>.npy   one ID column per node attribute (ID of the label, theme, ...)
+- edges.src.npy      edge endpoints as node row numbers
+- edges.dst.npy
+- edges._key.npy     edge keys (MultiDiGraph)
+- edges.<attr>.npy   one column per edge attribute (predicate, span, source, ...)
+- edges.prov_*.npy   edge provenance as CSR columns: offsets plus one ID
+                     column per field (source, span, theme, tbox), used
+                     to rebuild the provenance lists and for subsets that
+                     include facts mentioned by several documents
+
+Attribute columns are typed (meta.json "kinds"):
+- str         ID into the string dictionary (0 = not set)
+- int, float, bool
+              native NumPy column (set on every row)
+- list        list of strings: flat ID column + <attr>.offsets.npy
+- json        anything else, as the ID of a JSON string; decoded once
+              per distinct value
+
+Edge sources / themes / count are not stored when the provenance is:
+they are derived from it on load (IncrementalGraph rebuilds them anyway).
+
+ID columns use the narrowest unsigned dtype that fits. All columns are
+plain .npy files so they can be memory-mapped on load (np.load mmap_mode).
+Reading a snapshot costs one decompression of the string dictionary;
+building the NetworkX graph is done only for the rows actually needed
+(e.g. a subset of source files or themes), and no value is parsed more
+than once per distinct string.
+
+GEXF / GraphML (graph_builder.export_graph) remain the exchange formats.
+"""
+
+import json
+import os
+import shutil
+import time
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+import networkx as nx
+import numpy as np
+
+
+SNAPSHOT_DIR = os.path.join("triples", "kg_snapshot")
+SNAPSHOT_FORMAT = 3
+SEPARATOR = "\0"
+
+# Provenance fields indexed for subset loading
+PROVENANCE_INDEX = ("source", "theme")
+
+# Edge attributes derived from the provenance (see IncrementalGraph._refresh_edge)
+DERIVED_EDGE_ATTRS = ("count", "sources", "themes")
+
+NATIVE_DTYPES = {"int": np.int64, "float": np.float64, "bool": np.bool_}
+
+
+# ------------------------------------------------------
+# Helpers
+# ------------------------------------------------------
+def _narrow(ids: np.ndarray) -> np.ndarray:
+    """Smallest unsigned dtype that can hold every ID."""
+    top = int(ids.max()) if len(ids) else 0
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if top <= np.iinfo(dtype).max:
+            return ids.astype(dtype, copy=False)
+    return ids.astype(np.uint64, copy=False)
+
+
+def _kind(values: List[Any]) -> str:
+    """
+    Storage kind of one attribute given its value on every row
+    (None where the row does not set it).
+    """
+    present = [v for v in values if v is not None]
+    if all(isinstance(v, str) for v in present):
+        return "str"
+    if len(present) < len(values):
+        return "json"
+    if all(isinstance(v, bool) for v in present):
+        return "bool"
+    if all(isinstance(v, int) and not isinstance(v, bool) for v in present):
+        return "int"
+    if all(isinstance(v, float) for v in present):
+        return "float"
+    if all(isinstance(v, list) and all(isinstance(x, str) for x in v) for v in present):
+        return "list"
+    return "json"
+
+
+def _offsets(lengths: Iterable[int], count: int) -> np.ndarray:
+    lengths = np.fromiter(lengths, dtype=np.int64, count=count)
+    return np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+
+
+def _ranges(offsets: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """Flat positions of the [offsets[r], offsets[r + 1]) ranges of `rows`."""
+    starts = offsets[rows]
+    lengths = offsets[rows + 1] - starts
+    if not lengths.sum():
+        return np.zeros(0, dtype=np.int64)
+    shift = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+    return shift + np.arange(int(lengths.sum()))
+
+
+def _split(values: List[Any], offsets: np.ndarray) -> List[List[Any]]:
+    """Flat values → one fresh list per [offsets[i], offsets[i + 1]) range."""
+    bounds = offsets.tolist()
+    return [values[a:b] for a, b in zip(bounds, bounds[1:])]
+
+
+def _rows(columns: Dict[str, List[Any]], count: int) -> Iterable[Dict[str, Any]]:
+    """Column lists → one attribute dict per row (unset values left out)."""
+    keys = list(columns)
+    values = [columns[k] for k in keys]
+    if not values:
+        return ({} for _ in range(count))
+    if all(None not in column for column in values):
+        return (dict(zip(keys, row)) for row in zip(*values))
+    return ({k: x for k, x in zip(keys, row) if x is not None} for row in zip(*values))
+
+
+def _plain_provenance(values: List[Any]) -> bool:
+    """Every row holds a list of flat {field: str} provenance entries."""
+    return all(
+        isinstance(p, list) and all(
+            isinstance(e, dict) and all(isinstance(x, str) or x is None for x in e.values())
+            for e in p
+        )
+        for p in values
+    )
+
+
+def _as_values(value: Union[None, str, Iterable[str]]) -> Optional[List[str]]:
+    if value is None:
+        return None
+    return [value] if isinstance(value, str) else list(value)
+
+
+class _Interner:
+    """Minimal string → ID table used while writing (0 = missing)."""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.strings: List[str] = [""]
+
+    def column(self, values: Iterable[Any], as_json: bool = False) -> np.ndarray:
+        ids, strings = self.ids, self.strings
+        out = []
+        for v in values:
+            if v is None:
+                out.append(0)
+                continue
+            if as_json:
+                v = json.dumps(v, ensure_ascii=False)
+            v = str(v).replace(SEPARATOR, "")
+            i = ids.get(v)
+            if i is None:
+                i = ids[v] = len(strings)
+                strings.append(v)
+            out.append(i)
+        return _narrow(np.asarray(out, dtype=np.int64))
+
+
+def _write_attrs(
+    columns: Dict[str, np.ndarray],
+    strings: _Interner,
+    prefix: str,
+    records: List[Dict[str, Any]],
+    names: List[str]
+) -> Dict[str, str]:
+    """Adds one typed column per attribute; returns {attr: kind}."""
+    kinds = {}
+    for key in names:
+        values = [a.get(key) for a in records]
+        kind = kinds[key] = _kind(values)
+        name = f"{prefix}.{key}"
+        if kind in NATIVE_DTYPES:
+            columns[name] = np.asarray(values, dtype=NATIVE_DTYPES[kind])
+        elif kind == "list":
+            columns[name] = strings.column(x for v in values for x in v)
+            columns[f"{name}.offsets"] = _offsets((len(v) for v in values), len(values))
+        else:
+            columns[name] = strings.column(values, kind == "json")
+    return kinds
+
+
+# ------------------------------------------------------
+# Writing
+# ------------------------------------------------------
+def save_snapshot(G: nx.DiGraph, folder: str = SNAPSHOT_DIR, level: int = 6) -> Dict[str, Any]:
+    """
+    Writes G as a binary snapshot. The folder is replaced atomically.
+    Returns {"path", "bytes", "nodes", "edges", "seconds"}.
+    """
+    start = time.perf_counter()
+    strings = _Interner()
+
+    nodes = list(G.nodes())
+    row = {n: i for i, n in enumerate(nodes)}
+    node_data = [G.nodes[n] for n in nodes]
+    node_attrs = sorted({k for a in node_data for k in a})
+
+    columns: Dict[str, np.ndarray] = {"nodes.id": strings.column(nodes)}
+    node_kinds = _write_attrs(columns, strings, "nodes", node_data, node_attrs)
+
+    multigraph = G.is_multigraph()
+    if multigraph:
+        edges = list(G.edges(keys=True, data=True))
+    else:
+        edges = [(u, v, None, a) for u, v, a in G.edges(data=True)]
+    edge_data = [a for _, _, _, a in edges]
+    edge_attrs = sorted({k for a in edge_data for k in a})
+
+    columns["edges.src"] = _narrow(np.fromiter((row[e[0]] for e in edges), dtype=np.int64, count=len(edges)))
+    columns["edges.dst"] = _narrow(np.fromiter((row[e[1]] for e in edges), dtype=np.int64, count=len(edges)))
+    json_keys = multigraph and any(e[2] is not None and not isinstance(e[2], str) for e in edges)
+    if multigraph:
+        columns["edges._key"] = strings.column((e[2] for e in edges), json_keys)
+
+    # Provenance as CSR columns; the aggregates derived from it are dropped
+    provenance_fields: List[str] = []
+    derived: List[str] = []
+    if edge_data and "provenance" in edge_attrs:
+        provenance = [a.get("provenance") for a in edge_data]
+        if _plain_provenance(provenance):
+            entries = [entry for p in provenance for entry in p]
+            provenance_fields = sorted({k for entry in entries for k in entry} | set(PROVENANCE_INDEX))
+            columns["edges.prov_offsets"] = _offsets((len(p) for p in provenance), len(provenance))
+            for field in provenance_fields:
+                columns[f"edges.prov_{field}"] = strings.column(entry.get(field) for entry in entries)
+            derived = [k for k in DERIVED_EDGE_ATTRS if k in edge_attrs]
+            # Flat source / span / ... that repeat the first provenance entry
+            first = [p[0] if p else {} for p in provenance]
+            derived += [
+                f for f in provenance_fields
+                if f in edge_attrs and all(a.get(f) == e.get(f) for a, e in zip(edge_data, first))
+            ]
+            edge_attrs = [k for k in edge_attrs if k != "provenance" and k not in derived]
+    edge_kinds = _write_attrs(columns, strings, "edges", edge_data, edge_attrs)
+
+    tmp = folder.rstrip("/\\") + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    for name, col in columns.items():
+        np.save(os.path.join(tmp, f"{name}.npy"), col, allow_pickle=False)
+
+    blob = zlib.compress(SEPARATOR.join(strings.strings).encode("utf-8"), level)
+    with open(os.path.join(tmp, "strings.bin"), "wb") as f:
+        f.write(blob)
+
+    meta = {
+        "format": SNAPSHOT_FORMAT,
+        "directed": G.is_directed(),
+        "multigraph": multigraph,
+        "nodes": len(nodes),
+        "edges": len(edges),
+        "strings": len(strings.strings),
+        "kinds": {"nodes": node_kinds, "edges": edge_kinds},
+        "json_keys": json_keys,
+        "provenance_fields": provenance_fields,
+        "derived_edge_attrs": derived,
+        "graph": {k: v for k, v in G.graph.items() if isinstance(v, (str, int, float, bool))},
+    }
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    # Swap in the new snapshot
+    old = folder.rstrip("/\\") + ".old"
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.exists(folder):
+        os.replace(folder, old)
+    os.replace(tmp, folder)
+    shutil.rmtree(old, ignore_errors=True)
+
+    size = sum(os.path.getsize(os.path.join(folder, f)) for f in os.listdir(folder))
+    return {
+        "path": folder,
+        "bytes": size,
+        "nodes": len(nodes),
+        "edges": len(edges),
+        "seconds": round(time.perf_counter() - start, 4),
+    }
+
+
+# ------------------------------------------------------
+# Reading
+# ------------------------------------------------------
+class KGSnapshot:
+    """
+    Loaded snapshot: decoded string dictionary + (memory-mapped) columns.
+    """
+
+    def __init__(self, folder: str = SNAPSHOT_DIR, mmap: bool = True):
+        self.folder = folder
+        with open(os.path.join(folder, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(f"❌ Unsupported snapshot format: {self.meta.get('format')}")
+
+        with open(os.path.join(folder, "strings.bin"), "rb") as f:
+            self.strings: List[str] = zlib.decompress(f.read()).decode("utf-8").split(SEPARATOR)
+        self._ids: Optional[Dict[str, int]] = None
+
+        mode = "r" if mmap else None
+        names = ["nodes.id", "edges.src", "edges.dst"]
+        for prefix in ("nodes", "edges"):
+            for key, kind in self.meta["kinds"][prefix].items():
+                names.append(f"{prefix}.{key}")
+                if kind == "list":
+                    names.append(f"{prefix}.{key}.offsets")
+        if self.meta.get("multigraph"):
+            names.append("edges._key")
+        if self.meta["provenance_fields"]:
+            names.append("edges.prov_offsets")
+            names += [f"edges.prov_{f}" for f in self.meta["provenance_fields"]]
+        self.columns: Dict[str, np.ndarray] = {
+            name: np.load(os.path.join(folder, f"{name}.npy"), mmap_mode=mode, allow_pickle=False)
+            for name in names
+        }
+
+    @property
+    def num_nodes(self) -> int:
+        return self.meta["nodes"]
+
+    @property
+    def num_edges(self) -> int:
+        return self.meta["edges"]
+
+    def string_id(self, s: str) -> int:
+        """ID of a string in the dictionary, or -1."""
+        if self._ids is None:
+            self._ids = {v: i for i, v in enumerate(self.strings) if i}
+        return self._ids.get(s, -1)
+
+    def _decode(self, column: np.ndarray, as_json: bool = False) -> List[Any]:
+        """IDs → strings (None where the attribute was not set)."""
+        strings = self.strings
+        ids = np.asarray(column)
+        if not as_json:
+            return [strings[i] if i else None for i in ids.tolist()]
+
+        # JSON is parsed once per distinct value; lists and dicts are
+        # mutable, so rows sharing one get their own copy
+        distinct, inverse = np.unique(ids, return_inverse=True)
+        values = [json.loads(strings[i]) if i else None for i in distinct.tolist()]
+        mutable = [isinstance(v, (list, dict)) for v in values]
+        if not any(mutable):
+            return [values[j] for j in inverse.tolist()]
+        texts = [strings[i] for i in distinct.tolist()]
+        return [json.loads(texts[j]) if mutable[j] else values[j] for j in inverse.tolist()]
+
+    def _attrs(self, prefix: str, rows: Optional[np.ndarray]) -> Dict[str, List[Any]]:
+        """{attr: value per selected row} for one side (nodes / edges)."""
+        out = {}
+        for key, kind in self.meta["kinds"][prefix].items():
+            column = self.columns[f"{prefix}.{key}"]
+            if kind in NATIVE_DTYPES:
+                out[key] = np.asarray(column if rows is None else column[rows]).tolist()
+            elif kind == "list":
+                offsets = np.asarray(self.columns[f"{prefix}.{key}.offsets"])
+                if rows is None:
+                    flat, bounds = column, offsets
+                else:
+                    flat = column[_ranges(offsets, rows)]
+                    bounds = _offsets((offsets[rows + 1] - offsets[rows]).tolist(), len(rows))
+                out[key] = _split(self._decode(flat), bounds)
+            else:
+                out[key] = self._decode(column if rows is None else column[rows], kind == "json")
+        return out
+
+    def _provenance(self, rows: Optional[np.ndarray]) -> List[List[Dict[str, str]]]:
+        """Provenance list per selected edge, rebuilt from the CSR columns."""
+        offsets = np.asarray(self.columns["edges.prov_offsets"])
+        if rows is None:
+            positions, bounds = None, offsets
+        else:
+            positions = _ranges(offsets, rows)
+            bounds = _offsets((offsets[rows + 1] - offsets[rows]).tolist(), len(rows))
+
+        fields = self.meta["provenance_fields"]
+        values = []
+        for f in fields:
+            column = self.columns[f"edges.prov_{f}"]
+            values.append(self._decode(column if positions is None else column[positions]))
+        if all(None not in v for v in values):
+            entries = [dict(zip(fields, entry)) for entry in zip(*values)]
+        else:
+            entries = [
+                {f: x for f, x in zip(fields, entry) if x is not None}
+                for entry in zip(*values)
+            ]
+        return _split(entries, bounds)
+
+    # ---------------- subsets ----------------
+    def edge_mask(
+        self,
+        source: Union[None, str, Iterable[str]] = None,
+        theme: Union[None, str, Iterable[str]] = None
+    ) -> np.ndarray:
+        """
+        Boolean mask over edges whose source file / theme is in the given
+        value(s) — in the edge attribute or any provenance entry.
+        None means no restriction.
+        """
+        mask = np.ones(self.num_edges, dtype=bool)
+        for attr, values in (("source", _as_values(source)), ("theme", _as_values(theme))):
+            if values is None:
+                continue
+            ids = [i for i in (self.string_id(v) for v in values) if i >= 0]
+
+            hit = np.zeros(self.num_edges, dtype=bool)
+            if self.meta["kinds"]["edges"].get(attr) == "str":
+                hit |= np.isin(self.columns[f"edges.{attr}"], ids)
+
+            prov = self.columns.get(f"edges.prov_{attr}")
+            if prov is not None and len(prov):
+                offsets = self.columns["edges.prov_offsets"]
+                per_entry = np.isin(prov, ids)
+                # Any matching entry within each edge's [start, end) range
+                before = np.concatenate([[0], np.cumsum(per_entry)])
+                hit |= (before[offsets[1:]] - before[offsets[:-1]]) > 0
+
+            mask &= hit
+        return mask
+
+    # ---------------- materialization ----------------
+    def to_graph(
+        self,
+        source: Union[None, str, Iterable[str]] = None,
+        theme: Union[None, str, Iterable[str]] = None,
+        aggregates: bool = True
+    ) -> nx.DiGraph:
+        """
+        Builds the NetworkX graph, optionally restricted to edges from the
+        given source file(s) / theme(s) and the nodes they touch.
+
+        aggregates=False skips deriving the edge sources / themes / count
+        from the provenance, for callers that rebuild them anyway
+        (IncrementalGraph).
+        """
+        if self.meta.get("multigraph"):
+            G = nx.MultiDiGraph() if self.meta.get("directed", True) else nx.MultiGraph()
+        else:
+            G = nx.DiGraph() if self.meta.get("directed", True) else nx.Graph()
+        G.graph.update(self.meta.get("graph", {}))
+
+        restricted = source is not None or theme is not None
+        edge_rows = np.flatnonzero(self.edge_mask(source, theme)) if restricted else None
+
+        src = self.columns["edges.src"]
+        dst = self.columns["edges.dst"]
+        if edge_rows is not None:
+            src, dst = src[edge_rows], dst[edge_rows]
+            node_rows = np.unique(np.concatenate([src, dst]))
+        else:
+            node_rows = None
+
+        # Nodes
+        node_ids = np.asarray(self.columns["nodes.id"])
+        labels = self._decode(node_ids if node_rows is None else node_ids[node_rows])
+        node_cols = self._attrs("nodes", node_rows)
+        G.add_nodes_from(zip(labels, _rows(node_cols, len(labels))))
+
+        # Edges (endpoints are node rows → labels)
+        all_labels = self.strings
+        us = [all_labels[i] for i in node_ids[src].tolist()]
+        vs = [all_labels[i] for i in node_ids[dst].tolist()]
+
+        edge_cols = self._attrs("edges", edge_rows)
+        if self.meta["provenance_fields"]:
+            provenance = edge_cols["provenance"] = self._provenance(edge_rows)
+            derived = [k for k in self.meta["derived_edge_attrs"] if k in DERIVED_EDGE_ATTRS]
+
+            # Flat fields: the first provenance entry of each edge
+            offsets = np.asarray(self.columns["edges.prov_offsets"])
+            starts = offsets[:-1] if edge_rows is None else offsets[edge_rows]
+            empty = (offsets[1:] if edge_rows is None else offsets[edge_rows + 1]) == starts
+            for field in self.meta["derived_edge_attrs"]:
+                if field in DERIVED_EDGE_ATTRS:
+                    continue
+                ids = np.zeros(len(starts), dtype=np.int64)
+                ids[~empty] = self.columns[f"edges.prov_{field}"][starts[~empty]]
+                edge_cols[field] = self._decode(ids)
+
+            if aggregates and derived:
+                sources = [sorted({p["source"] for p in entries if p.get("source")}) for entries in provenance]
+                derived_cols = {
+                    "sources": sources,
+                    "themes": [sorted({p["theme"] for p in entries if p.get("theme")}) for entries in provenance],
+                    "count": [len(entries) for entries in provenance],
+                }
+                edge_cols.update({k: derived_cols[k] for k in derived})
+        attrs = _rows(edge_cols, len(us))
+
+        if G.is_multigraph():
+            key_column = self.columns["edges._key"]
+            edge_keys = self._decode(
+                key_column if edge_rows is None else key_column[edge_rows], self.meta.get("json_keys", False)
+            )
+            G.add_edges_from(zip(us, vs, edge_keys, attrs))
+        else:
+            G.add_edges_from(zip(us, vs, attrs))
+
+        return G
+
+
+def load_snapshot(folder: str = SNAPSHOT_DIR, mmap: bool = True) -> KGSnapshot:
+    """
+    Opens a snapshot written by save_snapshot (columns memory-mapped).
+    """
+    return KGSnapshot(folder, mmap=mmap)
+
+
+def snapshot_exists(folder: str = SNAPSHOT_DIR) -> bool:
+    return os.path.exists(os.path.join(folder, "meta.json"))
+
+
+# ------------------------------------------------------
+# Module Test
+# ------------------------------------------------------
+if __name__ == "__main__":
+    import tempfile
+    from kg.graph_builder import build_graph_from_triples, merge_graphs
+
+    G = merge_graphs([
+        build_graph_from_triples(
+            [{"subject": "معركة الكرامة", "predicate": "occurredIn", "object": "الكرامة", "span": "..."}],
+            "event", "dbo:Event", source_file="a.pdf"
+        ),
+        build_graph_from_triples(
+            [{"subject": "مهرجان جرش", "predicate": "heldIn", "object": "جرش", "span": "..."}],
+            "cultural", "dbo:Event", source_file="b.pdf"
+        ),
+    ])
+
+    folder = os.path.join(tempfile.mkdtemp(), "kg_snapshot")
+    print("Saved:", save_snapshot(G, folder))
+
+    snap = load_snapshot(folder)
+    print("Full:", snap.to_graph().edges(data=True))
+    print("b.pdf only:", snap.to_graph(source="b.pdf").edges(data=True))
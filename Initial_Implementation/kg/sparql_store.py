@@ -0,0 +1,396 @@
+"""
+sparql_store.py
+-------------------
+Persistent, indexed RDF store with a local SPARQL query interface.
+
+Backend:
+- pyoxigraph (embedded, on-disk, SPO/POS/OSP-indexed store) when installed
+- rdflib Dataset fallback:
+  - on-disk BerkeleyDB store when the berkeleydb package is installed
+    (opening it re-parses nothing)
+  - otherwise in memory, backed by one N-Triples file per source document
+    (a load only rewrites its own document; the files are parsed in the
+    background when the store is opened)
+
+Exported files are loaded incrementally: each source document gets its
+own named graph, and re-loading a document replaces only that graph.
+Queries run over the union of all document graphs, with a timeout, and
+results are produced as a stream of JSON-ready rows.
+"""
+
+import gzip
+import os
+import queue
+import shutil
+import threading
+import time
+import urllib.parse
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import pyoxigraph as ox
+except ImportError:  # optional dependency
+    ox = None
+
+
+STORE_PATH = os.path.join("triples", "rdf_store")
+SOURCE_GRAPH_BASE = "http://example.org/source/"
+
+# Export extension → format name (N-Triples preferred: fastest to parse)
+LOAD_PREFERENCE = ["nt", "ttl", "jsonld"]
+
+# How often a blocked query worker re-checks for cancellation (seconds)
+CANCEL_POLL = 0.1
+
+
+def source_graph_iri(doc_id: str) -> str:
+    """Named graph IRI for a source document."""
+    return SOURCE_GRAPH_BASE + urllib.parse.quote(doc_id, safe="")
+
+
+# ------------------------------------------------------
+# Term conversion (SPARQL 1.1 JSON results style)
+# ------------------------------------------------------
+def _term_json(term) -> Optional[Dict[str, str]]:
+    if term is None:
+        return None
+
+    if ox is not None and isinstance(term, ox.Literal):
+        out = {"type": "literal", "value": term.value}
+        if term.language:
+            out["xml:lang"] = term.language
+        elif term.datatype and term.datatype.value != "http://www.w3.org/2001/XMLSchema#string":
+            out["datatype"] = term.datatype.value
+        return out
+    if ox is not None and isinstance(term, ox.BlankNode):
+        return {"type": "bnode", "value": term.value}
+    if ox is not None and isinstance(term, ox.NamedNode):
+        return {"type": "uri", "value": term.value}
+
+    # rdflib terms
+    from rdflib import Literal, BNode
+    if isinstance(term, Literal):
+        out = {"type": "literal", "value": str(term)}
+        if term.language:
+            out["xml:lang"] = term.language
+        elif term.datatype:
+            out["datatype"] = str(term.datatype)
+        return out
+    if isinstance(term, BNode):
+        return {"type": "bnode", "value": str(term)}
+    return {"type": "uri", "value": str(term)}
+
+
+# ------------------------------------------------------
+# Store
+# ------------------------------------------------------
+class SparqlStore:
+    """
+    Persistent RDF store keyed by source document.
+    """
+
+    def __init__(self, path: str = STORE_PATH):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.Lock()
+        self._version = 0          # bumped by every load / remove (rdflib backend)
+        self._open_error: Optional[Exception] = None
+
+        if ox is not None:
+            self.backend = "oxigraph"
+            self.store = ox.Store(path)
+            return
+
+        from rdflib import Dataset
+        from rdflib.plugins.stores.berkeleydb import has_bsddb
+        self.backend = "rdflib"
+        self.persistent = has_bsddb
+
+        if self.persistent:
+            self.store = Dataset(store="BerkeleyDB", default_union=True)
+            self.store.open(os.path.join(path, "bdb"), create=True)
+            return
+
+        self.store = Dataset(default_union=True)
+        self._graphs_dir = os.path.join(path, "graphs")
+        os.makedirs(self._graphs_dir, exist_ok=True)
+
+        # Parsing is the slow part of opening: it runs in the background
+        # holding the store lock, so loads and queries wait for it
+        self._lock.acquire()
+        threading.Thread(target=self._read_graph_files, name="sparql-open", daemon=True).start()
+
+    def _read_graph_files(self):
+        """Fills the in-memory Dataset from the per-document files, then releases the lock."""
+        from rdflib import URIRef
+        try:
+            # Stores written before per-document files: split once
+            legacy = os.path.join(self.path, "store.nq")
+            if os.path.exists(legacy):
+                self.store.parse(legacy, format="nquads")
+                for g in list(self.store.graphs()):
+                    if str(g.identifier).startswith(SOURCE_GRAPH_BASE):
+                        g.serialize(self._graph_file(str(g.identifier)), format="nt", encoding="utf-8")
+                os.remove(legacy)
+            else:
+                for name in os.listdir(self._graphs_dir):
+                    if name.endswith(".nt"):
+                        graph_iri = SOURCE_GRAPH_BASE + name[:-3]
+                        self.store.graph(URIRef(graph_iri)).parse(
+                            os.path.join(self._graphs_dir, name), format="nt"
+                        )
+        except Exception as e:  # raised again by every later call
+            self._open_error = e
+        finally:
+            self._lock.release()
+
+    def _check_open(self):
+        """Caller holds the lock."""
+        if self._open_error is not None:
+            raise RuntimeError(f"❌ Could not open the RDF store: {self._open_error}")
+
+    def _graph_file(self, graph_iri: str) -> str:
+        """On-disk N-Triples file of one named graph (rdflib backend)."""
+        return os.path.join(self._graphs_dir, graph_iri[len(SOURCE_GRAPH_BASE):] + ".nt")
+
+    # ---------------- loading ----------------
+    def load_source(self, doc_id: str, file_path: str) -> int:
+        """
+        Replaces the named graph of `doc_id` with the triples in file_path
+        (format guessed from the extension, ".gz" files are decompressed
+        on the fly). Returns the graph size.
+        """
+        graph_iri = source_graph_iri(doc_id)
+        compressed = file_path.lower().endswith(".gz")
+        name = file_path[:-3] if compressed else file_path
+        ext = name.rsplit(".", 1)[-1].lower()
+
+        with self._lock:
+            if self.backend == "oxigraph":
+                graph = ox.NamedNode(graph_iri)
+                fmt = {
+                    "nt": ox.RdfFormat.N_TRIPLES,
+                    "ttl": ox.RdfFormat.TURTLE,
+                    "jsonld": ox.RdfFormat.JSON_LD,
+                }[ext]
+                if self.store.contains_named_graph(graph):
+                    self.store.remove_graph(graph)
+                if compressed:
+                    with gzip.open(file_path, "rb") as f:
+                        self.store.bulk_load(input=f, format=fmt, to_graph=graph)
+                else:
+                    self.store.bulk_load(path=file_path, format=fmt, to_graph=graph)
+                self.store.flush()
+                return sum(1 for _ in self.store.quads_for_pattern(None, None, None, graph))
+
+            from rdflib import URIRef
+            self._check_open()
+            self._version += 1
+            fmt = {"nt": "nt", "ttl": "turtle", "jsonld": "json-ld"}[ext]
+            self.store.remove_graph(URIRef(graph_iri))
+            graph = self.store.graph(URIRef(graph_iri))
+            if compressed:
+                with gzip.open(file_path, "rb") as f:
+                    graph.parse(f, format=fmt)
+            else:
+                graph.parse(file_path, format=fmt)
+
+            if self.persistent:
+                self.store.store.sync()
+                return len(graph)
+
+            # Persist only this document's graph
+            target = self._graph_file(graph_iri)
+            if fmt == "nt" and not compressed:
+                shutil.copyfile(file_path, target)
+            else:
+                graph.serialize(target, format="nt", encoding="utf-8")
+            return len(graph)
+
+    def load_exported(self, doc_id: str, paths: Dict[str, str]) -> int:
+        """
+        Loads the best available file from an export_rdf() result.
+        """
+        for ext in LOAD_PREFERENCE:
+            path = paths.get(ext)
+            if isinstance(path, dict):
+                path = path.get("path")
+            if path and os.path.exists(path):
+                return self.load_source(doc_id, path)
+        raise ValueError(f"No loadable RDF file in {paths}")
+
+    def remove_source(self, doc_id: str):
+        graph_iri = source_graph_iri(doc_id)
+        with self._lock:
+            if self.backend == "oxigraph":
+                graph = ox.NamedNode(graph_iri)
+                if self.store.contains_named_graph(graph):
+                    self.store.remove_graph(graph)
+                self.store.flush()
+            else:
+                from rdflib import URIRef
+                self._check_open()
+                self._version += 1
+                self.store.remove_graph(URIRef(graph_iri))
+                if self.persistent:
+                    self.store.store.sync()
+                    return
+                target = self._graph_file(graph_iri)
+                if os.path.exists(target):
+                    os.remove(target)
+
+    def sources(self) -> List[str]:
+        if self.backend == "oxigraph":
+            graphs = [g.value for g in self.store.named_graphs()]
+        else:
+            with self._lock:
+                self._check_open()
+                graphs = [str(g.identifier) for g in self.store.graphs()]
+        return sorted(
+            urllib.parse.unquote(g[len(SOURCE_GRAPH_BASE):])
+            for g in graphs if g.startswith(SOURCE_GRAPH_BASE)
+        )
+
+    # ---------------- querying ----------------
+    def _iter_results(self, sparql: str, cancelled: Optional[threading.Event] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yields one JSON-ready dict per result row:
+        - SELECT    → {"head": [...]} first, then {var: term}
+        - ASK       → {"boolean": bool}
+        - CONSTRUCT → {"subject", "predicate", "object"}
+
+        Stops at the next row once `cancelled` is set. oxigraph queries
+        read a snapshot. The rdflib Dataset is not safe against concurrent
+        loads, so that backend takes the store lock per row (never across
+        a yield) and fails the query if a load / remove ran in between.
+        """
+        stop = cancelled.is_set if cancelled is not None else (lambda: False)
+
+        if self.backend == "oxigraph":
+            result = self.store.query(sparql, use_default_graph_as_union=True)
+
+            if isinstance(result, ox.QueryBoolean):
+                yield {"boolean": bool(result)}
+            elif isinstance(result, ox.QuerySolutions):
+                variables = [v.value for v in result.variables]
+                yield {"head": variables}
+                for solution in result:
+                    if stop():
+                        return
+                    yield {v: _term_json(solution[v]) for v in variables if solution[v] is not None}
+            else:
+                for triple in result:
+                    if stop():
+                        return
+                    yield {
+                        "subject": _term_json(triple.subject),
+                        "predicate": _term_json(triple.predicate),
+                        "object": _term_json(triple.object),
+                    }
+            return
+
+        with self._lock:
+            self._check_open()
+            version = self._version
+            # SELECT rows are evaluated lazily; ASK / CONSTRUCT here
+            result = self.store.query(sparql)
+
+        if result.type == "ASK":
+            yield {"boolean": bool(result.askAnswer)}
+            return
+
+        if result.type == "SELECT":
+            variables = [str(v) for v in result.vars]
+            yield {"head": variables}
+        rows = iter(result)
+        end = object()
+        while not stop():
+            with self._lock:
+                if self._version != version:
+                    raise RuntimeError("❌ RDF store changed during the query, run it again")
+                row = next(rows, end)
+            if row is end:
+                return
+            if result.type == "SELECT":
+                yield {v: _term_json(row[v]) for v in variables if row[v] is not None}
+            else:
+                s, p, o = row
+                yield {"subject": _term_json(s), "predicate": _term_json(p), "object": _term_json(o)}
+
+    def query(self, sparql: str, timeout: float = 10.0, max_rows: int = 10000) -> Iterator[Dict[str, Any]]:
+        """
+        Streams at most `max_rows` result rows (the SELECT head is not
+        counted). The query runs in a worker thread; if the rows are not
+        all produced before the overall `timeout` (seconds), TimeoutError
+        is raised. Closing the generator early, or a timeout, cancels the
+        worker at its next row even when nobody is reading the queue; no
+        store lock is held while it waits.
+        """
+        rows: "queue.Queue" = queue.Queue(maxsize=1000)
+        done = object()
+        cancelled = threading.Event()
+
+        def put(item) -> bool:
+            """Blocks until there is room or the query is cancelled."""
+            while not cancelled.is_set():
+                try:
+                    rows.put(item, timeout=CANCEL_POLL)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def worker():
+            results = self._iter_results(sparql, cancelled)
+            try:
+                count = 0
+                for row in results:
+                    if "head" not in row:
+                        if count >= max_rows:
+                            break
+                        count += 1
+                    if not put(row):
+                        return
+                put(done)
+            except Exception as e:  # surfaced to the consumer
+                put(e)
+            finally:
+                results.close()
+
+        threading.Thread(target=worker, name="sparql-query", daemon=True).start()
+        deadline = time.monotonic() + timeout
+
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"SPARQL query exceeded {timeout}s")
+                try:
+                    item = rows.get(timeout=remaining)
+                except queue.Empty:
+                    raise TimeoutError(f"SPARQL query exceeded {timeout}s")
+                if item is done:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            cancelled.set()
+
+
+# ------------------------------------------------------
+# Module Test
+# ------------------------------------------------------
+if __name__ == "__main__":
+    import tempfile
+
+    folder = tempfile.mkdtemp()
+    nt = os.path.join(folder, "graph.nt")
+    with open(nt, "w", encoding="utf-8") as f:
+        f.write('<http://example.org/resource/e1> <http://example.org/ontology/occurredIn> '
+                '<http://example.org/resource/amman> .\n')
+
+    store = SparqlStore(os.path.join(folder, "store"))
+    print("Loaded:", store.load_source("sample.pdf", nt), "→", store.sources())
+    for row in store.query("SELECT ?s ?o WHERE { ?s ?p ?o }"):
+        print(row)
@@ -0,0 +1,155 @@
+"""
+timeline.py
+-------------------
+Interval index over dated events (occurredOn facts) for timeline queries.
+
+Every (event, date) fact is parsed once into a day interval
+(pipeline/temporal.py) and stored in numpy arrays sorted by start day.
+A range query binary-searches the start array, so it only touches events
+that can overlap the range:
+
+    start ∈ [range_start - longest_interval, range_end]  and  end ≥ range_start
+
+Events can be filtered by place (occurredIn, Arabic-normalized labels).
+"""
+
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import networkx as nx
+import numpy as np
+
+from pipeline.temporal import DATE_PREDICATES, parse_date, interval_dict
+from pipeline.text_normalizer import clean_text
+
+
+PLACE_PREDICATES = {"occurredIn"}
+
+
+# ------------------------------------------------------
+# Index
+# ------------------------------------------------------
+class TimelineIndex:
+    """
+    Sorted-array interval index: one row per (event, date) fact.
+    """
+
+    def __init__(self, rows: List[tuple], places: Dict[str, Set[str]]):
+        rows.sort(key=lambda r: (r[0], r[1]))
+        self.starts = np.array([r[0] for r in rows], dtype=np.int64)
+        self.ends = np.array([r[1] for r in rows], dtype=np.int64)
+        self.precisions = [r[2] for r in rows]
+        self.events = [r[3] for r in rows]
+        self.dates = [r[4] for r in rows]
+        self.max_span = int((self.ends - self.starts).max()) if rows else 0
+
+        # place key → sorted row ids of the events that occurred there
+        event_rows = defaultdict(list)
+        for i, event in enumerate(self.events):
+            event_rows[event].append(i)
+        keys = {label: clean_text(label) for label in set().union(*places.values())}
+        self.place_rows: Dict[str, np.ndarray] = {}
+        self.event_places: Dict[str, List[str]] = {}
+        for event, labels in places.items():
+            if event not in event_rows:
+                continue
+            self.event_places[event] = sorted(labels)
+            for label in labels:
+                self.place_rows.setdefault(keys[label], []).extend(event_rows[event])
+        self.place_rows = {k: np.unique(v) for k, v in self.place_rows.items()}
+
+    @classmethod
+    def from_graph(cls, G: nx.MultiDiGraph) -> "TimelineIndex":
+        rows = []
+        places: Dict[str, Set[str]] = defaultdict(set)
+        for u, v, attrs in G.edges(data=True):
+            predicate = attrs.get("predicate", "")
+            if predicate in DATE_PREDICATES:
+                interval = parse_date(v)
+                if interval:
+                    rows.append((*interval, u, v))
+            elif predicate in PLACE_PREDICATES:
+                places[u].add(v)
+        # The same date can arrive from several documents (parallel edges)
+        return cls(list(set(rows)), places)
+
+    def __len__(self):
+        return len(self.events)
+
+    # ---------------- queries ----------------
+    def range_rows(self, start: int, end: int, place: Optional[str] = None) -> np.ndarray:
+        """Row ids of intervals overlapping [start, end] (day ordinals)."""
+        lo = np.searchsorted(self.starts, start - self.max_span, side="left")
+        hi = np.searchsorted(self.starts, end, side="right")
+        rows = lo + np.nonzero(self.ends[lo:hi] >= start)[0]
+
+        if place:
+            at_place = self.place_rows.get(clean_text(place))
+            if at_place is None:
+                return rows[:0]
+            rows = rows[np.isin(rows, at_place, assume_unique=True)]
+        return rows
+
+    def _bounds(self, start: Optional[str], end: Optional[str]) -> Tuple[int, int]:
+        """Day range for date mentions; a missing bound is open."""
+        lower = parse_date(start) if start else None
+        upper = parse_date(end) if end else None
+        if (start and not lower) or (end and not upper):
+            raise ValueError(f"❌ Unrecognized date: {start if start and not lower else end}")
+        return (
+            lower[0] if lower else int(self.starts.min(initial=1)),
+            upper[1] if upper else int(self.ends.max(initial=1))
+        )
+
+    def dated_outside(self, start: Optional[str] = None, end: Optional[str] = None) -> Set[str]:
+        """Events and date labels with no interval overlapping the range."""
+        rows = self.range_rows(*self._bounds(start, end))
+        inside = {self.events[i] for i in rows.tolist()} | {self.dates[i] for i in rows.tolist()}
+        return (set(self.events) | set(self.dates)) - inside
+
+    def query(
+        self,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        place: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 100
+    ) -> Dict[str, Any]:
+        """
+        Events overlapping [start, end] in chronological order. `start` /
+        `end` are any date mention parse_date() understands ("1967",
+        "حزيران 1967", ...); a missing bound is open.
+        """
+        rows = self.range_rows(*self._bounds(start, end), place)
+
+        results = []
+        for i in rows[offset:offset + limit].tolist():
+            results.append({
+                "event": self.events[i],
+                "date": self.dates[i],
+                **interval_dict((int(self.starts[i]), int(self.ends[i]), self.precisions[i])),
+                "places": self.event_places.get(self.events[i], [])
+            })
+
+        return {"total": len(rows), "offset": offset, "limit": limit, "results": results}
+
+
+# ------------------------------------------------------
+# Module Test
+# ------------------------------------------------------
+if __name__ == "__main__":
+    from kg.graph_builder import build_graph_from_triples
+
+    triples = [
+        {"subject": "حرب حزيران", "predicate": "occurredOn", "object": "5 حزيران 1967", "span": "..."},
+        {"subject": "حرب حزيران", "predicate": "occurredIn", "object": "الضفة الغربية", "span": "..."},
+        {"subject": "معركة الكرامة", "predicate": "occurredOn", "object": "1968-03-21", "span": "..."},
+        {"subject": "معركة الكرامة", "predicate": "occurredIn", "object": "الكرامة", "span": "..."},
+        {"subject": "أحداث أيلول", "predicate": "occurredOn", "object": "أيلول 1970", "span": "..."},
+        {"subject": "أحداث أيلول", "predicate": "occurredIn", "object": "عمان", "span": "..."},
+    ]
+    G = build_graph_from_triples(triples, "event", "dbo:Event", source_file="sample.pdf")
+    index = TimelineIndex.from_graph(G)
+
+    print(index.query("1967", "1971"))
+    print(index.query("1967", "1971", place="الضفه الغربيه"))
@@ -0,0 +1,317 @@
+"""
+triple_store.py
+-------------------
+Compact, column-oriented container for triples.
+
+Instead of a list of Python dicts, a TripleStore keeps:
+- one StringDictionary (every distinct string stored once → integer ID)
+- int32 NumPy columns: subject, predicate, object, span, theme, source
+- int32 offset columns: start, end  (-1 when unknown)
+
+Supports vectorized filter / dedup / join and converts to and from the
+dict format used by the rest of the pipeline (to_dicts / from_dicts).
+Every stage (validate_triples, build_graph_from_triples, export_rdf)
+accepts either format; on a TripleStore, string functions (label
+normalization, grounding checks) run once per distinct ID through
+map_column / column_mask, and only result rows are decoded.
+"""
+
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Tuple, Union
+
+import numpy as np
+
+
+# ------------------------------------------------------
+# String Dictionary (interning)
+# ------------------------------------------------------
+class StringDictionary:
+    """
+    Bidirectional string ↔ int mapping. ID 0 is always the empty string.
+    """
+
+    def __init__(self, strings: Iterable[str] = ()):
+        self.strings: List[str] = [""]
+        self.ids: Dict[str, int] = {"": 0}
+        for s in strings:
+            self.intern(s)
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+    def intern(self, s: str) -> int:
+        s = "" if s is None else str(s)
+        i = self.ids.get(s)
+        if i is None:
+            i = len(self.strings)
+            self.ids[s] = i
+            self.strings.append(s)
+        return i
+
+    def intern_many(self, values: Iterable[str]) -> np.ndarray:
+        return np.fromiter((self.intern(v) for v in values), dtype=np.int32)
+
+    def get(self, s: str) -> int:
+        """ID of an existing string, or -1 if it was never interned."""
+        return self.ids.get(s, -1)
+
+    def lookup(self, i: int) -> str:
+        return self.strings[i]
+
+    def lookup_many(self, ids: np.ndarray) -> List[str]:
+        strings = self.strings
+        return [strings[i] for i in ids.tolist()]
+
+
+# ------------------------------------------------------
+# Triple Store
+# ------------------------------------------------------
+class TripleStore:
+    """
+    Columnar triple container sharing one StringDictionary.
+    """
+
+    STRING_COLUMNS = ("subject", "predicate", "object", "span", "theme", "source")
+    OFFSET_COLUMNS = ("start", "end")
+    COLUMNS = STRING_COLUMNS + OFFSET_COLUMNS
+
+    def __init__(self, strings: StringDictionary = None, columns: Dict[str, np.ndarray] = None):
+        self.strings = strings or StringDictionary()
+        self.columns: Dict[str, np.ndarray] = {}
+
+        for name in self.COLUMNS:
+            if columns and name in columns:
+                self.columns[name] = np.asarray(columns[name], dtype=np.int32)
+            else:
+                self.columns[name] = np.zeros(0, dtype=np.int32)
+
+        n = len(self.columns["subject"])
+        for name in self.COLUMNS:
+            if len(self.columns[name]) != n:
+                fill = -1 if name in self.OFFSET_COLUMNS else 0
+                self.columns[name] = np.full(n, fill, dtype=np.int32)
+
+        self._pending: List[Dict[str, Any]] = []
+
+    # ---------------- construction ----------------
+    @classmethod
+    def from_dicts(
+        cls,
+        triples: Iterable[Dict[str, Any]],
+        theme: str = "",
+        source: str = "",
+        strings: StringDictionary = None
+    ) -> "TripleStore":
+        """
+        Builds a store from triple dicts. `theme` / `source` are defaults
+        for triples that do not carry their own.
+        """
+        store = cls(strings)
+        store.extend(triples, theme=theme, source=source)
+        return store
+
+    def append(self, triple: Dict[str, Any], theme: str = "", source: str = ""):
+        """
+        Adds one triple (buffered; columns are materialized lazily).
+        """
+        self._pending.append({
+            **triple,
+            "theme": triple.get("theme") or theme,
+            "source": triple.get("source") or source,
+        })
+
+    def extend(self, triples: Iterable[Dict[str, Any]], theme: str = "", source: str = ""):
+        for t in triples:
+            self.append(t, theme, source)
+        self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+
+        intern = self.strings.intern_many
+        new = {name: intern(t.get(name, "") for t in pending) for name in self.STRING_COLUMNS}
+        for name in self.OFFSET_COLUMNS:
+            new[name] = np.fromiter(
+                (-1 if t.get(name) is None else int(t[name]) for t in pending),
+                dtype=np.int32
+            )
+
+        for name in self.COLUMNS:
+            self.columns[name] = np.concatenate([self.columns[name], new[name]])
+
+    # ---------------- basic access ----------------
+    def __len__(self) -> int:
+        self._flush()
+        return len(self.columns["subject"])
+
+    def column(self, name: str) -> np.ndarray:
+        """Integer ID (or offset) column."""
+        self._flush()
+        return self.columns[name]
+
+    def labels(self, name: str) -> List[str]:
+        """Decoded string column."""
+        return self.strings.lookup_many(self.column(name))
+
+    def row(self, i: int) -> Dict[str, Any]:
+        self._flush()
+        lookup = self.strings.lookup
+        t = {name: lookup(int(self.columns[name][i])) for name in self.STRING_COLUMNS}
+        for name in self.OFFSET_COLUMNS:
+            value = int(self.columns[name][i])
+            if value >= 0:
+                t[name] = value
+        return t
+
+    def map_column(self, name: str, fn: Callable[[str], str]) -> np.ndarray:
+        """
+        ID column with `fn` applied to each distinct string once
+        (results are interned in the shared dictionary).
+        """
+        ids, inverse = np.unique(self.column(name), return_inverse=True)
+        return self.strings.intern_many(fn(s) for s in self.strings.lookup_many(ids))[inverse]
+
+    def column_mask(self, name: str, fn: Callable[[str], bool]) -> np.ndarray:
+        """Boolean row mask of `fn` evaluated once per distinct string."""
+        ids, inverse = np.unique(self.column(name), return_inverse=True)
+        hits = np.fromiter((bool(fn(s)) for s in self.strings.lookup_many(ids)), dtype=bool, count=len(ids))
+        return hits[inverse]
+
+    def replace(self, **columns: np.ndarray) -> "TripleStore":
+        """New store with some columns swapped (shares the dictionary)."""
+        self._flush()
+        return TripleStore(self.strings, {**self.columns, **columns})
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(len(self)):
+            yield self.row(i)
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        return list(self)
+
+    def memory_bytes(self) -> int:
+        """Approximate footprint: columns + distinct strings."""
+        self._flush()
+        cols = sum(c.nbytes for c in self.columns.values())
+        return cols + sum(len(s.encode("utf-8")) + 49 for s in self.strings.strings)
+
+    # ---------------- vectorized operations ----------------
+    def take(self, index: np.ndarray) -> "TripleStore":
+        """New store with the selected rows (shares the dictionary)."""
+        self._flush()
+        return TripleStore(self.strings, {n: c[index] for n, c in self.columns.items()})
+
+    def mask(self, **conditions: Union[str, Iterable[str]]) -> np.ndarray:
+        """
+        Boolean row mask, e.g. mask(predicate="occurredIn", theme=["event"]).
+        A string matches equal values, a list/set matches any of them.
+        """
+        self._flush()
+        result = np.ones(len(self.columns["subject"]), dtype=bool)
+
+        for name, value in conditions.items():
+            values = [value] if isinstance(value, str) else list(value)
+            ids = np.array([self.strings.get(v) for v in values], dtype=np.int32)
+            result &= np.isin(self.columns[name], ids)
+
+        return result
+
+    def filter(self, mask: np.ndarray = None, **conditions) -> "TripleStore":
+        """Rows where `mask` (and all keyword conditions) hold."""
+        if mask is None:
+            mask = self.mask(**conditions)
+        elif conditions:
+            mask = mask & self.mask(**conditions)
+        return self.take(np.flatnonzero(mask))
+
+    def dedup(self, keys: Tuple[str, ...] = ("subject", "predicate", "object")) -> "TripleStore":
+        """Keeps the first occurrence of each key combination (order preserved)."""
+        self._flush()
+        if not len(self.columns["subject"]):
+            return self.take(np.zeros(0, dtype=np.int64))
+
+        stacked = np.stack([self.columns[k] for k in keys], axis=1)
+        _, first = np.unique(stacked, axis=0, return_index=True)
+        return self.take(np.sort(first))
+
+    def join(
+        self,
+        other: "TripleStore",
+        left_on: str = "object",
+        right_on: str = "subject"
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Equi-join on ID columns (sort + searchsorted).
+        Returns (left_rows, right_rows) index arrays, e.g. the default
+        finds 2-hop paths  s -p1-> x -p2-> o.
+        """
+        if other.strings is not self.strings:
+            other = other.reencode(self.strings)
+
+        left = self.column(left_on)
+        right = other.column(right_on)
+
+        order = np.argsort(right, kind="stable")
+        sorted_right = right[order]
+        lo = np.searchsorted(sorted_right, left, side="left")
+        hi = np.searchsorted(sorted_right, left, side="right")
+
+        counts = hi - lo
+        left_rows = np.repeat(np.arange(len(left)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        right_rows = order[np.repeat(lo, counts) + offsets]
+
+        return left_rows, right_rows
+
+    def reencode(self, strings: StringDictionary) -> "TripleStore":
+        """Same rows, encoded with another dictionary."""
+        self._flush()
+        remap = strings.intern_many(self.strings.strings)
+        columns = {
+            n: (remap[c] if n in self.STRING_COLUMNS else c.copy())
+            for n, c in self.columns.items()
+        }
+        return TripleStore(strings, columns)
+
+    @classmethod
+    def concat(cls, stores: List["TripleStore"], strings: StringDictionary = None) -> "TripleStore":
+        """Concatenates stores into one dictionary-sharing store."""
+        strings = strings or (stores[0].strings if stores else StringDictionary())
+        parts = [s if s.strings is strings else s.reencode(strings) for s in stores]
+        for p in parts:
+            p._flush()
+        columns = {
+            n: np.concatenate([p.columns[n] for p in parts]) if parts else np.zeros(0, dtype=np.int32)
+            for n in cls.COLUMNS
+        }
+        return cls(strings, columns)
+
+
+# ------------------------------------------------------
+# Helper for stages that accept both formats
+# ------------------------------------------------------
+def as_triple_list(triples: Union[TripleStore, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Returns triple dicts for either a TripleStore or a list of dicts.
+    """
+    if isinstance(triples, TripleStore):
+        return triples.to_dicts()
+    return triples
+
+
+# ------------------------------------------------------
+# Module Test
+# ------------------------------------------------------
+if __name__ == "__main__":
+    store = TripleStore.from_dicts([
+        {"subject": "معركة الكرامة", "predicate": "occurredIn", "object": "الكرامة", "span": "..."},
+        {"subject": "معركة الكرامة", "predicate": "occurredOn", "object": "1968-03-21", "span": "..."},
+        {"subject": "معركة الكرامة", "predicate": "occurredIn", "object": "الكرامة", "span": "..."},
+        {"subject": "الكرامة", "predicate": "locatedIn", "object": "الأردن", "span": "..."},
+    ], theme="event", source="sample.pdf")
+
+    print("Rows:", len(store), "→ dedup:", len(store.dedup()))
+    print("occurredIn:", store.filter(predicate="occurredIn").to_dicts())
+    left, right = store.join(store)
+    print("2-hop:", [(store.row(l)["subject"], store.row(r)["object"]) for l, r in zip(left, right)])
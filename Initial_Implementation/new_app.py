@@ -6,28 +6,61 @@ Full Flask backend for the Semantic Triple Extraction Pipeline.
 Endpoints:
   /extract_text          → PDF → text
   /detect_topics         → topics + keywords
+  /suggest_topics        → local TF-IDF topic candidates (no LLM)
   /detect_theme          → event/cultural/other
+  /train_theme_classifier → retrain the local theme tier from past LLM decisions (job)
   /generate_triples      → LLM triples (chunk-based)
   /validate_triples      → Pydantic + grounding checks
   /lookup_predicates     → DBpedia/Wikidata relations
-  /visualize_graph       → PyVis HTML graph
+  /visualize_graph       → merge triples into the KG and open the static viewer
   /export_rdf            → TTL, JSON-LD, N-Triples
+  /parse_stats           → LLM output parse-failure rate per stage
+  /kg/add_triples        → merge triples into the app-level knowledge graph
+  /kg/upsert_source      → replace one document's triples in the knowledge graph
+  /kg/remove_source      → delete one document's contribution (orphans collected)
+  /kg/query              → indexed S-P-O pattern lookup (wildcards, paging)
+  /kg/neighborhood       → 1–2 hop facts around an entity
+  /sparql                → SPARQL over the persistent RDF store (streamed NDJSON)
+  /kg/snapshot           → save / (re)load the binary KG snapshot, load status
+  /kg/top_entities       → key figures / events by PageRank, degree or betweenness
+  /kg/communities        → thematic clusters + connected components (cached)
+  /kg/timeline           → dated events in a range, optionally at one place
+  /kg/graph_data         → vis-network nodes/edges JSON (paging, expansion, gzip/msgpack)
+  /viewer                → static graph viewer (lib/vis-9.1.2) over /kg/graph_data
+  /kg/ego_network        → k-hop ego network with theme/predicate/source/date filters
+  /jobs                  → submit a background pipeline job / list jobs
+  /jobs/<id>             → job status, per-stage progress and result
+
+/detect_topics, /generate_triples and /validate_triples also accept
+"async": true and then answer 202 with a job ID instead of blocking.
 
 This replaces the old NER-only approach with a semantic triple-based KG pipeline.
 """
 
+import gzip
+import json
 import os
-from flask import Flask, request, jsonify
+import threading
+import time
+
+import networkx as nx
+from flask import Flask, request, jsonify, Response, stream_with_context, send_from_directory
 from werkzeug.utils import secure_filename
 
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
 # Stage 1: PDF + text
 from pipeline.pdf_reader import process_pdf
 
 # Stage 2: Topic detection
-from pipeline.topic_detector import detect_topics
+from pipeline.topic_detector import detect_topics, TOPIC_MODES
+from pipeline.topic_candidates import suggest_topics, add_to_corpus, file_hash
 
 # Stage 3: Theme detection
-from pipeline.theme_detector import detect_theme
+from pipeline.theme_detector import detect_theme, train_theme_classifier, THEME_MODEL_PATH
 
 # Stage 4: Triple generation
 from pipeline.triple_generator import generate_triples
@@ -39,12 +72,25 @@ from pipeline.triple_validator import validate_triples
 from pipeline.relation_lookup import get_semantic_alternatives
 
 # Stage 7: Graph building + visualization
-from kg.graph_builder import build_graph_from_triples
-from kg.graph_visualiser import visualize_graph
+from kg.graph_builder import IncrementalGraph
+from kg.graph_visualiser import graph_data, cached_layout
+from kg.query import KGIndex
+from kg.sparql_store import SparqlStore
+from kg.snapshot import save_snapshot, load_snapshot, snapshot_exists
+from kg.analytics import top_k, community_summary, components, METRICS
+from kg.timeline import TimelineIndex
+from kg.ego import ego_network
+from pipeline.temporal import normalize_temporal
 
 # Stage 8: RDF exporter
 from pipeline.rdf_exporter import export_rdf
 
+# LLM structured-output monitoring
+from pipeline.structured_output import get_parse_stats
+
+# Background jobs
+from pipeline.jobs import JobQueue, QueueFull
+
 
 # ------------------------------------------------------
 # Flask Setup
@@ -57,6 +103,202 @@ os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
 os.makedirs("triples", exist_ok=True)
 
 
+# ------------------------------------------------------
+# App-level knowledge graph (merged across documents)
+# ------------------------------------------------------
+KG_LOCK = threading.Lock()
+KG_STATE = {
+    "kg": IncrementalGraph(),     # source-aware wrapper (add / upsert / remove)
+    "graph": None,                # == KG_STATE["kg"].G
+    "index": KGIndex(),
+    "timeline": None              # (graph, version, TimelineIndex), rebuilt on change
+}
+KG_STATE["graph"] = KG_STATE["kg"].G
+
+
+def apply_kg_changes(changes) -> dict:
+    """
+    Patches the fact index with the edges an IncrementalGraph call
+    added / updated / removed (caller holds KG_LOCK).
+    """
+    G, index = KG_STATE["graph"], KG_STATE["index"]
+    for u, v, key in changes["removed"]:
+        index.remove_fact(u, key, v)
+    for u, v, key in changes["added"] | changes["updated"]:
+        attrs = G.edges[u, v, key]
+        index.add_fact(u, attrs["predicate"], v, attrs)
+
+    return {
+        "nodes": G.number_of_nodes(),
+        "edges": G.number_of_edges(),
+        "version": G.graph["version"],
+        **{name: len(keys) for name, keys in changes.items()}
+    }
+
+
+def get_timeline() -> TimelineIndex:
+    """
+    Interval index for the current graph version (caller holds KG_LOCK).
+    """
+    G = KG_STATE["graph"]
+    cached = KG_STATE["timeline"]
+    if cached is None or cached[0] is not G or cached[1] != G.graph.get("version"):
+        KG_STATE["timeline"] = (G, G.graph.get("version"), TimelineIndex.from_graph(G))
+    return KG_STATE["timeline"][2]
+
+# Persistent RDF store (opened on first use: the on-disk store is
+# locked by the process that opens it)
+SPARQL_STATE = {"store": None}
+
+
+def get_sparql_store() -> SparqlStore:
+    with KG_LOCK:
+        if SPARQL_STATE["store"] is None:
+            SPARQL_STATE["store"] = SparqlStore()
+        return SPARQL_STATE["store"]
+
+
+# Binary snapshot of the merged KG (see kg/snapshot.py)
+SNAPSHOT_STATE = {"status": "empty"}
+
+
+def load_kg_snapshot(source=None, theme=None):
+    """
+    Replaces the app-level KG with the on-disk snapshot, optionally only
+    the edges of some source files / themes. KG endpoints wait on
+    KG_LOCK until the graph and its index are ready.
+    """
+    with KG_LOCK:
+        SNAPSHOT_STATE.update(status="loading")
+        start = time.perf_counter()
+        try:
+            snap = load_snapshot()
+            read_seconds = time.perf_counter() - start
+            # IncrementalGraph rebuilds the edge aggregates from provenance
+            G = snap.to_graph(source=source, theme=theme, aggregates=False)
+            KG_STATE["kg"] = IncrementalGraph(G)
+            KG_STATE["graph"] = KG_STATE["kg"].G
+            KG_STATE["index"] = KGIndex.from_graph(KG_STATE["graph"])
+        except Exception as e:
+            SNAPSHOT_STATE.update(status="error", error=str(e))
+            raise
+
+        SNAPSHOT_STATE.update(
+            status="ready",
+            nodes=G.number_of_nodes(),
+            edges=G.number_of_edges(),
+            read_seconds=round(read_seconds, 4),
+            seconds=round(time.perf_counter() - start, 4)
+        )
+
+
+def refresh_layout(name: str = "kg") -> int:
+    """
+    Places the KG's unplaced nodes in the persisted layout that
+    /kg/graph_data reads. Only the node / edge lists are copied under
+    KG_LOCK; the force layout and the file write run without it.
+    """
+    with KG_LOCK:
+        G = KG_STATE["graph"]
+        nodes, edges = list(G.nodes()), list(G.edges())
+
+    H = nx.Graph()
+    H.add_nodes_from(nodes)
+    H.add_edges_from(edges)
+    return len(cached_layout(H, name))
+
+
+def load_kg_snapshot_and_layout(source=None, theme=None):
+    load_kg_snapshot(source=source, theme=theme)
+    refresh_layout()
+
+
+# Cold start: read the snapshot without blocking app startup
+if snapshot_exists():
+    threading.Thread(target=load_kg_snapshot_and_layout, daemon=True).start()
+
+
+# ------------------------------------------------------
+# Background jobs (long LLM stages)
+# ------------------------------------------------------
+JOBS = JobQueue(workers=2, max_pending=16)
+
+
+def _run_detect_topics(params, progress):
+    progress("topics")
+    return detect_topics(params.get("text", ""), mode=params.get("mode", "combined"))
+
+
+def _run_generate_triples(params, progress):
+    return generate_triples(
+        params.get("text", ""),
+        params.get("topics", []),
+        params.get("theme", ""),
+        params.get("tbox"),
+        on_progress=lambda done, total: progress("segments", done=done, total=total)
+    )
+
+
+def _run_validate_triples(params, progress):
+    progress("validation")
+    return validate_triples(params.get("triples", []), params.get("text", ""), auto_repair=True)
+
+
+def _run_pipeline(params, progress):
+    """text → topics → theme → triples → validated triples."""
+    text = params.get("text", "")
+
+    topics = params.get("topics")
+    if not topics:
+        progress("topics")
+        topics = detect_topics(text)["topics"][:2]
+    progress("topics", status="done")
+
+    theme = params.get("theme")
+    if not theme:
+        progress("theme")
+        theme = detect_theme(text)["theme"]
+    progress("theme", status="done")
+
+    generated = generate_triples(
+        text, topics, theme, params.get("tbox"),
+        on_progress=lambda done, total: progress("triples", done=done, total=total)
+    )
+    progress("triples", status="done")
+
+    progress("validation")
+    validated = validate_triples(generated["triples"], text, theme=theme, auto_repair=True)
+
+    return {"topics": topics, "theme": theme, "tbox": generated["tbox"], **validated}
+
+
+JOBS.register("detect_topics", ["topics"], _run_detect_topics)
+JOBS.register("generate_triples", ["segments"], _run_generate_triples)
+JOBS.register("validate_triples", ["validation"], _run_validate_triples)
+def _run_train_theme_classifier(params, progress):
+    progress("training")
+    model = train_theme_classifier()
+    return {"labels": model.labels, "model_path": THEME_MODEL_PATH}
+
+
+JOBS.register("pipeline", ["topics", "theme", "triples", "validation"], _run_pipeline)
+JOBS.register("train_theme_classifier", ["training"], _run_train_theme_classifier)
+
+
+def submit_job(kind: str, params: dict):
+    """202 + job ID, or 429 when the pool is saturated."""
+    try:
+        job_id = JOBS.submit(kind, params)
+    except QueueFull as e:
+        response = jsonify({"error": str(e), **JOBS.stats()})
+        response.headers["Retry-After"] = "30"
+        return response, 429
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({"job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"}), 202
+
+
 # ------------------------------------------------------
 # Endpoint 1 — Extract text from PDF
 # ------------------------------------------------------
@@ -75,23 +317,50 @@ def api_extract_text():
 
     try:
         text = process_pdf(pdf_path)
-        return jsonify({"filename": filename, "text": text})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+    # Uploaded documents form the IDF corpus of /suggest_topics; the
+    # extraction succeeded even if that update fails
+    try:
+        add_to_corpus([text], doc_ids=[file_hash(pdf_path)])
+    except Exception as e:
+        app.logger.warning("❌ Topic IDF update failed for %s: %s", filename, e)
+
+    return jsonify({"filename": filename, "text": text})
+
 
 # ------------------------------------------------------
 # Endpoint 2 — Topic Detection
 # ------------------------------------------------------
 @app.route("/detect_topics", methods=["POST"])
 def api_detect_topics():
-    data = request.json
+    data = request.json or {}
+    mode = data.get("mode", "combined")
+    if mode not in TOPIC_MODES:
+        return jsonify({"error": f"❌ Unknown mode: {mode} (expected one of {', '.join(TOPIC_MODES)})"}), 400
+
+    if data.get("async"):
+        return submit_job("detect_topics", data)
+
     text = data.get("text", "")
 
-    result = detect_topics(text)
+    result = detect_topics(text, mode=mode)
     return jsonify(result)
 
 
+# ------------------------------------------------------
+# Endpoint 2b — Fast Topic Suggestions (local, no LLM)
+# ------------------------------------------------------
+@app.route("/suggest_topics", methods=["POST"])
+def api_suggest_topics():
+    data = request.json
+    text = data.get("text", "")
+    top_k = int(data.get("top_k", 12))
+
+    return jsonify({"candidates": suggest_topics(text, top_k=top_k)})
+
+
 # ------------------------------------------------------
 # Endpoint 3 — Theme Detection
 # ------------------------------------------------------
@@ -104,12 +373,20 @@ def api_detect_theme():
     return jsonify(result)
 
 
+@app.route("/train_theme_classifier", methods=["POST"])
+def api_train_theme_classifier():
+    # Training reads the whole decision history: always a background job
+    return submit_job("train_theme_classifier", {})
+
+
 # ------------------------------------------------------
 # Endpoint 4 — Triple Generation
 # ------------------------------------------------------
 @app.route("/generate_triples", methods=["POST"])
 def api_generate_triples():
     data = request.json
+    if data.get("async"):
+        return submit_job("generate_triples", data)
 
     text = data.get("text", "")
     topics = data.get("topics", [])
@@ -126,6 +403,8 @@ def api_generate_triples():
 @app.route("/validate_triples", methods=["POST"])
 def api_validate_triples():
     data = request.json
+    if data.get("async"):
+        return submit_job("validate_triples", data)
 
     triples = data.get("triples", [])
     text = data.get("text", "")
@@ -153,15 +432,18 @@ def api_lookup_predicates():
 def api_visualize_graph():
     data = request.json
 
-    triples = data.get("triples", [])
+    triples = normalize_temporal(data.get("triples", []))
     theme = data.get("theme", "")
     tbox = data.get("tbox", "")
     source = data.get("source", "")
 
-    G = build_graph_from_triples(triples, theme, tbox, source_file=source)
-    html_path = visualize_graph(G)
+    # No per-call HTML: the triples join the app-level KG and the static
+    # viewer pages them in from /kg/graph_data
+    if triples:
+        with KG_LOCK:
+            apply_kg_changes(KG_STATE["kg"].add_source(source, triples, theme, tbox))
 
-    return jsonify({"html_path": html_path})
+    return app.send_static_file("kg_viewer.html")
 
 
 # ------------------------------------------------------
@@ -175,9 +457,364 @@ def api_export_rdf():
     tbox_class = data.get("tbox", "dbo:Entity")
     formats = data.get("formats", ["ttl", "jsonld", "nt"])
     theme = data.get("theme", "event")
+    source = data.get("source", "")
+
+    if not source:
+        paths = export_rdf(triples, tbox_class, theme, formats=formats)
+        return jsonify(paths)
+
+    # Per-document export, loaded incrementally into the SPARQL store
+    folder = os.path.join("triples", secure_filename(source) or "unnamed")
+    paths = export_rdf(triples, tbox_class, theme, formats=formats, folder=folder)
+    loaded = get_sparql_store().load_exported(source, paths)
+
+    return jsonify({**paths, "loaded_triples": loaded})
+
+
+# ------------------------------------------------------
+# Endpoint 8b — SPARQL query (streamed)
+# ------------------------------------------------------
+@app.route("/sparql", methods=["GET", "POST"])
+def api_sparql():
+    data = request.json if request.is_json else request.values
+    query = data.get("query", "")
+    timeout = min(float(data.get("timeout", 10)), 60.0)
+    max_rows = int(data.get("max_rows", 10000))
+
+    if not query:
+        return jsonify({"error": "Missing query"}), 400
+
+    rows = get_sparql_store().query(query, timeout=timeout, max_rows=max_rows)
+
+    # Fail fast on syntax errors / immediate timeouts (before streaming starts)
+    try:
+        first = next(rows, None)
+    except TimeoutError as e:
+        return jsonify({"error": str(e)}), 504
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    def generate():
+        if first is None:
+            return
+        yield json.dumps(first, ensure_ascii=False) + "\n"
+        try:
+            for row in rows:
+                yield json.dumps(row, ensure_ascii=False) + "\n"
+        except Exception as e:
+            yield json.dumps({"error": str(e)}, ensure_ascii=False) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+# ------------------------------------------------------
+# Endpoint 9 — LLM Parse Statistics
+# ------------------------------------------------------
+@app.route("/parse_stats", methods=["GET"])
+def api_parse_stats():
+    return jsonify(get_parse_stats())
+
+
+# ------------------------------------------------------
+# Endpoint 10 — Merge triples into the knowledge graph
+# ------------------------------------------------------
+@app.route("/kg/add_triples", methods=["POST"])
+def api_kg_add_triples():
+    data = request.json
+
+    triples = normalize_temporal(data.get("triples", []))
+    theme = data.get("theme", "")
+    tbox = data.get("tbox", "")
+    source = data.get("source", "")
+
+    with KG_LOCK:
+        changes = KG_STATE["kg"].add_source(source, triples, theme, tbox)
+        stats = apply_kg_changes(changes)
+
+    return jsonify(stats)
+
+
+# ------------------------------------------------------
+# Endpoint 10b — Replace / remove one document's triples
+# ------------------------------------------------------
+@app.route("/kg/upsert_source", methods=["POST"])
+def api_kg_upsert_source():
+    data = request.json or {}
+    source = data.get("source", "")
+    if not source:
+        return jsonify({"error": "Missing source"}), 400
+
+    with KG_LOCK:
+        changes = KG_STATE["kg"].upsert_source(
+            source,
+            normalize_temporal(data.get("triples", [])),
+            data.get("theme", ""),
+            data.get("tbox", "")
+        )
+        stats = apply_kg_changes(changes)
+
+    return jsonify(stats)
+
+
+@app.route("/kg/remove_source", methods=["POST"])
+def api_kg_remove_source():
+    data = request.json or {}
+    source = data.get("source", "")
+    if not source:
+        return jsonify({"error": "Missing source"}), 400
+
+    with KG_LOCK:
+        changes = KG_STATE["kg"].remove_source(source)
+        stats = apply_kg_changes(changes)
+
+    return jsonify(stats)
+
+
+# ------------------------------------------------------
+# Endpoint 11 — Indexed fact query
+# ------------------------------------------------------
+@app.route("/kg/query", methods=["POST"])
+def api_kg_query():
+    data = request.json or {}
+
+    with KG_LOCK:
+        result = KG_STATE["index"].match(
+            s=data.get("subject"),
+            p=data.get("predicate"),
+            o=data.get("object"),
+            offset=int(data.get("offset", 0)),
+            limit=int(data.get("limit", 100))
+        )
+
+    return jsonify(result)
+
+
+# ------------------------------------------------------
+# Endpoint 12 — Neighborhood expansion
+# ------------------------------------------------------
+@app.route("/kg/neighborhood", methods=["POST"])
+def api_kg_neighborhood():
+    data = request.json or {}
+    node = data.get("node", "")
+    if not node:
+        return jsonify({"error": "Missing node"}), 400
+
+    with KG_LOCK:
+        result = KG_STATE["index"].neighborhood(
+            node,
+            hops=int(data.get("hops", 1)),
+            predicate=data.get("predicate"),
+            offset=int(data.get("offset", 0)),
+            limit=int(data.get("limit", 200))
+        )
+
+    return jsonify(result)
+
+
+# ------------------------------------------------------
+# Endpoint 13 — KG snapshot (save / load / status)
+# ------------------------------------------------------
+@app.route("/kg/snapshot", methods=["GET", "POST"])
+def api_kg_snapshot():
+    if request.method == "GET":
+        return jsonify(SNAPSHOT_STATE)
+
+    data = request.json or {}
+    action = data.get("action", "save")
+
+    if action == "save":
+        with KG_LOCK:
+            result = save_snapshot(KG_STATE["graph"])
+        result["layout_nodes"] = refresh_layout()
+        return jsonify(result)
+
+    if action == "load":
+        if not snapshot_exists():
+            return jsonify({"error": "No snapshot saved"}), 404
+        load_kg_snapshot_and_layout(source=data.get("source"), theme=data.get("theme"))
+        return jsonify(SNAPSHOT_STATE)
+
+    return jsonify({"error": f"Unknown action: {action}"}), 400
+
+
+# ------------------------------------------------------
+# Endpoint 14 — Key entities (cached centrality)
+# ------------------------------------------------------
+@app.route("/kg/top_entities", methods=["POST"])
+def api_kg_top_entities():
+    data = request.json or {}
+    metric = data.get("metric", "pagerank")
+    if metric not in METRICS:
+        return jsonify({"error": f"Unknown metric: {metric}"}), 400
+
+    with KG_LOCK:
+        G = KG_STATE["graph"]
+        result = top_k(
+            G,
+            metric=metric,
+            k=int(data.get("k", 20)),
+            role=data.get("role"),
+            theme=data.get("theme")
+        )
+        version = G.graph.get("version", 0)
+
+    return jsonify({"metric": metric, "version": version, "results": result})
+
+
+# ------------------------------------------------------
+# Endpoint 15 — Communities & components (cached)
+# ------------------------------------------------------
+@app.route("/kg/communities", methods=["POST"])
+def api_kg_communities():
+    data = request.json or {}
+
+    with KG_LOCK:
+        G = KG_STATE["graph"]
+        clusters = community_summary(G, k=int(data.get("k", 10)), members=int(data.get("members", 5)))
+        sizes = [len(c) for c in components(G)]
+        version = G.graph.get("version", 0)
+
+    return jsonify({
+        "version": version,
+        "communities": clusters,
+        "components": {"count": len(sizes), "largest": sizes[:10]}
+    })
+
+
+# ------------------------------------------------------
+# Endpoint 16 — Timeline range query
+# ------------------------------------------------------
+@app.route("/kg/timeline", methods=["POST"])
+def api_kg_timeline():
+    data = request.json or {}
+
+    with KG_LOCK:
+        try:
+            result = get_timeline().query(
+                start=data.get("start"),
+                end=data.get("end"),
+                place=data.get("place"),
+                offset=int(data.get("offset", 0)),
+                limit=int(data.get("limit", 100))
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+    return jsonify(result)
+
+
+# ------------------------------------------------------
+# Endpoint 17 — vis-network graph data (paged / expanded)
+# ------------------------------------------------------
+GZIP_MIN_BYTES = 1024
+
+
+@app.route("/kg/graph_data", methods=["GET", "POST"])
+def api_kg_graph_data():
+    data = request.json if request.is_json else request.values
+    fmt = data.get("format", "json")
+    if fmt == "msgpack" and msgpack is None:
+        return jsonify({"error": "msgpack is not installed"}), 400
+
+    with KG_LOCK:
+        try:
+            result = graph_data(
+                KG_STATE["graph"],
+                offset=int(data.get("offset", 0)),
+                limit=min(int(data.get("limit", 500)), 5000),
+                expand=data.get("expand") or None,
+                layout=data.get("layout") or None
+            )
+        except KeyError as e:
+            return jsonify({"error": str(e.args[0])}), 404
+
+    if fmt == "msgpack":
+        body, mimetype = msgpack.packb(result), "application/x-msgpack"
+    else:
+        body = json.dumps(result, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        mimetype = "application/json"
+
+    response = Response(body, mimetype=mimetype)
+    response.vary.add("Accept-Encoding")
+    if len(body) >= GZIP_MIN_BYTES and "gzip" in request.headers.get("Accept-Encoding", ""):
+        response.set_data(gzip.compress(body, compresslevel=5))
+        response.headers["Content-Encoding"] = "gzip"
+    return response
+
+
+# ------------------------------------------------------
+# Endpoint 18 — Ego network (k-hop, filtered, capped)
+# ------------------------------------------------------
+@app.route("/kg/ego_network", methods=["POST"])
+def api_kg_ego_network():
+    data = request.json or {}
+    node = data.get("node", "")
+    if not node:
+        return jsonify({"error": "Missing node"}), 400
+
+    rank = data.get("rank", "weight")
+    if rank != "weight" and rank not in METRICS:
+        return jsonify({"error": f"Unknown rank: {rank}"}), 400
+
+    with KG_LOCK:
+        G = KG_STATE["graph"]
+        try:
+            result = ego_network(
+                KG_STATE["index"],
+                node,
+                hops=max(1, min(int(data.get("hops", 2)), 3)),
+                predicate=data.get("predicate"),
+                theme=data.get("theme"),
+                source=data.get("source"),
+                start=data.get("start"),
+                end=data.get("end"),
+                timeline=get_timeline() if data.get("start") or data.get("end") else None,
+                scores=METRICS[rank](G) if rank != "weight" else None,
+                max_nodes=min(int(data.get("max_nodes", 200)), 2000),
+                max_edges=min(int(data.get("max_edges", 2000)), 20000)
+            )
+        except KeyError as e:
+            return jsonify({"error": str(e.args[0])}), 404
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+    return jsonify(result)
+
+
+# ------------------------------------------------------
+# Endpoint 19 — Background jobs (submit / list / status)
+# ------------------------------------------------------
+@app.route("/jobs", methods=["GET", "POST"])
+def api_jobs():
+    if request.method == "GET":
+        return jsonify({
+            **JOBS.stats(),
+            "jobs": JOBS.list(status=request.args.get("status"), limit=int(request.args.get("limit", 50)))
+        })
+
+    data = request.json or {}
+    return submit_job(data.get("kind", "pipeline"), data.get("params", {}))
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def api_job_status(job_id):
+    job = JOBS.get(job_id, with_result=request.args.get("result", "1") != "0")
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job)
+
+
+# ------------------------------------------------------
+# Static graph viewer (static/kg_viewer.html + bundled lib/)
+# ------------------------------------------------------
+@app.route("/viewer", methods=["GET"])
+def viewer():
+    return app.send_static_file("kg_viewer.html")
+
 
-    paths = export_rdf(triples, tbox_class, theme, formats=formats)
-    return jsonify(paths)
+@app.route("/lib/<path:filename>", methods=["GET"])
+def viewer_lib(filename):
+    return send_from_directory(os.path.join(app.root_path, "lib"), filename)
 
 
 # ------------------------------------------------------
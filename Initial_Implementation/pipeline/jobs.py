@@ -0,0 +1,221 @@
+"""
+jobs.py
+-------------------
+Background job queue for long-running pipeline stages (LLM calls).
+
+- submit() returns a job ID at once; a thread pool runs the job
+- Each job kind declares its stages; runners report per-stage progress
+  through a callback (status, done / total)
+- Jobs, progress, results and errors are persisted in SQLite, so status
+  survives restarts (jobs cut off by a restart are marked "interrupted")
+- Backpressure: at most `max_pending` queued + running jobs, beyond that
+  submit() raises QueueFull (the API answers 429)
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+JOBS_DB = os.path.join("triples", "jobs.sqlite3")
+
+# Progress writes per job are throttled to one per interval (stage
+# changes are always written)
+PROGRESS_INTERVAL = 0.5
+
+Progress = Callable[..., None]
+Runner = Callable[[Dict[str, Any], Progress], Any]
+
+
+class QueueFull(Exception):
+    """Raised when the pool is saturated and no more jobs are accepted."""
+
+
+# ------------------------------------------------------
+# Queue
+# ------------------------------------------------------
+class JobQueue:
+    """
+    Thread-pool job runner with SQLite persistence.
+    """
+
+    def __init__(self, db_path: str = JOBS_DB, workers: int = 2, max_pending: int = 16):
+        self.db_path = db_path
+        self.max_pending = max_pending
+        self.runners: Dict[str, Runner] = {}
+        self.stages: Dict[str, List[str]] = {}
+        self.pending = 0
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self.db = None
+
+    # ---------------- storage ----------------
+    def _connect(self) -> sqlite3.Connection:
+        """Opens the database on first use (one connection, guarded by self.lock)."""
+        if self.db is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            self.db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    params TEXT,
+                    stages TEXT,
+                    result TEXT,
+                    error TEXT,
+                    created REAL,
+                    started REAL,
+                    finished REAL
+                )
+            """)
+            # Jobs of a previous process never finish
+            self.db.execute(
+                "UPDATE jobs SET status = 'interrupted', finished = ? WHERE status IN ('queued', 'running')",
+                (time.time(),)
+            )
+            self.db.commit()
+        return self.db
+
+    def _update(self, job_id: str, **fields):
+        columns = ", ".join(f"{k} = ?" for k in fields)
+        with self.lock:
+            db = self._connect()
+            db.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+            db.commit()
+
+    # ---------------- API ----------------
+    def register(self, kind: str, stages: List[str], runner: Runner):
+        """
+        runner(params, progress) → JSON-serializable result.
+        progress(stage, done=None, total=None, status="running")
+        """
+        self.runners[kind] = runner
+        self.stages[kind] = stages
+
+    def submit(self, kind: str, params: Dict[str, Any]) -> str:
+        if kind not in self.runners:
+            raise ValueError(f"❌ Unknown job kind: {kind}")
+
+        job_id = uuid.uuid4().hex
+        stages = {s: {"status": "pending"} for s in self.stages[kind]}
+
+        with self.lock:
+            if self.pending >= self.max_pending:
+                raise QueueFull(f"❌ Job queue full ({self.pending} pending)")
+            self.pending += 1
+            db = self._connect()
+            db.execute(
+                "INSERT INTO jobs (id, kind, status, params, stages, created) VALUES (?, ?, 'queued', ?, ?, ?)",
+                (job_id, kind, json.dumps(params, ensure_ascii=False), json.dumps(stages), time.time())
+            )
+            db.commit()
+
+        self.executor.submit(self._run, job_id, kind, params, stages)
+        return job_id
+
+    def _run(self, job_id: str, kind: str, params: Dict[str, Any], stages: Dict[str, Dict]):
+        last_write = [0.0]
+
+        def progress(stage: str, done: Optional[int] = None, total: Optional[int] = None, status: str = "running"):
+            changed = stages.get(stage, {}).get("status") != status
+            entry = stages.setdefault(stage, {})
+            entry["status"] = status
+            if done is not None:
+                entry["done"] = done
+            if total is not None:
+                entry["total"] = total
+
+            now = time.time()
+            if changed or now - last_write[0] >= PROGRESS_INTERVAL:
+                last_write[0] = now
+                self._update(job_id, stages=json.dumps(stages))
+
+        self._update(job_id, status="running", started=time.time())
+        try:
+            result = self.runners[kind](params, progress)
+            for entry in stages.values():
+                if entry["status"] != "done":
+                    entry["status"] = "done"
+            self._update(
+                job_id, status="done", stages=json.dumps(stages),
+                result=json.dumps(result, ensure_ascii=False), finished=time.time()
+            )
+        except Exception as e:
+            self._update(job_id, status="error", stages=json.dumps(stages), error=str(e), finished=time.time())
+        finally:
+            with self.lock:
+                self.pending -= 1
+
+    def get(self, job_id: str, with_result: bool = True) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            row = self._connect().execute(
+                "SELECT id, kind, status, stages, result, error, created, started, finished FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        job = {
+            "id": row[0],
+            "kind": row[1],
+            "status": row[2],
+            "stages": json.loads(row[3] or "{}"),
+            "error": row[5],
+            "created": row[6],
+            "started": row[7],
+            "finished": row[8]
+        }
+        if with_result and row[4] is not None:
+            job["result"] = json.loads(row[4])
+        return job
+
+    def list(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        query = "SELECT id FROM jobs"
+        args: tuple = ()
+        if status:
+            query += " WHERE status = ?"
+            args = (status,)
+        query += " ORDER BY created DESC LIMIT ?"
+
+        with self.lock:
+            ids = [r[0] for r in self._connect().execute(query, (*args, limit)).fetchall()]
+        return [self.get(i, with_result=False) for i in ids]
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {"pending": self.pending, "max_pending": self.max_pending}
+
+
+# ------------------------------------------------------
+# Module Test
+# ------------------------------------------------------
+if __name__ == "__main__":
+    import tempfile
+
+    queue = JobQueue(db_path=tempfile.mktemp(suffix=".sqlite3"), workers=1, max_pending=2)
+
+    def count_words(params, progress):
+        words = params["text"].split()
+        for i in range(len(words)):
+            progress("count", done=i + 1, total=len(words))
+            time.sleep(0.01)
+        progress("count", status="done")
+        return {"words": len(words)}
+
+    queue.register("count_words", ["count"], count_words)
+
+    first = queue.submit("count_words", {"text": "حرب حزيران عام 1967"})
+    queue.submit("count_words", {"text": "معركة الكرامة"})
+    try:
+        queue.submit("count_words", {"text": "أحداث أيلول"})
+    except QueueFull as e:
+        print(e)
+
+    time.sleep(0.5)
+    print(queue.get(first))
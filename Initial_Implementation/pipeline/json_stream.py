@@ -0,0 +1,146 @@
+"""
+json_stream.py
+-------------------
+Incremental parsing of JSON arrays produced by streaming LLM completions.
+
+The parser:
+- Skips anything before the first "[" (markdown fences, prose,
+  or a wrapping object such as {"triples": [...]})
+- Yields each top-level array element as soon as it is complete
+- Ignores trailing text after the closing "]"
+- Keeps every complete element of a truncated response
+  (the valid prefix survives even if the model stopped mid-object)
+"""
+
+import json
+from typing import Any, Iterable, Iterator, List
+
+
+# ------------------------------------------------------
+# Incremental Array Parser
+# ------------------------------------------------------
+class JSONArrayStreamParser:
+    """
+    Feed text chunks with feed(); each call returns the array
+    elements completed by that chunk.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0              # next unread index in buffer
+        self.started = False      # saw the opening "["
+        self.done = False         # saw the closing "]"
+        self.depth = 0            # nesting depth inside the array
+        self.in_string = False
+        self.escape = False
+        self.element_start = None
+        self.errors = 0           # complete elements that were not valid JSON
+
+    def _emit(self, raw: str, out: List[Any]):
+        try:
+            out.append(json.loads(raw))
+        except ValueError:
+            self.errors += 1
+
+    def feed(self, chunk: str) -> List[Any]:
+        if self.done or not chunk:
+            return []
+
+        self.buffer += chunk
+        out: List[Any] = []
+        buf = self.buffer
+        i = self.pos
+
+        while i < len(buf):
+            ch = buf[i]
+
+            if not self.started:
+                if ch == "[":
+                    self.started = True
+                i += 1
+                continue
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                    if self.depth == 0:
+                        self._emit(buf[self.element_start:i + 1], out)
+                        self.element_start = None
+                i += 1
+                continue
+
+            if ch == '"':
+                self.in_string = True
+                if self.depth == 0:
+                    self.element_start = i
+            elif ch in "{[":
+                if self.depth == 0:
+                    self.element_start = i
+                self.depth += 1
+            elif ch in "}]":
+                if self.depth == 0:
+                    # Closing bracket of the top-level array
+                    self.done = True
+                    break
+                self.depth -= 1
+                if self.depth == 0:
+                    self._emit(buf[self.element_start:i + 1], out)
+                    self.element_start = None
+            elif self.depth == 0 and ch not in " \t\r\n,":
+                # Bare scalar elements (numbers, true/false/null)
+                end = i
+                while end < len(buf) and buf[end] not in ",]} \t\r\n":
+                    end += 1
+                if end == len(buf):
+                    break  # scalar may continue in the next chunk
+                self._emit(buf[i:end], out)
+                i = end
+                continue
+
+            i += 1
+
+        # Drop consumed text so the buffer stays small
+        keep = self.element_start if self.element_start is not None else i
+        self.buffer = buf[keep:]
+        self.pos = i - keep
+        if self.element_start is not None:
+            self.element_start = 0
+
+        return out
+
+
+# ------------------------------------------------------
+# Convenience helpers
+# ------------------------------------------------------
+def iter_json_array(chunks: Iterable[str]) -> Iterator[Any]:
+    """
+    Yields array elements from an iterable of text chunks.
+    """
+    parser = JSONArrayStreamParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+        if parser.done:
+            break
+
+
+def parse_json_array(text: str) -> List[Any]:
+    """
+    Non-streaming variant: returns every complete element of the first
+    JSON array in `text` (fenced, wrapped or truncated output included).
+    """
+    return list(iter_json_array([text]))
+
+
+# ------------------------------------------------------
+# Module Test
+# ------------------------------------------------------
+if __name__ == "__main__":
+    raw = '```json\n[{"subject": "a", "predicate": "occurredIn", "object": "b [x]", "span": "\\"q\\""},\n {"subject": "c", "pred'
+    parser = JSONArrayStreamParser()
+    for k in range(0, len(raw), 7):
+        for item in parser.feed(raw[k:k + 7]):
+            print("→", item)
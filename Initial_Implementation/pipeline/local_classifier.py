@@ -0,0 +1,207 @@
+"""
+local_classifier.py
+-------------------
+Small CPU text classifier used as a local tier before LLM calls.
+
+Model:
+- Hashed features (word unigrams, word bigrams, character 3-grams)
+  over normalized Arabic/English text → SciPy sparse matrix
+- Multinomial logistic regression (softmax) trained with NumPy
+
+The classifier is label-agnostic: it is trained from labelled history
+(e.g. past LLM theme decisions) and can be reused for topics.
+Prediction is vectorized over a batch of texts.
+"""
+
+import json
+import os
+import zlib
+from typing import List, Tuple, Dict, Any
+
+import numpy as np
+from scipy import sparse
+
+from .text_normalizer import clean_text
+
+
+# ------------------------------------------------------
+# Feature Hashing
+# ------------------------------------------------------
+N_FEATURES = 2 ** 18
+
+
+def _features(text: str) -> List[str]:
+    """
+    Word unigrams + bigrams + character 3-grams (with word boundaries).
+    """
+    words = clean_text(text).lower().split()
+
+    feats = [f"w:{w}" for w in words]
+    feats += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+
+    for w in words:
+        padded = f"<{w}>"
+        feats += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+
+    return feats
+
+
+def hash_features(texts: List[str], n_features: int = N_FEATURES) -> sparse.csr_matrix:
+    """
+    Maps texts to an L2-normalized sparse (len(texts) × n_features) matrix.
+    crc32 keeps the hashing stable across processes (unlike hash()).
+    """
+    rows, cols = [], []
+
+    for row, text in enumerate(texts):
+        for feat in _features(text):
+            rows.append(row)
+            cols.append(zlib.crc32(feat.encode("utf-8")) % n_features)
+
+    X = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+        shape=(len(texts), n_features)
+    )
+    X.sum_duplicates()
+
+    norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags(1.0 / norms).dot(X).tocsr().astype(np.float32)
+
+
+# ------------------------------------------------------
+# Linear Classifier
+# ------------------------------------------------------
+class HashedLinearClassifier:
+    """
+    Softmax regression over hashed n-gram features.
+    """
+
+    def __init__(self, labels: List[str] = None, n_features: int = N_FEATURES):
+        self.labels = list(labels or [])
+        self.n_features = n_features
+        self.W = np.zeros((n_features, len(self.labels)), dtype=np.float32)
+        self.b = np.zeros(len(self.labels), dtype=np.float32)
+
+    @staticmethod
+    def _softmax(logits: np.ndarray) -> np.ndarray:
+        logits = logits - logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def fit(
+        self,
+        texts: List[str],
+        labels: List[str],
+        epochs: int = 200,
+        lr: float = 2.0,
+        l2: float = 1e-5
+    ) -> "HashedLinearClassifier":
+        """
+        Full-batch gradient descent on the cross-entropy loss.
+        """
+        self.labels = sorted(set(labels))
+        index = {label: i for i, label in enumerate(self.labels)}
+
+        X = hash_features(texts, self.n_features)
+        Y = np.zeros((len(texts), len(self.labels)), dtype=np.float32)
+        Y[np.arange(len(texts)), [index[label] for label in labels]] = 1.0
+
+        self.W = np.zeros((self.n_features, len(self.labels)), dtype=np.float32)
+        self.b = np.zeros(len(self.labels), dtype=np.float32)
+        n = max(len(texts), 1)
+
+        for _ in range(epochs):
+            P = self._softmax(X @ self.W + self.b)
+            G = (P - Y) / n
+            self.W -= lr * (np.asarray(X.T @ G) + l2 * self.W)
+            self.b -= lr * G.sum(axis=0)
+
+        return self
+
+    def predict_proba(self, texts: List[str]) -> np.ndarray:
+        """
+        Returns a (len(texts) × len(labels)) probability matrix.
+        """
+        X = hash_features(texts, self.n_features)
+        return self._softmax(X @ self.W + self.b)
+
+    def predict(self, texts: List[str]) -> List[Tuple[str, float]]:
+        """
+        Returns (label, probability) for each text.
+        """
+        if not texts:
+            return []
+        P = self.predict_proba(texts)
+        best = P.argmax(axis=1)
+        return [(self.labels[i], float(P[row, i])) for row, i in enumerate(best)]
+
+    def save(self, path: str) -> str:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez_compressed(
+            path,
+            W=self.W,
+            b=self.b,
+            labels=np.array(self.labels),
+            n_features=np.array(self.n_features)
+        )
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "HashedLinearClassifier":
+        data = np.load(path)
+        model = cls(labels=[str(l) for l in data["labels"]], n_features=int(data["n_features"]))
+        model.W = data["W"]
+        model.b = data["b"]
+        return model
+
+
+# ------------------------------------------------------
+# Labelled History (JSONL: {"text": ..., "label": ...})
+# ------------------------------------------------------
+def append_history(path: str, text: str, label: str, max_chars: int = 4000):
+    """
+    Appends one labelled example to a JSONL history file.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"text": text[:max_chars], "label": label}, ensure_ascii=False) + "\n")
+
+
+def load_history(path: str) -> List[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def train_from_history(history_path: str, model_path: str) -> HashedLinearClassifier:
+    """
+    Trains a classifier from a JSONL history file and saves it.
+    """
+    examples = load_history(history_path)
+    if len({e["label"] for e in examples}) < 2:
+        raise ValueError(f"Need at least two labels in {history_path} to train a classifier.")
+
+    model = HashedLinearClassifier().fit(
+        [e["text"] for e in examples],
+        [e["label"] for e in examples]
+    )
+    model.save(model_path)
+    return model
+
+
+# ------------------------------------------------------
+# Module Test
+# ------------------------------------------------------
+if __name__ == "__main__":
+    texts = [
+        "انعقد المؤتمر الدولي للمناخ بحضور ممثلين من 40 دولة.",
+        "اندلعت الحرب في المنطقة بعد الهجوم على الحدود.",
+        "تناولت الندوة موضوع الهويه العربيه وتاريخ التراث الشعبي.",
+        "الدبكة جزء من الفلكلور والعادات الشعبية.",
+    ]
+    labels = ["event", "event", "cultural", "cultural"]
+
+    clf = HashedLinearClassifier().fit(texts, labels)
+    print(clf.predict(["عقد اجتماع ومؤتمر بعد الحرب", "التراث والعادات الشعبية"]))
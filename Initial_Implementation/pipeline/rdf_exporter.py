@@ -4,18 +4,69 @@ rdf_exporter.py (Improved Version)
 Exports ontology-governed triples into RDF/Turtle, JSON-LD, and N-Triples.
 
 NEW FEATURES:
-- Canonical entity IDs
+- Canonical, content-derived IRIs (hash of the normalized label),
+  identical across formats and re-exports
 - Event-centric RDF structure
 - Subject typed as :HistoricalEvent or :CulturalEntity based on theme
 - Enforces ontology alignment with T-Box
-- Deduplication & normalization
+- Deduplication & normalization (within a bounded window)
 - Clean Turtle output with labels
+- Streaming writers (buffered, optional gzip) with literal/IRI escaping
+- One canonicalization pass feeds every format; each format is written
+  on its own thread, with per-format size and timing
 """
 
+import gzip
+import hashlib
+import io
+import json
 import os
+import queue
+import re
+import threading
+import time
 import unicodedata
-from typing import List, Dict
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Dict, Union, TextIO, Iterable, Iterator, Tuple, Optional, Hashable
 from tbox_loader import load_tbox_template
+from pipeline.text_normalizer import clean_text
+from kg.triple_store import TripleStore
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+# ------------------------------------------------------
+# 0. Namespaces
+# ------------------------------------------------------
+RESOURCE_NS = "http://example.org/resource/"
+ONTOLOGY_NS = "http://example.org/ontology/"
+RDF_TYPE = "http://www.w3.org/1999/02/22-rdf-syntax-ns#type"
+RDFS_LABEL = "http://www.w3.org/2000/01/rdf-schema#label"
+
+PREFIXES = {
+    "": RESOURCE_NS,
+    "onto": ONTOLOGY_NS,
+    "dbo": "http://dbpedia.org/ontology/",
+    "rdfs": "http://www.w3.org/2000/01/rdf-schema#",
+    "rdf": "http://www.w3.org/1999/02/22-rdf-syntax-ns#",
+}
+
+# Output buffer size for the streaming writers
+WRITE_BUFFER = 1 << 16
+
+# Bounded memory of the streaming pass: label → IRI cache entries, and
+# recently written nodes / labels / facts skipped as duplicates
+IRI_CACHE_SIZE = 1 << 16
+RECENT_STATEMENTS = 1 << 18
+
+# Blocks per batch handed to a writer thread, and batches queued per
+# format before the canonicalization pass waits for the slowest writer
+EXPORT_BATCH = 512
+EXPORT_QUEUE = 16
 
 
 # ------------------------------------------------------
@@ -32,161 +83,545 @@ def slugify(text: str) -> str:
     return text
 
 
-def canonical_entity(entity: str) -> str:
+@lru_cache(maxsize=IRI_CACHE_SIZE)
+def canonical_iri(label: str) -> str:
+    """
+    Stable, content-derived IRI for a node: hash of the normalized
+    label only. The same entity gets the same IRI whether it appears as
+    a subject or an object, in every format and on every re-export.
+    """
+    key = clean_text(label) or label.strip()
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    return f"{RESOURCE_NS}Entity_{digest}"
+
+
+# ------------------------------------------------------
+# 1b. Escaping
+# ------------------------------------------------------
+# Characters not allowed inside <...> IRIs (Arabic letters are kept as-is)
+IRI_UNSAFE = re.compile(r'[\x00-\x20<>"{}|^`\\%#?]')
+
+
+def escape_iri(local: str) -> str:
     """
-    Ensures consistent subject/object identifiers across triples.
+    Percent-encodes characters that are illegal in an IRI local part.
     """
-    entity = entity.strip()
-    return f":{slugify(entity)}"
+    return IRI_UNSAFE.sub(
+        lambda m: "".join(f"%{b:02X}" for b in m.group(0).encode("utf-8")),
+        local
+    )
 
 
-def canonical_event_id(i: int) -> str:
+def expand_iri(term: str) -> str:
+    """
+    Expands a CURIE (":x", "dbo:Event") to a full IRI. A bare class name
+    ("HistoricalEvent") is taken from the ontology namespace; absolute
+    IRIs are returned unchanged.
     """
-    Assigns Event_1, Event_2, ...
-    This ensures clean TTL even when subjects are messy in the text.
+    term = term.strip()
+    prefix, sep, local = term.partition(":")
+    if not sep:
+        if not term:
+            raise ValueError("❌ Empty class name")
+        return ONTOLOGY_NS + escape_iri(slugify(term))
+    if local.startswith("//") or prefix == "urn":
+        return term
+    if prefix in PREFIXES:
+        return PREFIXES[prefix] + escape_iri(local)
+    raise ValueError(f"❌ Unknown prefix in {term!r} (known: {', '.join(p or ':' for p in PREFIXES)})")
+
+
+@lru_cache(maxsize=1024)
+def predicate_iri(predicate: str) -> str:
+    """Full IRI for a predicate name."""
+    return ONTOLOGY_NS + escape_iri(slugify(predicate))
+
+
+def escape_literal(text: str) -> str:
     """
-    return f":Event_{i}"
+    Escapes a string for a Turtle / N-Triples "..." literal.
+    """
+    return (
+        text.replace("\\", "\\\\")
+            .replace('"', '\\"')
+            .replace("\n", "\\n")
+            .replace("\r", "\\r")
+            .replace("\t", "\\t")
+    )
+
+
+def iri_ref(iri: str) -> str:
+    return f"<{iri}>"
+
+
+def label_literal(label: str) -> str:
+    return f'"{escape_literal(label)}"@ar'
 
 
 # ------------------------------------------------------
-# 2. Turtle Exporter
+# 1c. Buffered (optionally gzip-compressed) output
 # ------------------------------------------------------
-def export_turtle(triples: List[Dict], tbox_class: str, theme: str, save_path="triples/graph.ttl") -> str:
-    header = """
-@prefix : <http://example.org/resource/> .
-@prefix onto: <http://example.org/ontology/> .
-@prefix dbo: <http://dbpedia.org/ontology/> .
-@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+def open_output(save_path: str, gzip_output: bool = False) -> TextIO:
+    """
+    Opens a buffered UTF-8 text handle; gzip_output=True writes
+    save_path + ".gz" through gzip.
+    """
+    os.makedirs(os.path.dirname(save_path) or ".", exist_ok=True)
+    if gzip_output:
+        return gzip.open(save_path, "wt", encoding="utf-8", compresslevel=6)
+    return open(save_path, "w", encoding="utf-8", buffering=WRITE_BUFFER)
+
+
+def output_path(save_path: str, gzip_output: bool) -> str:
+    return save_path + ".gz" if gzip_output and not save_path.endswith(".gz") else save_path
 
-"""
 
-    lines = [header]
+def dump_json(obj) -> str:
+    """Compact UTF-8 JSON (orjson when installed)."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False)
 
-    # Load ontology (T-Box is shown in comments)
+
+@lru_cache(maxsize=8)
+def tbox_comment(theme: str) -> str:
+    """
+    T-Box template as a Turtle comment block (loaded once per theme).
+    """
     tbox_template, _ = load_tbox_template(theme)
-    lines.append("# Ontology Template Used")
-    for l in tbox_template.split("\n"):
-        lines.append("# " + l)
-    lines.append("")
+    lines = ["# Ontology Template Used"]
+    lines += ["# " + l.rstrip("\r") for l in tbox_template.split("\n")]
+    return "\n".join(lines) + "\n\n"
+
+
+# ------------------------------------------------------
+# 1d. Streaming canonicalization (shared by all serializers)
+# ------------------------------------------------------
+# One node block: (iri, type IRI or None, [labels], [(predicate, object)])
+Block = Tuple[str, Optional[str], List[str], List[Tuple[str, str]]]
+
+
+class RecentSet:
+    """
+    Bounded set remembering the `size` most recently seen keys.
+    add() is True for a key not seen recently.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._keys: "OrderedDict[Hashable, None]" = OrderedDict()
 
-    # Canonical subject remapping (each triple → clean event-id)
-    event_map = {}
-    event_counter = 1
+    def add(self, key: Hashable) -> bool:
+        if key in self._keys:
+            self._keys.move_to_end(key)
+            return False
+        self._keys[key] = None
+        if len(self._keys) > self.size:
+            self._keys.popitem(last=False)
+        return True
 
-    def get_event_id(subj):
-        nonlocal event_counter
-        if subj not in event_map:
-            event_map[subj] = canonical_event_id(event_counter)
-            event_counter += 1
-        return event_map[subj]
 
-    # Write turtle triples
-    for t in triples:
-        subj_id = get_event_id(t["subject"])
-        obj_id = canonical_entity(t["object"])
-        pred = slugify(t["predicate"])
+class Canonicalizer:
+    """
+    Turns triple dicts into canonical node blocks, one triple at a time,
+    so exports never hold the corpus in memory:
+    - subject block: rdf:type (T-Box class), rdfs:label, the relation
+    - object block: rdfs:label (objects are untyped)
+
+    Statements already written are skipped within a window of the last
+    `memory` nodes / labels / facts. Past that window a statement may be
+    written again; RDF graphs are sets, so loaders drop the duplicate.
+    Every distinct spelling of a node becomes one rdfs:label, so the
+    output graph does not depend on the input order.
+    """
+
+    def __init__(self, tbox_class: str, memory: int = RECENT_STATEMENTS):
+        self.type_iri = expand_iri(tbox_class)
+        self._typed = RecentSet(memory)
+        self._labels = RecentSet(memory)
+        self._facts = RecentSet(memory)
 
-        # Subject typing
-        lines.append(f"{subj_id} a {tbox_class} .")
+    def _labels_of(self, iri: str, label: str) -> List[str]:
+        label = label.strip()
+        return [label] if self._labels.add((iri, label)) else []
 
-        # Label
-        lines.append(f'{subj_id} rdfs:label "{t["subject"]}"@ar .')
-        lines.append(f'{obj_id} rdfs:label "{t["object"]}"@ar .')
+    def blocks(self, triples: Iterable[Dict]) -> Iterator[Block]:
+        for triple in triples:
+            s = canonical_iri(triple["subject"])
+            o = canonical_iri(triple["object"])
+            p = predicate_iri(triple["predicate"])
 
-        # Predicate triple
-        lines.append(f"{subj_id} onto:{pred} {obj_id} .\n")
+            s_type = self.type_iri if self._typed.add(s) else None
+            s_labels = self._labels_of(s, triple["subject"])
+            edges = [(p, o)] if self._facts.add((s, p, o)) else []
+            if s_type or s_labels or edges:
+                yield s, s_type, s_labels, edges
 
-    output = "\n".join(lines)
+            o_labels = self._labels_of(o, triple["object"])
+            if o_labels:
+                yield o, None, o_labels, []
 
-    os.makedirs(os.path.dirname(save_path), exist_ok=True)
-    with open(save_path, "w", encoding="utf-8") as f:
-        f.write(output)
 
-    return save_path
+# ------------------------------------------------------
+# 2. Turtle Writer
+# ------------------------------------------------------
+class TurtleWriter:
+    """
+    Writes Turtle block by block; consecutive blocks of one subject are
+    joined with ";".
+    """
+
+    def __init__(self, out: TextIO, theme: str, tbox_header: str = None):
+        self.out = out
+        self.subject = None
+        out.write("\n")
+        for prefix, ns in PREFIXES.items():
+            out.write(f"@prefix {prefix}: <{ns}> .\n")
+        out.write("\n")
+
+        # Ontology (T-Box is shown in comments)
+        out.write(tbox_header if tbox_header is not None else tbox_comment(theme))
+
+    def write(self, block: Block):
+        iri, type_iri, labels, edges = block
+        lines = []
+        if type_iri:
+            lines.append(f"a {iri_ref(type_iri)}")
+        lines += [f"rdfs:label {label_literal(l)}" for l in labels]
+        lines += [f"{iri_ref(p)} {iri_ref(o)}" for p, o in edges]
+
+        if iri == self.subject:
+            self.out.write(" ;\n    " + " ;\n    ".join(lines))
+        else:
+            if self.subject is not None:
+                self.out.write(" .\n\n")
+            self.subject = iri
+            self.out.write(iri_ref(iri) + " " + " ;\n    ".join(lines))
+
+    def close(self):
+        if self.subject is not None:
+            self.out.write(" .\n")
 
 
 # ------------------------------------------------------
-# 3. JSON-LD Exporter
+# 3. JSON-LD Writer
 # ------------------------------------------------------
-def export_jsonld(triples: List[Dict], tbox_class: str, theme: str, save_path="triples/graph.jsonld") -> str:
-    graph = []
+class JsonLdWriter:
+    """
+    Writes one JSON-LD node object per run of blocks of the same subject
+    (node objects sharing an @id are merged by JSON-LD processors).
+    """
 
-    for i, t in enumerate(triples, start=1):
-        subj = canonical_event_id(i)
-        obj = canonical_entity(t["object"])
-        pred = f"http://example.org/ontology/{slugify(t['predicate'])}"
+    def __init__(self, out: TextIO):
+        self.out = out
+        self.node = None
+        self.first = True
+        context = {
+            "@vocab": RESOURCE_NS,
+            "rdfs": PREFIXES["rdfs"],
+            "dbo": PREFIXES["dbo"],
+        }
+        out.write('{\n  "@context": ' + dump_json(context) + ',\n  "@graph": [\n')
+
+    def _flush(self):
+        if self.node is not None:
+            self.out.write(("    " if self.first else ",\n    ") + dump_json(self.node))
+            self.first = False
+
+    def write(self, block: Block):
+        iri, type_iri, labels, edges = block
+        if self.node is None or self.node["@id"] != iri:
+            self._flush()
+            self.node = {"@id": iri}
+        if type_iri:
+            self.node["@type"] = type_iri
+        if labels:
+            self.node.setdefault("rdfs:label", []).extend(
+                {"@value": l, "@language": "ar"} for l in labels
+            )
+        for p, o in edges:
+            self.node.setdefault(p, []).append({"@id": o})
+
+    def close(self):
+        self._flush()
+        self.out.write("\n  ]\n}\n")
 
-        graph.append({
-            "@id": f"http://example.org/resource/{subj[1:]}",
-            "@type": tbox_class,
-            pred: {"@id": f"http://example.org/resource/{obj[1:]}"},
-            "rdfs:label": t["subject"]
-        })
 
-    jsonld = {
-        "@context": {
-            "@vocab": "http://example.org/resource/",
-            "rdfs": "http://www.w3.org/2000/01/rdf-schema#"
-        },
-        "@graph": graph
-    }
+# ------------------------------------------------------
+# 4. N-Triples Writer
+# ------------------------------------------------------
+class NTriplesWriter:
+    """
+    Writes N-Triples (one statement per line, fully escaped).
+    """
 
-    import json
-    os.makedirs(os.path.dirname(save_path), exist_ok=True)
-    with open(save_path, "w", encoding="utf-8") as f:
-        json.dump(jsonld, f, indent=2, ensure_ascii=False)
+    def __init__(self, out: TextIO):
+        self.out = out
 
-    return save_path
+    def write(self, block: Block):
+        iri, type_iri, labels, edges = block
+        subj = iri_ref(iri)
+        if type_iri:
+            self.out.write(f"{subj} <{RDF_TYPE}> {iri_ref(type_iri)} .\n")
+        for l in labels:
+            self.out.write(f"{subj} <{RDFS_LABEL}> {label_literal(l)} .\n")
+        for p, o in edges:
+            self.out.write(f"{subj} {iri_ref(p)} {iri_ref(o)} .\n")
+
+    def close(self):
+        pass
 
 
 # ------------------------------------------------------
-# 4. N-Triples Exporter
+# 5. Streaming Export
 # ------------------------------------------------------
-def export_ntriples(triples: List[Dict], tbox_class: str, save_path="triples/graph.nt") -> str:
-    lines = []
+def _make_writer(fmt: str, out: TextIO, theme: str, tbox_header: str = None):
+    if fmt == "ttl":
+        return TurtleWriter(out, theme, tbox_header)
+    if fmt == "jsonld":
+        return JsonLdWriter(out)
+    return NTriplesWriter(out)
+
+
+class _FormatThread(threading.Thread):
+    """
+    Writes one format from a bounded queue of block batches (None ends
+    the stream). After a failure it keeps draining the queue, so the
+    canonicalization pass never blocks on it; the error is re-raised by
+    _write_formats.
+    """
 
-    for i, t in enumerate(triples, start=1):
-        subj = f"<http://example.org/resource/Event_{i}>"
-        obj = f"<http://example.org/resource/{slugify(t['object'])}>"
-        pred = f"<http://example.org/ontology/{slugify(t['predicate'])}>"
+    def __init__(self, fmt: str, path: str, gzip_output: bool, theme: str, tbox_header: str = None):
+        super().__init__(name=f"rdf-export-{fmt}", daemon=True)
+        self.fmt = fmt
+        self.path = path
+        self.gzip_output = gzip_output
+        self.theme = theme
+        self.tbox_header = tbox_header
+        self.queue: "queue.Queue[Optional[List[Block]]]" = queue.Queue(maxsize=EXPORT_QUEUE)
+        self.seconds = 0.0
+        self.error: Optional[BaseException] = None
+
+    def run(self):
+        ended = False
+        try:
+            start = time.perf_counter()
+            # Each batch is rendered into memory and handed to the file
+            # (and gzip) in one call, which runs without the GIL
+            buffer = io.StringIO()
+            with open_output(self.path, self.gzip_output) as out:
+                writer = _make_writer(self.fmt, buffer, self.theme, self.tbox_header)
+                self.seconds += time.perf_counter() - start
+                while True:
+                    batch = self.queue.get()
+                    if batch is None:
+                        ended = True
+                        break
+                    start = time.perf_counter()
+                    for block in batch:
+                        writer.write(block)
+                    out.write(buffer.getvalue())
+                    buffer.seek(0)
+                    buffer.truncate()
+                    self.seconds += time.perf_counter() - start
+                start = time.perf_counter()
+                writer.close()
+                out.write(buffer.getvalue())
+            self.seconds += time.perf_counter() - start
+        except BaseException as e:
+            self.error = e
+            while not ended:
+                ended = self.queue.get() is None
+
+
+def _write_sequential(
+    triples: Iterable[Dict],
+    tbox_class: str,
+    theme: str,
+    paths: Dict[str, str],
+    gzip_output: bool,
+    tbox_header: str
+) -> Dict[str, float]:
+    """
+    Writes every format from one pass on the calling thread.
+    """
+    handles, writers = {}, {}
+    seconds = dict.fromkeys(paths, 0.0)
+
+    try:
+        for fmt, path in paths.items():
+            start = time.perf_counter()
+            handles[fmt] = out = open_output(path, gzip_output)
+            writers[fmt] = _make_writer(fmt, out, theme, tbox_header)
+            seconds[fmt] += time.perf_counter() - start
+
+        for block in Canonicalizer(tbox_class).blocks(triples):
+            for fmt, writer in writers.items():
+                start = time.perf_counter()
+                writer.write(block)
+                seconds[fmt] += time.perf_counter() - start
+
+        for fmt, writer in writers.items():
+            start = time.perf_counter()
+            writer.close()
+            handles.pop(fmt).close()
+            seconds[fmt] += time.perf_counter() - start
+    finally:
+        for out in handles.values():
+            out.close()
+
+    return seconds
+
+
+def _write_concurrent(
+    triples: Iterable[Dict],
+    tbox_class: str,
+    theme: str,
+    paths: Dict[str, str],
+    gzip_output: bool,
+    tbox_header: str
+) -> Dict[str, float]:
+    """
+    One canonicalization pass on the calling thread, one writer thread
+    per format fed through bounded queues. Formatting holds the GIL, but
+    gzip compression and file writes release it, so the formats overlap
+    and a slow writer only stalls the pass once its queue is full.
+    """
+    threads = [_FormatThread(fmt, path, gzip_output, theme, tbox_header) for fmt, path in paths.items()]
+    for thread in threads:
+        thread.start()
+
+    try:
+        batch: List[Block] = []
+        for block in Canonicalizer(tbox_class).blocks(triples):
+            batch.append(block)
+            if len(batch) >= EXPORT_BATCH:
+                for thread in threads:
+                    thread.queue.put(batch)
+                batch = []
+        if batch:
+            for thread in threads:
+                thread.queue.put(batch)
+    finally:
+        for thread in threads:
+            thread.queue.put(None)
+        for thread in threads:
+            thread.join()
+
+    for thread in threads:
+        if thread.error is not None:
+            raise thread.error
+    return {thread.fmt: thread.seconds for thread in threads}
+
+
+def _write_formats(
+    triples: Iterable[Dict],
+    tbox_class: str,
+    theme: str,
+    targets: Dict[str, str],
+    gzip_output: bool = False,
+    tbox_header: str = None,
+    parallel: bool = False
+) -> Dict[str, Dict]:
+    """
+    One canonicalization pass feeding every writer in `targets`
+    ({fmt: save_path}), on one thread per format when `parallel` is set.
+    Reports {fmt: {"path", "bytes", "seconds"}}, where seconds is the
+    time spent in that format's writer.
+    """
+    paths = {fmt: output_path(path, gzip_output) for fmt, path in targets.items()}
+    write = _write_concurrent if parallel and len(paths) > 1 else _write_sequential
+    seconds = write(triples, tbox_class, theme, paths, gzip_output, tbox_header)
+
+    return {
+        fmt: {
+            "path": path,
+            "bytes": os.path.getsize(path),
+            "seconds": round(seconds[fmt], 4),
+        }
+        for fmt, path in paths.items()
+    }
+
+
+def export_turtle(
+    triples: Iterable[Dict],
+    tbox_class: str,
+    theme: str,
+    save_path="triples/graph.ttl",
+    gzip_output: bool = False,
+    tbox_header: str = None
+) -> str:
+    """
+    Streams Turtle to disk. `tbox_header` is the pre-rendered T-Box
+    comment (see tbox_comment).
+    """
+    return _write_formats(triples, tbox_class, theme, {"ttl": save_path}, gzip_output, tbox_header)["ttl"]["path"]
 
-        lines.append(f"{subj} <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <{tbox_class}> .")
-        lines.append(f"{subj} {pred} {obj} .\n")
 
-    output = "\n".join(lines)
+def export_jsonld(
+    triples: Iterable[Dict],
+    tbox_class: str,
+    theme: str,
+    save_path="triples/graph.jsonld",
+    gzip_output: bool = False
+) -> str:
+    """
+    Streams a JSON-LD document to disk.
+    """
+    return _write_formats(triples, tbox_class, theme, {"jsonld": save_path}, gzip_output)["jsonld"]["path"]
 
-    os.makedirs(os.path.dirname(save_path), exist_ok=True)
-    with open(save_path, "w", encoding="utf-8") as f:
-        f.write(output)
 
-    return save_path
+def export_ntriples(
+    triples: Iterable[Dict],
+    tbox_class: str,
+    save_path="triples/graph.nt",
+    gzip_output: bool = False
+) -> str:
+    """
+    Streams N-Triples to disk.
+    """
+    return _write_formats(triples, tbox_class, "event", {"nt": save_path}, gzip_output)["nt"]["path"]
 
 
 # ------------------------------------------------------
-# 5. Unified RDF Exporter
+# 6. Unified RDF Exporter
 # ------------------------------------------------------
-def export_rdf(triples: List[Dict], tbox_class: str, theme="event", formats=None, folder="triples/"):
+def export_rdf(
+    triples: Union[Iterable[Dict], TripleStore],
+    tbox_class: str,
+    theme="event",
+    formats=None,
+    folder="triples/",
+    gzip_output: bool = False,
+    parallel: bool = True
+) -> Dict[str, Dict]:
     """
     Exports in multiple formats:
     - ttl
     - jsonld
     - nt
+
+    `triples` may be any iterable of dicts (read once) or a TripleStore,
+    which is decoded row by row. gzip_output=True writes graph.<ext>.gz
+    files.
+
+    Each triple is canonicalized once and handed to every format through
+    bounded queues, so memory stays flat however large the corpus is.
+    With parallel=True (the default) each format is written on its own
+    thread and export time approaches that of the slowest format rather
+    than the sum. Threads only: export_rdf runs inside the threaded
+    Flask server, where forking would copy held locks into children.
+    Returns {fmt: {"path", "bytes", "seconds"}}.
     """
 
     if formats is None:
         formats = ["ttl", "jsonld", "nt"]
+    formats = [f for f in ("ttl", "jsonld", "nt") if f in formats]
 
     os.makedirs(folder, exist_ok=True)
+    targets = {fmt: os.path.join(folder, f"graph.{fmt}") for fmt in formats}
+    tbox_header = tbox_comment(theme) if "ttl" in formats else None
 
-    paths = {}
-
-    if "ttl" in formats:
-        paths["ttl"] = export_turtle(triples, tbox_class, theme, os.path.join(folder, "graph.ttl"))
-
-    if "jsonld" in formats:
-        paths["jsonld"] = export_jsonld(triples, tbox_class, theme, os.path.join(folder, "graph.jsonld"))
-
-    if "nt" in formats:
-        paths["nt"] = export_ntriples(triples, tbox_class, os.path.join(folder, "graph.nt"))
-
-    return paths
+    # On a single core the writer threads could only take turns
+    parallel = parallel and (os.cpu_count() or 1) > 1
+    return _write_formats(triples, tbox_class, theme, targets, gzip_output, tbox_header, parallel)
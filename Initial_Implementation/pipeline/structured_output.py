@@ -0,0 +1,243 @@
+"""
+structured_output.py
+---------------------
+Shared structured-output layer for every LLM stage.
+
+Provides:
+- JSON schemas for topics, keywords, themes, triple lists and repaired triples
+- response_format builder (JSON-schema mode where the model supports it,
+  plain JSON mode otherwise)
+- Safe JSON loading (markdown fences, surrounding prose)
+- Local schema validation of the parsed result
+- Per-stage parse-failure counters (get_parse_stats)
+"""
+
+import json
+import re
+import threading
+from typing import Any, Dict, List
+
+
+# ------------------------------------------------------
+# 1. JSON Schemas
+# ------------------------------------------------------
+THEMES = ["event", "cultural", "other"]
+
+STRING_LIST = {"type": "array", "items": {"type": "string"}}
+
+TRIPLE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "subject": {"type": "string"},
+        "predicate": {"type": "string"},
+        "object": {"type": "string"},
+        "span": {"type": "string"},
+    },
+    "required": ["subject", "predicate", "object", "span"],
+    "additionalProperties": False,
+}
+
+SCHEMAS = {
+    "topics": {
+        "type": "object",
+        "properties": {"topics": STRING_LIST},
+        "required": ["topics"],
+        "additionalProperties": False,
+    },
+    "keywords": {
+        "type": "object",
+        "properties": {"keywords": STRING_LIST},
+        "required": ["keywords"],
+        "additionalProperties": False,
+    },
+    "topics_keywords": {
+        "type": "object",
+        "properties": {"topics": STRING_LIST, "keywords": STRING_LIST},
+        "required": ["topics", "keywords"],
+        "additionalProperties": False,
+    },
+    "theme": {
+        "type": "object",
+        "properties": {"theme": {"type": "string", "enum": THEMES}},
+        "required": ["theme"],
+        "additionalProperties": False,
+    },
+    "segment_themes": {
+        "type": "object",
+        "properties": {"themes": {"type": "array", "items": {"type": "string", "enum": THEMES}}},
+        "required": ["themes"],
+        "additionalProperties": False,
+    },
+    "triple_list": {
+        "type": "object",
+        "properties": {"triples": {"type": "array", "items": TRIPLE_SCHEMA}},
+        "required": ["triples"],
+        "additionalProperties": False,
+    },
+    "triple": TRIPLE_SCHEMA,
+}
+
+
+# ------------------------------------------------------
+# 2. Backend capability → response_format
+# ------------------------------------------------------
+# Models that accept response_format={"type": "json_schema", ...}
+STRUCTURED_OUTPUT_MODELS = {
+    "gpt-4.1", "gpt-4.1-mini", "gpt-4.1-nano",
+    "gpt-4o", "gpt-4o-mini",
+}
+
+
+def response_format_for(schema_name: str, model: str) -> Dict[str, Any]:
+    """
+    Returns the response_format argument for a chat completion:
+    schema-constrained when the model supports it, JSON mode otherwise
+    (the result is then validated locally by parse_structured).
+    """
+    if model in STRUCTURED_OUTPUT_MODELS:
+        return {
+            "type": "json_schema",
+            "json_schema": {
+                "name": schema_name,
+                "schema": SCHEMAS[schema_name],
+                "strict": True,
+            },
+        }
+    return {"type": "json_object"}
+
+
+# ------------------------------------------------------
+# 3. Safe JSON loading
+# ------------------------------------------------------
+def safe_load_json(response: str) -> Any:
+    """
+    Attempts to parse JSON regardless of model formatting oddities:
+    markdown fences and prose around the JSON value.
+    """
+    try:
+        return json.loads(response)
+    except Exception:
+        pass
+
+    # Remove Markdown fences if present
+    if "```" in response:
+        txt = response.replace("```json", "").replace("```", "").strip()
+        try:
+            return json.loads(txt)
+        except Exception:
+            pass
+
+    # Outermost {...} or [...] block
+    match = re.search(r"[\[{].*[\]}]", response or "", re.S)
+    if match:
+        try:
+            return json.loads(match.group(0))
+        except Exception:
+            pass
+
+    raise ValueError(f"❌ Model returned invalid JSON:\n{response}")
+
+
+# ------------------------------------------------------
+# 4. Local schema validation (subset used by SCHEMAS)
+# ------------------------------------------------------
+_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "number": (int, float),
+    "integer": int,
+    "boolean": bool,
+}
+
+
+def validate_schema(data: Any, schema: Dict[str, Any], path: str = "$") -> List[str]:
+    """
+    Returns a list of validation errors (empty list = valid).
+    Supports type, enum, properties, required, additionalProperties, items.
+    """
+    errors = []
+
+    expected = schema.get("type")
+    if expected and not isinstance(data, _TYPES[expected]):
+        return [f"{path}: expected {expected}, got {type(data).__name__}"]
+
+    if "enum" in schema and data not in schema["enum"]:
+        errors.append(f"{path}: {data!r} not in {schema['enum']}")
+
+    if expected == "object":
+        props = schema.get("properties", {})
+        for key in schema.get("required", []):
+            if key not in data:
+                errors.append(f"{path}: missing '{key}'")
+        for key, value in data.items():
+            if key in props:
+                errors.extend(validate_schema(value, props[key], f"{path}.{key}"))
+            elif schema.get("additionalProperties") is False:
+                errors.append(f"{path}: unexpected '{key}'")
+
+    if expected == "array" and "items" in schema:
+        for i, item in enumerate(data):
+            errors.extend(validate_schema(item, schema["items"], f"{path}[{i}]"))
+
+    return errors
+
+
+def is_valid(data: Any, schema_name: str) -> bool:
+    return not validate_schema(data, SCHEMAS[schema_name])
+
+
+# ------------------------------------------------------
+# 5. Per-stage parse statistics
+# ------------------------------------------------------
+_STATS_LOCK = threading.Lock()
+_PARSE_STATS: Dict[str, Dict[str, int]] = {}
+
+
+def record_parse(stage: str, ok: bool):
+    """
+    Counts one parse attempt for a pipeline stage.
+    """
+    with _STATS_LOCK:
+        stats = _PARSE_STATS.setdefault(stage, {"calls": 0, "failures": 0})
+        stats["calls"] += 1
+        if not ok:
+            stats["failures"] += 1
+
+
+def get_parse_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Returns {stage: {"calls", "failures", "failure_rate"}}.
+    """
+    with _STATS_LOCK:
+        return {
+            stage: {
+                **s,
+                "failure_rate": s["failures"] / s["calls"] if s["calls"] else 0.0
+            }
+            for stage, s in _PARSE_STATS.items()
+        }
+
+
+# ------------------------------------------------------
+# 6. Parse + validate in one step
+# ------------------------------------------------------
+def parse_structured(raw: str, schema_name: str, stage: str) -> Any:
+    """
+    Loads the model output, validates it against SCHEMAS[schema_name]
+    and records the outcome for `stage`.
+    Raises ValueError on invalid JSON or schema violations.
+    """
+    try:
+        data = safe_load_json(raw)
+    except ValueError:
+        record_parse(stage, False)
+        raise
+
+    errors = validate_schema(data, SCHEMAS[schema_name])
+    record_parse(stage, not errors)
+
+    if errors:
+        raise ValueError(f"❌ Model output does not match schema '{schema_name}': {errors}\n{raw}")
+
+    return data
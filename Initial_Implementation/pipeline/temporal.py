@@ -0,0 +1,241 @@
+"""
+temporal.py
+-------------------
+Temporal normalization for date mentions in triples.
+
+Parses Arabic / English date expressions into day intervals:
+- ISO and numeric dates: "1970-09-17", "1970-09", "17/9/1970"
+- Month names (Gregorian, Levantine, English): "17 أيلول 1970", "حزيران 1967", "June 1967"
+- Hijri dates (month names or a هـ / AH marker): "رمضان 1390", "1390 هـ"
+- Years, decades and ranges: "1970", "الستينيات", "1960s", "من 1967 إلى 1971"
+
+An interval is (start, end, precision) with start / end as proleptic
+Gregorian ordinals (datetime.date.toordinal), both inclusive, and
+precision one of "day", "month", "year", "decade", "range".
+
+normalize_temporal() rewrites occurredOn objects to a canonical ISO label
+("1970-09-17", "1970-09", "1970", or "start/end"), so the same date
+written two ways becomes one graph node.
+"""
+
+import calendar
+import math
+import re
+from datetime import date
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from pipeline.text_normalizer import normalize_arabic
+
+
+Interval = Tuple[int, int, str]
+
+DATE_PREDICATES = {"occurredOn"}
+
+# Eastern Arabic / Persian digits → ASCII
+DIGITS = str.maketrans("٠١٢٣٤٥٦٧٨٩۰۱۲۳۴۵۶۷۸۹", "01234567890123456789")
+
+
+# ------------------------------------------------------
+# Month names (matched after normalize_arabic)
+# ------------------------------------------------------
+GREGORIAN_MONTHS = {
+    1: ["يناير", "كانون الثاني", "january", "jan"],
+    2: ["فبراير", "شباط", "february", "feb"],
+    3: ["مارس", "آذار", "march", "mar"],
+    4: ["أبريل", "إبريل", "نيسان", "april", "apr"],
+    5: ["مايو", "أيار", "may"],
+    6: ["يونيو", "يونيه", "حزيران", "june", "jun"],
+    7: ["يوليو", "يوليه", "تموز", "july", "jul"],
+    8: ["أغسطس", "آب", "august", "aug"],
+    9: ["سبتمبر", "أيلول", "september", "sep", "sept"],
+    10: ["أكتوبر", "تشرين الأول", "october", "oct"],
+    11: ["نوفمبر", "تشرين الثاني", "november", "nov"],
+    12: ["ديسمبر", "كانون الأول", "december", "dec"],
+}
+
+HIJRI_MONTHS = {
+    1: ["محرم"],
+    2: ["صفر"],
+    3: ["ربيع الأول"],
+    4: ["ربيع الآخر", "ربيع الثاني"],
+    5: ["جمادى الأولى"],
+    6: ["جمادى الآخرة", "جمادى الثانية"],
+    7: ["رجب"],
+    8: ["شعبان"],
+    9: ["رمضان"],
+    10: ["شوال"],
+    11: ["ذو القعدة"],
+    12: ["ذو الحجة"],
+}
+
+DECADES = {
+    "العشرينيات": 1920, "الثلاثينيات": 1930, "الأربعينيات": 1940,
+    "الخمسينيات": 1950, "الستينيات": 1960, "السبعينيات": 1970,
+    "الثمانينيات": 1980, "التسعينيات": 1990,
+}
+
+
+def _month_table(months: Dict[int, List[str]]) -> Dict[str, int]:
+    return {normalize_arabic(name).lower(): m for m, names in months.items() for name in names}
+
+
+MONTHS = {**{k: ("g", m) for k, m in _month_table(GREGORIAN_MONTHS).items()},
+          **{k: ("h", m) for k, m in _month_table(HIJRI_MONTHS).items()}}
+DECADE_WORDS = {normalize_arabic(k): v for k, v in DECADES.items()}
+
+
+def _alternation(words) -> str:
+    # Longest first so "تشرين الاول" wins over shorter prefixes
+    return "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+
+
+def _hijri_mark(name: str) -> str:
+    # "هـ" is "ه" once the tatweel is removed
+    return rf"(?P<{name}>\s*(?:هجريه|هجري|ه|ah|a\.h\.)(?!\w))?"
+
+DATE_PATTERN = re.compile(
+    r"(?P<iso>(?<!\d)(?P<iy>\d{4})-(?P<im>\d{1,2})(?:-(?P<id>\d{1,2}))?(?!\d))"
+    r"|(?P<dmy>(?<!\d)(?P<nd>\d{1,2})[/.](?P<nm>\d{1,2})[/.](?P<ny>\d{4})(?!\d))"
+    rf"|(?P<named>(?:(?<!\d)(?P<md>\d{{1,2}})\s+)?(?P<month>{_alternation(MONTHS)})\s*,?\s*(?P<my>\d{{3,4}})(?!\d){_hijri_mark('mh')})"
+    r"|(?P<decade>(?<!\d)(?P<dy>\d{3}0)s(?![\w])"
+    rf"|(?:{_alternation(DECADE_WORDS)}))"
+    rf"|(?P<year>(?<!\d)(?P<yy>\d{{3,4}})(?!\d){_hijri_mark('yh')})",
+    re.IGNORECASE
+)
+
+
+# ------------------------------------------------------
+# Calendar arithmetic
+# ------------------------------------------------------
+def hijri_to_ordinal(year: int, month: int = 1, day: int = 1) -> int:
+    """Tabular (arithmetic) Islamic calendar → Gregorian ordinal."""
+    jdn = day + math.ceil(29.5 * (month - 1)) + (year - 1) * 354 + (3 + 11 * year) // 30 + 1948439
+    return jdn - 1721425
+
+
+def _gregorian(year: int, month: Optional[int] = None, day: Optional[int] = None) -> Interval:
+    if day:
+        d = date(year, month, day).toordinal()
+        return d, d, "day"
+    if month:
+        last = calendar.monthrange(year, month)[1]
+        return date(year, month, 1).toordinal(), date(year, month, last).toordinal(), "month"
+    return date(year, 1, 1).toordinal(), date(year, 12, 31).toordinal(), "year"
+
+
+def _hijri(year: int, month: Optional[int] = None, day: Optional[int] = None) -> Interval:
+    if day:
+        d = hijri_to_ordinal(year, month, day)
+        return d, d, "day"
+    if month:
+        end = hijri_to_ordinal(year + month // 12, month % 12 + 1, 1) - 1
+        return hijri_to_ordinal(year, month, 1), end, "month"
+    return hijri_to_ordinal(year, 1, 1), hijri_to_ordinal(year + 1, 1, 1) - 1, "year"
+
+
+def _mention_interval(m: re.Match) -> Optional[Interval]:
+    if m.group("iso"):
+        return _gregorian(int(m.group("iy")), int(m.group("im")), int(m.group("id") or 0) or None)
+
+    if m.group("dmy"):
+        return _gregorian(int(m.group("ny")), int(m.group("nm")), int(m.group("nd")))
+
+    if m.group("named"):
+        kind, month = MONTHS[m.group("month").lower()]
+        day = int(m.group("md")) if m.group("md") else None
+        hijri = kind == "h" or bool(m.group("mh"))
+        return (_hijri if hijri else _gregorian)(int(m.group("my")), month, day)
+
+    if m.group("decade"):
+        start = int(m.group("dy")) if m.group("dy") else DECADE_WORDS[m.group("decade")]
+        return date(start, 1, 1).toordinal(), date(start + 9, 12, 31).toordinal(), "decade"
+
+    year = int(m.group("yy"))
+    return (_hijri if m.group("yh") else _gregorian)(year)
+
+
+# ------------------------------------------------------
+# Parsing
+# ------------------------------------------------------
+@lru_cache(maxsize=1 << 16)
+def parse_date(text: str) -> Optional[Interval]:
+    """
+    Interval covered by the date mention(s) in `text`, or None.
+    Several mentions ("من 1967 إلى 1971") give the span from the
+    earliest start to the latest end.
+    """
+    if not text:
+        return None
+
+    text = normalize_arabic(str(text).translate(DIGITS)).lower()
+
+    intervals = []
+    for m in DATE_PATTERN.finditer(text):
+        try:
+            interval = _mention_interval(m)
+        except (ValueError, OverflowError):
+            continue  # impossible date, e.g. "1970-13-40"
+        if interval:
+            intervals.append(interval)
+
+    if not intervals:
+        return None
+    if len(intervals) == 1:
+        return intervals[0]
+    return min(i[0] for i in intervals), max(i[1] for i in intervals), "range"
+
+
+def interval_label(interval: Interval) -> str:
+    """Canonical ISO label: "1970-09-17", "1970-09", "1970" or "start/end"."""
+    start, end, precision = interval
+    first, last = date.fromordinal(start), date.fromordinal(end)
+    if precision == "day":
+        return first.isoformat()
+    if precision == "month" and first.day == 1 and (first.year, first.month) == (last.year, last.month):
+        return f"{first.year:04d}-{first.month:02d}"
+    if precision == "year" and (first.month, first.day, last.month, last.day) == (1, 1, 12, 31):
+        return f"{first.year:04d}"
+    return f"{first.isoformat()}/{last.isoformat()}"
+
+
+def interval_dict(interval: Interval) -> Dict[str, str]:
+    start, end, precision = interval
+    return {
+        "start": date.fromordinal(start).isoformat(),
+        "end": date.fromordinal(end).isoformat(),
+        "precision": precision
+    }
+
+
+# ------------------------------------------------------
+# Pipeline stage
+# ------------------------------------------------------
+def normalize_temporal(triples: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Rewrites the object of date triples (occurredOn) to its canonical
+    ISO label; unparseable dates are kept as written. The original
+    wording stays in the triple's span.
+    """
+    normalized = []
+    for t in triples:
+        if t.get("predicate") in DATE_PREDICATES:
+            interval = parse_date(t.get("object", ""))
+            if interval:
+                t = {**t, "object": interval_label(interval)}
+        normalized.append(t)
+    return normalized
+
+
+# ------------------------------------------------------
+# Module Test
+# ------------------------------------------------------
+if __name__ == "__main__":
+    samples = [
+        "1970-09-17", "17 أيلول 1970", "١٧ سبتمبر ١٩٧٠", "حزيران 1967", "June 1967",
+        "1970", "عام 1390 هـ", "رمضان 1390", "الستينيات", "1960s",
+        "من 1967 إلى 1971", "غير معروف",
+    ]
+    for s in samples:
+        interval = parse_date(s)
+        print(f"{s:20} → {interval_label(interval) if interval else None}")
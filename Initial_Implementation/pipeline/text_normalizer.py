@@ -13,7 +13,7 @@ This module:
 
 import re
 import unicodedata
-from typing import List
+from typing import List, Tuple
 
 
 # ------------------------------------------------------
@@ -79,8 +79,9 @@ def normalize_english(text: str) -> str:
     if not isinstance(text, str):
         return text
 
-    # Remove control chars
-    text = re.sub(r"[\x00-\x1F\x7F]", "", text)
+    # Remove control chars (tabs/newlines become spaces below, so
+    # sentences on separate lines do not get glued together)
+    text = re.sub(r"[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]", "", text)
 
     # Normalize whitespace
     text = re.sub(r"\s+", " ", text)
@@ -137,6 +138,46 @@ def split_sentences(text: str) -> List[str]:
     return [clean_text(s) for s in sentences if s.strip()]
 
 
+# ------------------------------------------------------
+# Sentence Offsets (no copying, no re-cleaning)
+# ------------------------------------------------------
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?؟])\s+|\n+")
+
+
+def sentence_spans(text: str) -> List[Tuple[int, int]]:
+    """
+    Returns (start, end) offsets of the sentences in `text`.
+    Boundaries are sentence punctuation followed by whitespace, or
+    line breaks. Offsets index the given text as-is, so callers can
+    slice the original string.
+    """
+
+    if not text:
+        return []
+
+    spans = []
+    start = 0
+
+    for m in SENTENCE_BOUNDARY.finditer(text):
+        if text[start:m.start()].strip():
+            spans.append((start, m.start()))
+        start = m.end()
+
+    if text[start:].strip():
+        spans.append((start, len(text)))
+
+    # Trim surrounding whitespace inside each span
+    trimmed = []
+    for s, e in spans:
+        while s < e and text[s].isspace():
+            s += 1
+        while e > s and text[e - 1].isspace():
+            e -= 1
+        trimmed.append((s, e))
+
+    return trimmed
+
+
 # ------------------------------------------------------
 # Chunking for LLM (1200–1500 chars per block)
 # ------------------------------------------------------
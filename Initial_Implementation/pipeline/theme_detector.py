@@ -10,23 +10,34 @@ Themes:
 
 Pipeline:
 1. Clean + normalize text
-2. Apply lightweight rule-based hints
-3. Ask OpenAI to classify into one of the themes
-4. Allow user override if "other"
+2. Apply lightweight rule-based hints (single-pass weighted keyword matcher)
+3. Local hashed n-gram classifier (optional, trained from past LLM labels)
+4. Ask OpenAI to classify into one of the themes
+   (only when neither local tier is confident enough)
+5. Allow user override if "other"
 
 The returned theme will later determine which T-Box class
 (event ontology, cultural ontology, or user-defined class)
 should be applied in triple generation.
+
+detect_segment_themes classifies each segment of a document: the
+rule-based matcher first, then one batched LLM call for the ambiguous
+segments. Results are kept in a bounded LRU cache keyed by segment hash.
 """
 
-import json
+import hashlib
 import os
-from typing import Dict, Any
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Tuple
 
 from openai import OpenAI
 from dotenv import load_dotenv
 
-from .text_normalizer import clean_text, prepare_for_topic_detection
+from .text_normalizer import clean_text, prepare_for_topic_detection, normalize_arabic
+from .local_classifier import HashedLinearClassifier, append_history, train_from_history
+from .structured_output import response_format_for, parse_structured
 
 
 # ------------------------------------------------------
@@ -44,36 +55,158 @@ client = OpenAI(api_key=OPENAI_API_KEY)
 # ------------------------------------------------------
 # Lightweight Rule-Based Detector (pre-filter)
 # ------------------------------------------------------
-def rule_based_theme(text: str) -> str | None:
+# Keyword → weight per theme. Strong, unambiguous triggers weigh 2,
+# generic ones weigh 1. Arabic keywords are normalized at compile time.
+THEME_KEYWORDS = {
+    "event": {
+        "war": 2, "battle": 2, "conference": 2, "summit": 2, "attack": 2,
+        "explosion": 2, "massacre": 2, "treaty": 2, "invasion": 2,
+        "event": 1, "crisis": 1, "meeting": 1, "agreement": 1, "protest": 1, "incident": 1,
+        "حرب": 2, "معركه": 2, "مؤتمر": 2, "قمه": 2, "انفجار": 2, "هجوم": 2,
+        "اشتباك": 2, "اغتيال": 2, "اجتياح": 2, "مجزره": 2, "معاهده": 2, "انتفاضه": 2,
+        "حدث": 1, "اجتماع": 1, "ازمه": 1, "صدام": 1, "عمليه": 1, "اتفاق": 1,
+    },
+    "cultural": {
+        "culture": 2, "heritage": 2, "folklore": 2, "tradition": 2, "music": 2,
+        "identity": 1, "language": 1, "art": 1, "customs": 1,
+        "ثقافه": 2, "تراث": 2, "عادات": 2, "تقاليد": 2, "موسيقي": 2, "فلكلور": 2, "دبكه": 2,
+        "هويه": 1, "لغه": 1, "ادب": 1, "فن": 1, "شعر": 1, "اغنيه": 1,
+    },
+}
+
+# Minimum confidence for a rule-based decision; below it the LLM decides.
+# Hits of one theme only need a total weight of 2 (one strong or two
+# generic keywords); mixed hits need about a 3:1 weight margin.
+RULE_CONFIDENCE_THRESHOLD = 0.65
+
+# Pseudo-count added to the denominator: little evidence → low confidence
+RULE_SMOOTHING = 1
+
+# Optional Arabic proclitics (و، ف، ب، ل، ال ...) allowed before a keyword
+_CLITICS = "(?:وال|فال|بال|كال|لل|ال|و|ف|ب|ل)?"
+
+# Optional suffixes after a keyword: Arabic plural / dual / pronoun
+# endings (normalized, ة → ه) and English plurals
+_SUFFIXES = "(?:هما|هم|هن|ها|ات|ين|ون|ان|يه|كم|نا|ه|ي|ك|es|s)?"
+
+
+def _compile_keyword_matcher(keywords: Dict[str, Dict[str, int]]):
+    """
+    Builds one alternation regex over every keyword of every theme
+    (longest first) plus a lookup of keyword → (theme, weight).
+    Matches start and end at a word boundary; only the known clitics
+    and suffixes may surround a keyword, so plural and possessive forms
+    count but longer words that merely start with one ("warning",
+    "فنادق") do not.
+    """
+    lookup = {}
+    for theme, words in keywords.items():
+        for word, weight in words.items():
+            lookup[normalize_arabic(word).lower()] = (theme, weight)
+
+    alternation = "|".join(re.escape(w) for w in sorted(lookup, key=len, reverse=True))
+    pattern = re.compile(rf"(?<!\w){_CLITICS}({alternation}){_SUFFIXES}(?!\w)")
+
+    return pattern, lookup
+
+
+KEYWORD_PATTERN, KEYWORD_LOOKUP = _compile_keyword_matcher(THEME_KEYWORDS)
+
+
+def score_themes(text: str) -> Dict[str, int]:
+    """
+    Scans the text once and returns the weighted keyword hits per theme.
+    """
+    scores = {theme: 0 for theme in THEME_KEYWORDS}
+
+    for match in KEYWORD_PATTERN.finditer(text.lower()):
+        theme, weight = KEYWORD_LOOKUP[match.group(1)]
+        scores[theme] += weight
+
+    return scores
+
+
+def rule_based_theme_scored(text: str) -> Tuple[str | None, float]:
+    """
+    Returns (best_theme, confidence).
+
+    confidence = best / (best + runner_up + RULE_SMOOTHING)
+    → grows with the evidence for one theme (a single generic hit: 0.5,
+    one strong hit: 0.67), lower the more evenly both themes are present.
+    best_theme is None when there are no hits at all.
+    """
+    scores = score_themes(text)
+    ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+
+    best_theme, best = ranked[0]
+    runner_up = ranked[1][1] if len(ranked) > 1 else 0
+
+    if best == 0:
+        return None, 0.0
+
+    return best_theme, best / (best + runner_up + RULE_SMOOTHING)
+
+
+def rule_based_theme(text: str, threshold: float = RULE_CONFIDENCE_THRESHOLD) -> str | None:
     """
     Detect obvious cases to help the LLM.
     Returns:
         "event", "cultural", or None (means let LLM decide).
     """
 
-    t = text.lower()
+    theme, confidence = rule_based_theme_scored(text)
+    if theme and confidence >= threshold:
+        return theme
 
-    # Event triggers
-    event_keywords = [
-        "event", "war", "conference", "summit", "attack", "explosion",
-        "crisis", "meeting", "agreement", "protest", "incident",
-        "حدث", "اجتماع", "مؤتمر", "قمه", "ازمه", "انفجار", "هجوم", "صدام", "عمليه", "اتفاق"
-    ]
+    return None  # uncertain → let LLM handle it
+
+
+# ------------------------------------------------------
+# Local Classifier Tier (optional)
+# ------------------------------------------------------
+# Every LLM decision is appended to THEME_HISTORY_PATH; a model trained on
+# that history (train_theme_classifier) is picked up from THEME_MODEL_PATH.
+THEME_MODEL_PATH = os.path.join("models", "theme_classifier.npz")
+THEME_HISTORY_PATH = os.path.join("models", "theme_history.jsonl")
 
-    # Cultural triggers
-    cultural_keywords = [
-        "culture", "heritage", "identity", "tradition", "language",
-        "art", "music", "folklore", "customs",
-        "ثقافه", "تراث", "هويه", "عادات", "تقاليد", "لغه", "ادب", "فن", "موسيقى"
-    ]
+# Minimum class probability for a local decision; below it the LLM decides
+LOCAL_CONFIDENCE_THRESHOLD = 0.8
 
-    if any(k in t for k in event_keywords):
-        return "event"
+_LOCAL_MODEL: Dict[str, Any] = {"model": None, "mtime": None}
 
-    if any(k in t for k in cultural_keywords):
-        return "cultural"
 
-    return None  # uncertain → let LLM handle it
+def local_theme_classifier() -> HashedLinearClassifier | None:
+    """
+    Returns the trained local classifier, or None if no model exists.
+    Reloads automatically when the model file is retrained.
+    """
+    if not os.path.exists(THEME_MODEL_PATH):
+        return None
+
+    mtime = os.path.getmtime(THEME_MODEL_PATH)
+    if _LOCAL_MODEL["mtime"] != mtime:
+        _LOCAL_MODEL["model"] = HashedLinearClassifier.load(THEME_MODEL_PATH)
+        _LOCAL_MODEL["mtime"] = mtime
+
+    return _LOCAL_MODEL["model"]
+
+
+def local_theme_predictions(texts: List[str]) -> List[Tuple[str | None, float]]:
+    """
+    Batch prediction with the local classifier.
+    Returns (None, 0.0) for every text when no model is available.
+    """
+    model = local_theme_classifier()
+    if model is None:
+        return [(None, 0.0)] * len(texts)
+    return model.predict(texts)
+
+
+def train_theme_classifier() -> HashedLinearClassifier:
+    """
+    Retrains the local classifier from the recorded LLM decisions.
+    """
+    return train_from_history(THEME_HISTORY_PATH, THEME_MODEL_PATH)
 
 
 # ------------------------------------------------------
@@ -87,7 +220,7 @@ THEME_PROMPT = """
 3. "other"      → إذا لم يكن النص ينتمي إلى الفئتين السابقتين.
 
 ❗ تعليمات:
-- أعد فقط JSON بهذا الشكل: {"theme": "event"} أو {"theme": "cultural"} أو {"theme": "other"}
+- أعد فقط JSON بهذا الشكل: {{"theme": "event"}} أو {{"theme": "cultural"}} أو {{"theme": "other"}}
 - بدون أي شرح خارجي.
 - ركّز على المعنى العام وليس الكلمات المفردة فقط.
 
@@ -97,24 +230,32 @@ THEME_PROMPT = """
 
 
 # ------------------------------------------------------
-# Utility: Safe JSON Loader
+# Batched LLM Prompt for Segment Classification
 # ------------------------------------------------------
-def safe_load_json(response: str) -> Dict[str, Any]:
-    """
-    Attempts to decode model response as JSON.
-    """
-    try:
-        return json.loads(response)
-    except:
-        # Remove markdown formatting if present
-        if "```" in response:
-            txt = response.replace("```json", "").replace("```", "").strip()
-            try:
-                return json.loads(txt)
-            except:
-                pass
+SEGMENT_THEME_PROMPT = """
+صنّف كل مقطع من المقاطع المرقّمة التالية ضمن أحد الأنواع التالية فقط:
 
-    raise ValueError(f"❌ Invalid JSON returned by model:\n{response}")
+1. "event"      → حدث، واقعه، لقاء، مؤتمر، صراع، انفجار، كارثه، اجتماع... إلخ.
+2. "cultural"   → ثقافه، تراث، هويه، عادات، لغه، فن، أعراف اجتماعيه... إلخ.
+3. "other"      → إذا لم يكن المقطع ينتمي إلى الفئتين السابقتين.
+
+❗ تعليمات:
+- أعد فقط JSON بهذا الشكل: {{"themes": ["event", "cultural", ...]}}
+- عنصر واحد لكل مقطع وبنفس ترتيب المقاطع (العدد المطلوب: {count}).
+- بدون أي شرح خارجي.
+
+المقاطع:
+{segments}
+"""
+
+# Maximum number of segments sent in one batched call
+SEGMENT_BATCH_SIZE = 20
+
+# Segment hash → theme (filled by rule-based, local and LLM decisions),
+# least recently used entries evicted past SEGMENT_CACHE_SIZE
+SEGMENT_CACHE_SIZE = 4096
+_SEGMENT_THEME_CACHE: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_SEGMENT_CACHE_LOCK = threading.Lock()
 
 
 # ------------------------------------------------------
@@ -134,17 +275,117 @@ def llm_theme_detector(text: str) -> str:
         messages=[
             {"role": "system", "content": "You are an expert classifier for semantic themes."},
             {"role": "user", "content": prompt}
-        ]
+        ],
+        response_format=response_format_for("theme", "gpt-4.1")
+    )
+
+    raw = response.choices[0].message.content
+    return parse_structured(raw, "theme", stage="theme_detector")["theme"]
+
+
+# ------------------------------------------------------
+# Batched LLM Theme Detection (one call per batch of segments)
+# ------------------------------------------------------
+def llm_batch_theme_detector(segments: List[str]) -> List[str]:
+    """
+    Classifies several segments with a single LLM call.
+    Returns one theme per segment, in order.
+    """
+
+    numbered = "\n\n".join(
+        f"[{i}] {prepare_for_topic_detection(seg)}"
+        for i, seg in enumerate(segments, start=1)
+    )
+    prompt = SEGMENT_THEME_PROMPT.format(count=len(segments), segments=numbered)
+
+    response = client.chat.completions.create(
+        model="gpt-4.1",
+        messages=[
+            {"role": "system", "content": "You are an expert classifier for semantic themes."},
+            {"role": "user", "content": prompt}
+        ],
+        response_format=response_format_for("segment_themes", "gpt-4.1")
     )
 
     raw = response.choices[0].message.content
-    data = safe_load_json(raw)
+    themes = parse_structured(raw, "segment_themes", stage="theme_detector")["themes"]
 
-    theme = data.get("theme")
-    if theme not in ["event", "cultural", "other"]:
-        raise ValueError(f"❌ Invalid theme returned: {theme}")
+    if len(themes) != len(segments):
+        raise ValueError(f"❌ Expected {len(segments)} themes, got {len(themes)}:\n{raw}")
 
-    return theme
+    return themes
+
+
+def segment_hash(text: str) -> str:
+    """
+    Stable cache key for a segment (hash of the cleaned text).
+    """
+    return hashlib.sha1(clean_text(text).encode("utf-8")).hexdigest()
+
+
+def _cached_segment_theme(key: str) -> Dict[str, Any] | None:
+    with _SEGMENT_CACHE_LOCK:
+        result = _SEGMENT_THEME_CACHE.get(key)
+        if result is not None:
+            _SEGMENT_THEME_CACHE.move_to_end(key)
+        return result
+
+
+def _cache_segment_theme(key: str, result: Dict[str, Any]):
+    with _SEGMENT_CACHE_LOCK:
+        _SEGMENT_THEME_CACHE[key] = result
+        _SEGMENT_THEME_CACHE.move_to_end(key)
+        while len(_SEGMENT_THEME_CACHE) > SEGMENT_CACHE_SIZE:
+            _SEGMENT_THEME_CACHE.popitem(last=False)
+
+
+def detect_segment_themes(segments: List[str]) -> List[Dict[str, Any]]:
+    """
+    Classifies every segment of a document.
+
+    1. Cache lookup by segment hash
+    2. Rule-based matcher (confident segments are resolved locally)
+    3. Local classifier, vectorized over the remaining segments
+    4. One batched LLM call per SEGMENT_BATCH_SIZE ambiguous segments
+
+    Returns one {"theme", "source", "confidence"} dict per segment.
+    """
+
+    results: List[Dict[str, Any] | None] = [None] * len(segments)
+    keys = [segment_hash(seg) for seg in segments]
+    pending: List[int] = []
+
+    for i, seg in enumerate(segments):
+        results[i] = _cached_segment_theme(keys[i])
+        if results[i] is not None:
+            continue
+
+        theme, confidence = rule_based_theme_scored(clean_text(seg))
+        if theme and confidence >= RULE_CONFIDENCE_THRESHOLD:
+            results[i] = {"theme": theme, "source": "rule_based", "confidence": confidence}
+            _cache_segment_theme(keys[i], results[i])
+        else:
+            pending.append(i)
+
+    ambiguous = []
+    predictions = local_theme_predictions([segments[i] for i in pending]) if pending else []
+    for i, (theme, prob) in zip(pending, predictions):
+        if theme and prob >= LOCAL_CONFIDENCE_THRESHOLD:
+            results[i] = {"theme": theme, "source": "local", "confidence": prob}
+            _cache_segment_theme(keys[i], results[i])
+        else:
+            ambiguous.append(i)
+
+    for start in range(0, len(ambiguous), SEGMENT_BATCH_SIZE):
+        batch = ambiguous[start:start + SEGMENT_BATCH_SIZE]
+        themes = llm_batch_theme_detector([segments[i] for i in batch])
+
+        for i, theme in zip(batch, themes):
+            results[i] = {"theme": theme, "source": "llm", "confidence": 1.0}
+            _cache_segment_theme(keys[i], results[i])
+            append_history(THEME_HISTORY_PATH, clean_text(segments[i]), theme)
+
+    return results
 
 
 # ------------------------------------------------------
@@ -156,20 +397,27 @@ def detect_theme(text: str) -> Dict[str, Any]:
     Returns:
     {
         "theme": "event" | "cultural" | "other",
-        "source": "rule_based" | "llm"
+        "source": "rule_based" | "local" | "llm",
+        "confidence": float   (rule/local confidence, 1.0 for LLM)
     }
     """
 
     clean = clean_text(text)
 
     # Step 1: Rule-based quick check
-    rule_theme = rule_based_theme(clean)
-    if rule_theme:
-        return {"theme": rule_theme, "source": "rule_based"}
+    rule_theme, confidence = rule_based_theme_scored(clean)
+    if rule_theme and confidence >= RULE_CONFIDENCE_THRESHOLD:
+        return {"theme": rule_theme, "source": "rule_based", "confidence": confidence}
+
+    # Step 2: Local classifier (if trained)
+    local_theme, prob = local_theme_predictions([clean])[0]
+    if local_theme and prob >= LOCAL_CONFIDENCE_THRESHOLD:
+        return {"theme": local_theme, "source": "local", "confidence": prob}
 
-    # Step 2: Fall back to LLM classification
+    # Step 3: Fall back to LLM classification (and record it as training data)
     llm_theme = llm_theme_detector(clean)
-    return {"theme": llm_theme, "source": "llm"}
+    append_history(THEME_HISTORY_PATH, clean, llm_theme)
+    return {"theme": llm_theme, "source": "llm", "confidence": 1.0}
 
 
 # ------------------------------------------------------
@@ -0,0 +1,361 @@
+"""
+topic_candidates.py
+-------------------
+Local (no-LLM) topic candidate extraction for Arabic/English text.
+
+Built on text_normalizer.prepare_for_topic_detection, this module:
+- Tokenizes normalized Arabic/English text
+- Removes stopwords and splits text into candidate phrases (1–3 words)
+- Scores phrases with TF-IDF using NumPy + SciPy sparse matrices
+
+The candidates are used in two ways:
+1. As hints for the LLM topic extractor (smaller, better-focused output)
+2. As the whole answer in "fast" mode (interactive UI suggestions)
+
+IDF weights come from the corpus of uploaded documents: every extracted
+PDF is added with add_to_corpus() and the document frequencies are
+persisted (CORPUS_MODEL), so suggestions never refit per request.
+Documents are keyed by file hash, so a re-uploaded PDF is counted once.
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import List, Dict, Optional
+
+import numpy as np
+from scipy import sparse
+
+from pipeline.text_normalizer import prepare_for_topic_detection, normalize_arabic
+
+
+# ------------------------------------------------------
+# Stopwords (stored already normalized)
+# ------------------------------------------------------
+ARABIC_STOPWORDS = {normalize_arabic(w) for w in [
+    "في", "من", "على", "إلى", "الى", "عن", "مع", "هذا", "هذه", "ذلك", "تلك",
+    "التي", "الذي", "الذين", "اللذين", "اللتين", "اللواتي", "ما", "ماذا", "لم",
+    "لن", "لا", "ان", "أن", "إن", "كان", "كانت", "يكون", "تكون", "كما", "قد",
+    "لقد", "ثم", "او", "أو", "أي", "اي", "بين", "حتى", "عند", "عندما", "بعد",
+    "قبل", "كل", "بعض", "غير", "هو", "هي", "هم", "هن", "نحن", "انت", "أنا",
+    "كذلك", "ايضا", "أيضا", "حيث", "فيه", "فيها", "منه", "منها", "عليه",
+    "عليها", "إليه", "اليه", "به", "بها", "له", "لها", "لهم", "وقد", "وكان",
+    "وكانت", "وفي", "ومن", "وعلى", "الا", "إلا", "اذا", "إذا", "لكن", "ولكن",
+    "خلال", "ضد", "نحو", "منذ", "دون", "تم", "وهو", "وهي", "هناك", "هنا",
+    "التى", "سوف", "كيف", "لماذا", "متى", "اين", "أين", "مثل", "عدة", "احد",
+    "أحد", "جدا", "فقط", "وذلك", "بذلك", "لذلك", "الي", "وان", "وأن",
+]}
+
+ENGLISH_STOPWORDS = {
+    "the", "a", "an", "and", "or", "of", "to", "in", "on", "for", "with", "by",
+    "at", "from", "as", "is", "are", "was", "were", "be", "been", "it", "its",
+    "this", "that", "these", "those", "which", "who", "whom", "but", "not",
+    "has", "have", "had", "into", "than", "then", "also", "their", "they",
+}
+
+STOPWORDS = ARABIC_STOPWORDS | ENGLISH_STOPWORDS
+
+
+# ------------------------------------------------------
+# Tokenization
+# ------------------------------------------------------
+# Letters only: Arabic block (without punctuation/digits) + Latin
+TOKEN_PATTERN = re.compile(r"[ء-ي]+|[A-Za-z][A-Za-z\-]+")
+
+# Characters that break a phrase (sentence + clause punctuation)
+PHRASE_BREAK_PATTERN = re.compile(r"[.,!?؟،؛:;()\[\]{}\"«»\-–—/\\|0-9٠-٩]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Splits normalized text into lowercase word tokens.
+    Stopwords are kept (use extract_phrases for candidates).
+    """
+    return [t.lower() for t in TOKEN_PATTERN.findall(text)]
+
+
+def extract_phrases(text: str, max_ngram: int = 3) -> List[str]:
+    """
+    Produces candidate phrases (RAKE/YAKE style):
+    runs of content words between stopwords and punctuation,
+    emitted as all 1..max_ngram grams inside each run.
+    """
+
+    phrases = []
+
+    for fragment in PHRASE_BREAK_PATTERN.split(text):
+        run: List[str] = []
+
+        for token in tokenize(fragment) + [None]:
+            if token is None or token in STOPWORDS or len(token) < 2:
+                for n in range(1, max_ngram + 1):
+                    for i in range(len(run) - n + 1):
+                        phrases.append(" ".join(run[i:i + n]))
+                run = []
+            else:
+                run.append(token)
+
+    return phrases
+
+
+# ------------------------------------------------------
+# TF-IDF Engine
+# ------------------------------------------------------
+class TopicCandidateEngine:
+    """
+    TF-IDF scorer over a corpus of documents.
+
+    fit(corpus)         → builds vocabulary + IDF vector
+    partial_fit(corpus) → adds documents to the fitted statistics
+                          (documents with an already counted ID are skipped)
+    transform(texts)    → CSR matrix (documents × phrases) of TF-IDF weights
+    candidates(text, k) → top-k phrases for a single document
+    """
+
+    def __init__(self, max_ngram: int = 3):
+        self.max_ngram = max_ngram
+        self.vocabulary: Dict[str, int] = {}
+        self.terms: List[str] = []
+        self.df = np.zeros(0, dtype=np.int64)
+        self.idf = np.zeros(0, dtype=np.float64)
+        self.n_docs = 0
+        self.doc_ids: set = set()
+
+    # ---------------- internal helpers ----------------
+    def _count_matrix(self, texts: List[str], grow: bool) -> sparse.csr_matrix:
+        """
+        Builds a sparse phrase-count matrix.
+        grow=True adds unseen phrases to the vocabulary.
+        """
+        rows, cols, vals = [], [], []
+
+        for row, text in enumerate(texts):
+            counts = Counter(extract_phrases(prepare_for_topic_detection(text), self.max_ngram))
+            for phrase, count in counts.items():
+                col = self.vocabulary.get(phrase)
+                if col is None:
+                    if not grow:
+                        continue
+                    col = len(self.terms)
+                    self.vocabulary[phrase] = col
+                    self.terms.append(phrase)
+                rows.append(row)
+                cols.append(col)
+                vals.append(count)
+
+        return sparse.csr_matrix(
+            (np.asarray(vals, dtype=np.float64), (rows, cols)),
+            shape=(len(texts), len(self.terms))
+        )
+
+    # ---------------- public API ----------------
+    def fit(self, corpus: List[str], doc_ids: Optional[List[str]] = None) -> "TopicCandidateEngine":
+        """
+        Learns vocabulary and smoothed IDF weights from the corpus.
+        """
+        self.vocabulary, self.terms = {}, []
+        self.df = np.zeros(0, dtype=np.int64)
+        self.n_docs = 0
+        self.doc_ids = set()
+        return self.partial_fit(corpus, doc_ids)
+
+    def partial_fit(self, corpus: List[str], doc_ids: Optional[List[str]] = None) -> "TopicCandidateEngine":
+        """
+        Adds documents: extends the vocabulary and document frequencies
+        and recomputes the IDF weights (earlier documents are not re-read).
+        With `doc_ids` (one per document, e.g. a file hash), documents
+        already counted are skipped.
+        """
+        if doc_ids is not None:
+            new = {}
+            for doc_id, text in zip(doc_ids, corpus):
+                if doc_id not in self.doc_ids:
+                    new.setdefault(doc_id, text)
+            self.doc_ids.update(new)
+            corpus = list(new.values())
+        if not corpus:
+            return self
+
+        counts = self._count_matrix(corpus, grow=True)
+
+        # Document frequency = number of non-zeros per column
+        df = np.bincount(counts.indices, minlength=len(self.terms))
+        df[:len(self.df)] += self.df
+        self.df = df
+        self.n_docs += len(corpus)
+        self.idf = np.log((1 + self.n_docs) / (1 + self.df)) + 1.0
+
+        return self
+
+    # ---------------- persistence ----------------
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "max_ngram": self.max_ngram,
+                "n_docs": self.n_docs,
+                "terms": self.terms,
+                "df": self.df.tolist(),
+                "doc_ids": sorted(self.doc_ids)
+            }, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "TopicCandidateEngine":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        engine = cls(max_ngram=data["max_ngram"])
+        engine.terms = data["terms"]
+        engine.vocabulary = {t: i for i, t in enumerate(engine.terms)}
+        engine.df = np.asarray(data["df"], dtype=np.int64)
+        engine.n_docs = data["n_docs"]
+        engine.doc_ids = set(data.get("doc_ids", []))
+        engine.idf = np.log((1 + engine.n_docs) / (1 + engine.df)) + 1.0
+        return engine
+
+    def transform(self, texts: List[str]) -> sparse.csr_matrix:
+        """
+        Returns sublinear TF × IDF weights for the given texts.
+        Phrases unseen at fit time are ignored.
+        """
+        counts = self._count_matrix(texts, grow=False)
+        counts.data = 1.0 + np.log(counts.data)
+        return counts.multiply(self.idf[np.newaxis, :]).tocsr()
+
+    def candidates(self, text: str, top_k: int = 12) -> List[str]:
+        """
+        Returns the top-k phrases of a document.
+        Unseen phrases get the maximum IDF (rare = informative).
+        Phrases sharing most of their words with a better-ranked
+        phrase are dropped (avoids overlapping n-gram windows).
+        """
+
+        counts = Counter(extract_phrases(prepare_for_topic_detection(text), self.max_ngram))
+        if not counts:
+            return []
+
+        phrases = list(counts)
+        tf = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float64, count=len(phrases)))
+
+        max_idf = math.log(1 + self.n_docs) + 1.0
+        idf = np.fromiter(
+            (self.idf[self.vocabulary[p]] if p in self.vocabulary else max_idf for p in phrases),
+            dtype=np.float64,
+            count=len(phrases)
+        )
+
+        # Favour multi-word phrases slightly (topics are rarely single words)
+        lengths = np.fromiter((p.count(" ") + 1 for p in phrases), dtype=np.float64, count=len(phrases))
+        scores = tf * idf * (1.0 + 0.25 * (lengths - 1.0))
+
+        selected: List[str] = []
+        selected_words: List[set] = []
+        for i in np.argsort(-scores, kind="stable"):
+            phrase = phrases[i]
+            words = set(phrase.split())
+            if any(len(words & w) * 2 >= len(words) for w in selected_words):
+                continue
+            selected.append(phrase)
+            selected_words.append(words)
+            if len(selected) >= top_k:
+                break
+
+        return selected
+
+
+# ------------------------------------------------------
+# Module-level engine (fitted on the uploaded corpus)
+# ------------------------------------------------------
+CORPUS_MODEL = os.path.join("triples", "topic_idf.json")
+
+_ENGINE: Optional[TopicCandidateEngine] = None
+_ENGINE_LOCK = threading.Lock()     # guards _ENGINE and its in-place updates
+
+
+def file_hash(path: str) -> str:
+    """Corpus document ID of an uploaded file (hash of its bytes)."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def get_engine(path: str = CORPUS_MODEL) -> Optional[TopicCandidateEngine]:
+    """
+    The shared engine, loaded from `path` on first use (None before any
+    document was added).
+    """
+    global _ENGINE
+    with _ENGINE_LOCK:
+        if _ENGINE is None and os.path.exists(path):
+            _ENGINE = TopicCandidateEngine.load(path)
+        return _ENGINE
+
+
+def fit_corpus(
+    corpus: List[str],
+    doc_ids: Optional[List[str]] = None,
+    path: str = CORPUS_MODEL
+) -> TopicCandidateEngine:
+    """
+    Refits the shared engine on a whole corpus (e.g. all uploaded PDFs)
+    and persists it.
+    """
+    global _ENGINE
+    engine = TopicCandidateEngine().fit(corpus, doc_ids)
+    with _ENGINE_LOCK:
+        _ENGINE = engine
+        engine.save(path)
+    return engine
+
+
+def add_to_corpus(
+    texts: List[str],
+    doc_ids: Optional[List[str]] = None,
+    path: str = CORPUS_MODEL
+) -> TopicCandidateEngine:
+    """
+    Adds newly uploaded documents to the shared engine and persists it
+    (only when something was added). The engine is updated in place
+    under _ENGINE_LOCK, which suggest_topics() also holds while scoring.
+    """
+    global _ENGINE
+    get_engine(path)
+    with _ENGINE_LOCK:
+        if _ENGINE is None:
+            _ENGINE = TopicCandidateEngine()
+        n_docs = _ENGINE.n_docs
+        _ENGINE.partial_fit(texts, doc_ids)
+        if _ENGINE.n_docs != n_docs:
+            _ENGINE.save(path)
+        return _ENGINE
+
+
+def suggest_topics(text: str, top_k: int = 12) -> List[str]:
+    """
+    Returns local topic candidates for a document, scored with the
+    corpus IDF. Before any document was added every phrase gets the
+    same IDF, so ranking falls back to term frequency.
+    """
+    engine = get_engine() or TopicCandidateEngine()
+    with _ENGINE_LOCK:
+        return engine.candidates(text, top_k=top_k)
+
+
+# ------------------------------------------------------
+# Module Test
+# ------------------------------------------------------
+if __name__ == "__main__":
+    sample = """
+    تناول التقرير واقع الأمن المائي في المنطقة،
+    وتأثير التغير المناخي على دول الشرق الأوسط،
+    إضافة إلى دور المنظمات الدولية في دعم مشاريع التنمية.
+    الأمن المائي قضية أساسية في الشرق الأوسط.
+    """
+    print(suggest_topics(sample, top_k=6))
@@ -9,16 +9,31 @@ Pipeline:
 2. Generate high-level conceptual topics
 3. Generate keyphrase-style subtopics (optional)
 4. Return both for user selection (1–3 topics)
+
+Combined mode (default) extracts topics and keyphrases in a single
+structured-output call. Long documents are processed with a map-reduce over
+chunks so the full text is never sent in one prompt; the map calls run
+concurrently.
+
+Local TF-IDF candidates (topic_candidates.py) are passed to the LLM as
+hints (per chunk in the map step), or returned directly in "fast" mode
+without any LLM call.
+
+All LLM responses are schema-constrained and validated through
+structured_output.py.
 """
 
 import json
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any
 
 from openai import OpenAI
 from dotenv import load_dotenv
 import os
 
-from pipeline.text_normalizer import prepare_for_topic_detection, clean_text
+from pipeline.text_normalizer import prepare_for_topic_detection, clean_text, chunk_text
+from pipeline.topic_candidates import suggest_topics
+from pipeline.structured_output import response_format_for, parse_structured
 
 
 # ------------------------------------------------------
@@ -41,7 +56,7 @@ TOPIC_PROMPT = """
 أريد منك استخراج المواضيع الرئيسية من النص التالي.
 
 ❗ تعليمات ضرورية:
-- أعد فقط JSON صالح 100%.
+- أعد فقط JSON صالح 100% بهذا الشكل: {{"topics": ["..."]}}
 - بدون أي شرح خارجي، بدون نص خارج JSON.
 - استخرج بين 4 إلى 8 مواضيع عالية المستوى.
 - المواضيع يجب أن تكون عامة، وليست كلمات مفردة فقط.
@@ -57,10 +72,10 @@ TOPIC_PROMPT = """
 KEYPHRASE_PROMPT = """
 استخرج أهم المفاهيم والكلمات المفتاحية من النص التالي.
 
-❗ أعد فقط JSON بصيغة قائمة كلمات (Arab/English).
+❗ أعد فقط JSON بصيغة قائمة كلمات (Arab/English) بهذا الشكل: {{"keywords": ["..."]}}
 
 مثال:
-["الهجرة", "الأطفال", "الصحة العامة", "social policy", "youth programs"]
+{{"keywords": ["الهجرة", "الأطفال", "الصحة العامة", "social policy", "youth programs"]}}
 
 النص:
 {content}
@@ -68,24 +83,57 @@ KEYPHRASE_PROMPT = """
 
 
 # ------------------------------------------------------
-# Utility: safe JSON parsing
+# Combined Topic + Keyphrase Prompt (single call)
 # ------------------------------------------------------
-def safe_load_json(response: str) -> Any:
-    """
-    Attempts to parse JSON regardless of model formatting oddities.
-    """
-    try:
-        return json.loads(response)
-    except Exception:
-        # Remove Markdown fences if present
-        if "```" in response:
-            response = response.replace("```json", "").replace("```", "").strip()
-            try:
-                return json.loads(response)
-            except:
-                pass
+COMBINED_PROMPT = """
+استخرج من النص التالي المواضيع الرئيسية والكلمات المفتاحية معاً.
+
+❗ تعليمات ضرورية:
+- أعد فقط JSON صالح 100% بهذا الشكل:
+{{"topics": ["..."], "keywords": ["..."]}}
+- بدون أي شرح خارجي، بدون نص خارج JSON.
+- "topics": بين 4 إلى 8 مواضيع عالية المستوى، عامة وليست كلمات مفردة فقط.
+- "keywords": أهم المفاهيم والكلمات المفتاحية (Arab/English).
+
+عبارات مرشحة مستخرجة آلياً (للاسترشاد فقط، يمكنك تجاهلها):
+{hints}
+
+النص:
+{content}
+"""
+
+# ------------------------------------------------------
+# Reduce Prompt (merges per-chunk candidates, no raw text)
+# ------------------------------------------------------
+REDUCE_PROMPT = """
+فيما يلي مواضيع وكلمات مفتاحية مستخرجة من أجزاء مختلفة من نفس الوثيقة.
+ادمجها في قائمة نهائية واحدة: احذف التكرار، ووحّد الصيغ المتشابهة،
+وقدّم الأكثر أهمية وتكراراً أولاً.
 
-    raise ValueError(f"❌ Model returned invalid JSON:\n{response}")
+❗ أعد فقط JSON بهذا الشكل:
+{{"topics": ["..."], "keywords": ["..."]}}
+
+- "topics": بين 4 إلى 8 مواضيع عالية المستوى.
+- "keywords": حتى {max_phrases} كلمة مفتاحية.
+
+المواضيع المرشحة:
+{topics}
+
+الكلمات المفتاحية المرشحة:
+{keywords}
+"""
+
+# Documents longer than this are processed chunk by chunk (map-reduce)
+MAX_SINGLE_PROMPT_CHARS = 12000
+
+# Chunk size used for the map step
+MAP_CHUNK_CHARS = 6000
+
+# Concurrent LLM calls in the map step
+MAP_WORKERS = 4
+
+# Local candidates sent as hints with each map-step chunk
+MAP_HINTS = 8
 
 
 # ------------------------------------------------------
@@ -105,11 +153,12 @@ def extract_main_topics(text: str, max_topics: int = 8) -> List[str]:
         messages=[
             {"role": "system", "content": "You are an expert topic extractor."},
             {"role": "user", "content": prompt},
-        ]
+        ],
+        response_format=response_format_for("topics", "gpt-4.1")
     )
 
     raw = response.choices[0].message.content
-    topics = safe_load_json(raw)
+    topics = parse_structured(raw, "topics", stage="topic_detector")["topics"]
 
     # Limit number of topics
     topics = topics[:max_topics]
@@ -134,21 +183,123 @@ def extract_keyphrases(text: str, max_phrases: int = 12) -> List[str]:
         messages=[
             {"role": "system", "content": "You are an expert keyword extractor."},
             {"role": "user", "content": prompt},
-        ]
+        ],
+        response_format=response_format_for("keywords", "gpt-4.1")
     )
 
     raw = response.choices[0].message.content
-    keyphrases = safe_load_json(raw)
+    keyphrases = parse_structured(raw, "keywords", stage="topic_detector")["keywords"]
 
     return keyphrases[:max_phrases]
 
 
+# ------------------------------------------------------
+# Combined extraction: one structured-output call
+# ------------------------------------------------------
+def _request_topics_and_keywords(prompt: str) -> Dict[str, List[str]]:
+    """
+    Sends a single schema-constrained request and returns
+    {"topics": [...], "keywords": [...]}.
+    """
+
+    response = client.chat.completions.create(
+        model="gpt-4.1",
+        messages=[
+            {"role": "system", "content": "You are an expert topic and keyword extractor."},
+            {"role": "user", "content": prompt},
+        ],
+        response_format=response_format_for("topics_keywords", "gpt-4.1")
+    )
+
+    raw = response.choices[0].message.content
+    data = parse_structured(raw, "topics_keywords", stage="topic_detector")
+
+    return {
+        "topics": [str(t) for t in data.get("topics", []) if t],
+        "keywords": [str(k) for k in data.get("keywords", []) if k]
+    }
+
+
+def _merge_ranked(lists: List[List[str]]) -> List[str]:
+    """
+    Merges candidate lists, ranking items by how many chunks
+    produced them (ties keep first-seen order).
+    """
+    counts: Dict[str, int] = {}
+    for items in lists:
+        for item in dict.fromkeys(clean_text(i) for i in items):
+            if item:
+                counts[item] = counts.get(item, 0) + 1
+
+    return sorted(counts, key=lambda k: -counts[k])
+
+
+def extract_topics_and_keyphrases(
+    text: str,
+    max_topics: int = 8,
+    max_phrases: int = 12
+) -> Dict[str, List[str]]:
+    """
+    Extracts topics and keyphrases together.
+
+    Short documents → one call over the whole cleaned text.
+    Long documents  → map: one call per chunk (up to MAP_WORKERS at once),
+                      each with the local candidates of its own chunk,
+                      reduce: one call over the merged candidate lists
+                      (the raw text is never sent in a single prompt).
+    """
+
+    cleaned = prepare_for_topic_detection(text)
+
+    if len(cleaned) <= MAX_SINGLE_PROMPT_CHARS:
+        hints = json.dumps(suggest_topics(cleaned), ensure_ascii=False)
+        result = _request_topics_and_keywords(COMBINED_PROMPT.format(content=cleaned, hints=hints))
+        return {
+            "topics": result["topics"][:max_topics],
+            "keywords": result["keywords"][:max_phrases]
+        }
+
+    # Map step
+    def map_chunk(chunk: str) -> Dict[str, List[str]]:
+        hints = json.dumps(suggest_topics(chunk, top_k=MAP_HINTS), ensure_ascii=False)
+        return _request_topics_and_keywords(COMBINED_PROMPT.format(content=chunk, hints=hints))
+
+    chunks = chunk_text(cleaned, max_length=MAP_CHUNK_CHARS)
+    with ThreadPoolExecutor(max_workers=min(MAP_WORKERS, len(chunks)) or 1) as pool:
+        partials = list(pool.map(map_chunk, chunks))
+
+    topics = _merge_ranked([p["topics"] for p in partials])
+    keywords = _merge_ranked([p["keywords"] for p in partials])
+
+    # Reduce step (candidates only)
+    result = _request_topics_and_keywords(REDUCE_PROMPT.format(
+        topics=json.dumps(topics, ensure_ascii=False),
+        keywords=json.dumps(keywords, ensure_ascii=False),
+        max_phrases=max_phrases
+    ))
+
+    return {
+        "topics": (result["topics"] or topics)[:max_topics],
+        "keywords": (result["keywords"] or keywords)[:max_phrases]
+    }
+
+
 # ------------------------------------------------------
 # Unified topic extraction pipeline
 # ------------------------------------------------------
-def detect_topics(text: str) -> Dict[str, Any]:
+TOPIC_MODES = ("combined", "separate", "fast")
+
+
+def detect_topics(text: str, mode: str = "combined") -> Dict[str, Any]:
     """
     Main function used by Flask or the pipeline.
+
+    Modes:
+    - "combined" → topics + keywords from one LLM call
+                   (map-reduce over chunks for long documents)
+    - "separate" → one call for topics, one call for keywords
+    - "fast"     → local TF-IDF candidates only (no LLM call)
+
     Returns:
     {
        "topics": [...],
@@ -156,6 +307,19 @@ def detect_topics(text: str) -> Dict[str, Any]:
     }
     """
 
+    if mode == "combined":
+        return extract_topics_and_keyphrases(text)
+
+    if mode == "fast":
+        candidates = suggest_topics(text, top_k=12)
+        return {
+            "topics": [c for c in candidates if " " in c][:8] or candidates[:8],
+            "keywords": candidates
+        }
+
+    if mode != "separate":
+        raise ValueError(f"❌ Unknown topic detection mode: {mode} (expected one of {', '.join(TOPIC_MODES)})")
+
     main_topics = extract_main_topics(text)
     keyphrases = extract_keyphrases(text)
 
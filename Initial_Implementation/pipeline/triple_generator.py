@@ -7,20 +7,34 @@ Generates ontology-aligned triples using:
 - Event-based segmentation for long narratives
 - Strong grounding enforcement
 - Verb-predicate filtering
+- Per-segment theme selection (mixed event/cultural documents)
+- Streaming completions parsed incrementally (triples arrive early,
+  truncated or fenced output keeps its valid prefix)
 
 This prevents noisy triples, ensures structure, and improves KG quality.
 """
 
 import os
 import re
-from typing import List, Dict, Any
+from bisect import bisect_left
+from typing import List, Dict, Any, Tuple, Iterator, Callable, Optional
 
 from openai import OpenAI
-from .text_normalizer import clean_text
+from .text_normalizer import clean_text, normalize_arabic, sentence_spans
+from .json_stream import JSONArrayStreamParser
+from .structured_output import response_format_for, validate_schema, record_parse, TRIPLE_SCHEMA
 from tbox_loader import load_tbox_template
 
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Created on first LLM call, so the module imports without OPENAI_API_KEY
+_CLIENT: Optional[OpenAI] = None
+
+
+def get_client() -> OpenAI:
+    global _CLIENT
+    if _CLIENT is None:
+        _CLIENT = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    return _CLIENT
 
 
 # ------------------------------------------------------
@@ -56,31 +70,85 @@ def get_allowed_predicates(theme: str) -> Dict[str, str]:
 # ------------------------------------------------------
 # 2. Automatic event segmentation
 # ------------------------------------------------------
-def segment_into_events(text: str) -> List[str]:
+# Common Arabic event markers. They are normalized when the pattern is
+# compiled, so they match text that went through clean_text().
+EVENT_MARKERS = [
+    "معركة", "أحداث", "حرب", "اشتباك", "صراع", "وقعت",
+    "اندلعت", "حدثت", "اجتياح", "عملية", "اغتيال"
+]
+
+EVENT_MARKER_PATTERN = re.compile(
+    r"(?<!\w)(?:وال|فال|بال|ال|و|ف|ب|ل)?(?:"
+    + "|".join(re.escape(normalize_arabic(m)) for m in sorted(EVENT_MARKERS, key=len, reverse=True))
+    + ")"
+)
+
+# Upper bound on a segment (one LLM prompt) in characters
+MAX_SEGMENT_CHARS = 3000
+
+
+def _split_long_span(text: str, start: int, end: int, max_chars: int) -> List[Tuple[int, int]]:
     """
-    Splits large historical narrative into event-based chunks.
-    Uses common Arabic event markers.
+    Cuts a span longer than max_chars at the last whitespace before the limit.
+    """
+    pieces = []
+    while end - start > max_chars:
+        cut = text.rfind(" ", start + 1, start + max_chars)
+        if cut <= start:
+            cut = start + max_chars
+        pieces.append((start, cut))
+        start = cut
+        while start < end and text[start].isspace():
+            start += 1
+    if start < end:
+        pieces.append((start, end))
+    return pieces
+
+
+def segment_event_spans(text: str, max_chars: int = MAX_SEGMENT_CHARS) -> List[Tuple[int, int]]:
+    """
+    Splits a narrative into event-based (start, end) offsets.
+
+    - Sentence boundaries come from text_normalizer.sentence_spans
+    - Event markers are found with one pass of EVENT_MARKER_PATTERN
+    - A sentence containing a marker opens a new segment
+    - No segment exceeds max_chars (long sentences are cut at whitespace)
     """
-    markers = [
-        "معركة", "أحداث", "حرب", "اشتباك", "صراع", "وقعت",
-        "اندلعت", "حدثت", "اجتياح", "عملية", "اغتيال"
-    ]
+
+    marker_offsets = [m.start() for m in EVENT_MARKER_PATTERN.finditer(text)]
+
+    def has_marker(s: int, e: int) -> bool:
+        i = bisect_left(marker_offsets, s)
+        return i < len(marker_offsets) and marker_offsets[i] < e
 
     segments = []
-    current = []
+    seg_start = seg_end = None
+
+    for s, e in sentence_spans(text):
+        for ps, pe in _split_long_span(text, s, e, max_chars):
+            starts_event = has_marker(ps, pe)
+            too_long = seg_start is not None and pe - seg_start > max_chars
 
-    for line in text.split("\n"):
-        if any(m in line for m in markers):
-            if current:
-                segments.append("\n".join(current))
-            current = [line]
-        else:
-            current.append(line)
+            if seg_start is not None and (starts_event or too_long):
+                segments.append((seg_start, seg_end))
+                seg_start = None
 
-    if current:
-        segments.append("\n".join(current))
+            if seg_start is None:
+                seg_start = ps
+            seg_end = pe
 
-    return [seg.strip() for seg in segments if seg.strip()]
+    if seg_start is not None:
+        segments.append((seg_start, seg_end))
+
+    return segments
+
+
+def segment_into_events(text: str, max_chars: int = MAX_SEGMENT_CHARS) -> List[str]:
+    """
+    Splits large historical narrative into event-based chunks.
+    Uses common Arabic event markers (see segment_event_spans).
+    """
+    return [text[s:e] for s, e in segment_event_spans(text, max_chars)]
 
 
 # ------------------------------------------------------
@@ -120,36 +188,65 @@ def build_generation_prompt(text_segment: str, topics: List[str], theme: str, tb
 6. ركّز على البنية الحدثية: من شارك؟ أين؟ متى؟ ما النتيجة؟
 
 أعد النتيجة بصيغة JSON:
-[
+{{"triples": [
   {{"subject": "...", "predicate": "...", "object": "...", "span": "..."}}
-]
+]}}
 """
 
 
 # ------------------------------------------------------
 # 4. Generate triples for a text segment
 # ------------------------------------------------------
-def generate_triples_for_segment(
+def iter_triples_for_segment(
     text_segment: str,
     topics: List[str],
     theme: str,
     tbox_template: str
-) -> List[Dict[str, Any]]:
+) -> Iterator[Dict[str, Any]]:
+    """
+    Streams the completion and yields each triple as soon as its JSON
+    object is complete. Markdown fences and trailing text are skipped;
+    a truncated response still yields every complete triple.
+    Elements that do not match TRIPLE_SCHEMA are dropped; the call
+    counts as a parse failure if anything was dropped or truncated.
+    """
 
     prompt = build_generation_prompt(text_segment, topics, theme, tbox_template)
 
-    response = client.chat.completions.create(
+    stream = get_client().chat.completions.create(
         model="gpt-4o-mini",
         messages=[{"role": "user", "content": prompt}],
-        temperature=0.0
+        temperature=0.0,
+        stream=True,
+        response_format=response_format_for("triple_list", "gpt-4o-mini")
     )
 
-    import json
-    try:
-        triples = json.loads(response.choices[0].message.content)
-        return triples
-    except Exception:
-        return []
+    parser = JSONArrayStreamParser()
+    rejected = 0
+
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        for item in parser.feed(delta or ""):
+            if validate_schema(item, TRIPLE_SCHEMA):
+                rejected += 1
+                continue
+            yield item
+        if parser.done:
+            break
+
+    record_parse("triple_generator", parser.done and not parser.errors and not rejected)
+
+
+def generate_triples_for_segment(
+    text_segment: str,
+    topics: List[str],
+    theme: str,
+    tbox_template: str
+) -> List[Dict[str, Any]]:
+
+    return list(iter_triples_for_segment(text_segment, topics, theme, tbox_template))
 
 
 # ------------------------------------------------------
@@ -159,33 +256,70 @@ def generate_triples(
     text: str,
     topics: List[str],
     theme: str,
-    user_tbox: str = None
+    user_tbox: str = None,
+    per_segment_themes: bool = True,
+    on_triple: Optional[Callable[[Dict[str, Any]], None]] = None,
+    on_progress: Optional[Callable[[int, int], None]] = None
 ) -> Dict[str, Any]:
+    """
+    Generates triples for a whole document.
+
+    With per_segment_themes=True (event/cultural documents), each segment
+    is classified separately and prompted/filtered with its own theme's
+    predicates. Segments classified "other" keep the document theme.
+    Every triple carries the "theme" it was generated under.
+
+    on_triple (optional) is called with each accepted triple as soon as
+    it is parsed from the stream, so validation can start early.
+    on_progress (optional) is called with (segments done, segments total).
+    """
 
     text = clean_text(text)
 
     # Load ontology template
     tbox_template, tbox_class = load_tbox_template(theme, user_tbox)
-
-    # Segment text into event chunks
-    segments = segment_into_events(text)
-
-    all_triples = []
-
-    for seg in segments:
-        triples = generate_triples_for_segment(seg, topics, theme, tbox_template)
-        all_triples.extend(triples)
-
-    # Filter P to allowed predicates only
-    allowed = get_allowed_predicates(theme)
-    clean_triples = [
-        t for t in all_triples
-        if t.get("predicate") in allowed
-    ]
+    templates = {theme: tbox_template}
+
+    # Segment text into event chunks (offsets into the cleaned text)
+    spans = segment_event_spans(text)
+    segments = [text[s:e] for s, e in spans]
+
+    # Pick a theme per segment ("other" documents use the user T-Box everywhere)
+    if per_segment_themes and theme in ("event", "cultural"):
+        # Imported here: theme_detector requires OPENAI_API_KEY at import
+        from .theme_detector import detect_segment_themes
+        segment_themes = [
+            r["theme"] if r["theme"] in ("event", "cultural") else theme
+            for r in detect_segment_themes(segments)
+        ]
+    else:
+        segment_themes = [theme] * len(segments)
+
+    clean_triples = []
+
+    for done, (seg, seg_theme) in enumerate(zip(segments, segment_themes)):
+        if on_progress:
+            on_progress(done, len(segments))
+        if seg_theme not in templates:
+            templates[seg_theme], _ = load_tbox_template(seg_theme, user_tbox)
+
+        # Filter P to the segment's allowed predicates only
+        allowed = get_allowed_predicates(seg_theme)
+        for t in iter_triples_for_segment(seg, topics, seg_theme, templates[seg_theme]):
+            if t.get("predicate") in allowed:
+                t["theme"] = seg_theme
+                clean_triples.append(t)
+                if on_triple:
+                    on_triple(t)
+
+    if on_progress:
+        on_progress(len(segments), len(segments))
 
     return {
         "theme": theme,
         "tbox": tbox_class,
         "segments": segments,
+        "segment_spans": spans,
+        "segment_themes": segment_themes,
         "triples": clean_triples
     }
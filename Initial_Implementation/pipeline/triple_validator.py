@@ -8,17 +8,20 @@ Features:
 - Span-based grounding check
 - Entity normalization + canonicalization
 - Duplicate removal
-- LLM-based auto-repair (optional)
+- LLM-based auto-repair (optional, schema-constrained output)
 """
 
 import os
 import re
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Union, Tuple
+import numpy as np
 from pydantic import BaseModel, validator
 from openai import OpenAI
 
 from .text_normalizer import clean_text
+from .structured_output import response_format_for, parse_structured
 from tbox_loader import load_allowed_predicates
+from kg.triple_store import TripleStore
 
 
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
@@ -140,21 +143,63 @@ def repair_triple(triple: Dict[str, Any], text: str, theme: str) -> Dict[str, An
     response = client.chat.completions.create(
         model="gpt-4o-mini",
         messages=[{"role": "user", "content": prompt}],
-        temperature=0.0
+        temperature=0.0,
+        response_format=response_format_for("triple", "gpt-4o-mini")
     )
 
-    import json
     try:
-        return json.loads(response.choices[0].message.content)
-    except:
+        return parse_structured(response.choices[0].message.content, "triple", stage="triple_validator")
+    except ValueError:
         return None
 
 
 # ------------------------------------------------------
-# 7. Main Validation Function
+# 7. Columnar Validation (TripleStore)
+# ------------------------------------------------------
+def validate_store(
+    store: TripleStore,
+    text: str,
+    theme: str = "event"
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Same checks as the dict path, as boolean masks over the ID columns:
+    normalization, grounding and non-empty checks run once per distinct
+    string, predicates are matched per theme with np.isin. `text` must
+    already be cleaned. Returns (valid, invalid) triple dicts.
+    """
+    store = store.dedup()
+    store = store.replace(
+        subject=store.map_column("subject", normalize_entity),
+        object=store.map_column("object", normalize_entity)
+    )
+    if not len(store):
+        return [], []
+
+    # Predicate allowed by the T-Box of the triple's theme
+    themes = store.column("theme")
+    predicates = store.column("predicate")
+    ok = np.zeros(len(store), dtype=bool)
+    for theme_id in np.unique(themes).tolist():
+        allowed = [store.strings.get(p) for p in load_allowed_predicates(store.strings.lookup(theme_id) or theme)]
+        ok |= (themes == theme_id) & np.isin(predicates, allowed)
+
+    # Grounding
+    ok &= store.column_mask("subject", lambda s: is_grounded_in_text(s, text))
+    ok &= store.column_mask("object", lambda s: is_grounded_in_text(s, text))
+    ok &= store.column_mask("span", lambda s: len(s) > 0 and s in text)
+
+    # Structural check (Triple schema: no empty field)
+    for name in ("subject", "predicate", "object", "span"):
+        ok &= store.column_mask(name, lambda s: bool(s.strip()))
+
+    return store.filter(ok).to_dicts(), store.filter(~ok).to_dicts()
+
+
+# ------------------------------------------------------
+# 8. Main Validation Function
 # ------------------------------------------------------
 def validate_triples(
-    triples: List[Dict[str, Any]],
+    triples: Union[List[Dict[str, Any]], TripleStore],
     text: str,
     theme: str = "event",
     auto_repair: bool = True
@@ -166,15 +211,19 @@ def validate_triples(
     invalid = []
     repaired = []
 
-    # Clean duplicates & normalize
-    triples = deduplicate_triples(triples)
+    # Clean duplicates & normalize (vectorized for a TripleStore)
+    if isinstance(triples, TripleStore):
+        valid, invalid = validate_store(triples, text, theme)
+        triples = []
+    else:
+        triples = deduplicate_triples(triples)
 
     for t in triples:
         t["subject"] = normalize_entity(t["subject"])
         t["object"] = normalize_entity(t["object"])
 
-        # Validate predicate
-        if not validate_predicate(t["predicate"], theme):
+        # Validate predicate (per-segment theme when the generator set one)
+        if not validate_predicate(t["predicate"], t.get("theme") or theme):
             invalid.append(t)
             continue
 
@@ -193,8 +242,10 @@ def validate_triples(
     # Try repairing invalid triples
     if auto_repair and invalid:
         for t in invalid:
-            fixed = repair_triple(t, text, theme)
-            if fixed and validate_grounding(fixed, text) and validate_predicate(fixed["predicate"], theme):
+            t_theme = t.get("theme") or theme
+            fixed = repair_triple(t, text, t_theme)
+            if fixed and validate_grounding(fixed, text) and validate_predicate(fixed["predicate"], t_theme):
+                fixed["theme"] = t_theme
                 repaired.append(fixed)
 
     return {
@@ -3,17 +3,21 @@ run_all_pdfs.py
 -------------------
 Runs the full semantic pipeline on ALL PDF files inside uploads/.
 
+First, the text of every PDF is extracted and the local topic
+candidate engine is fitted on the whole corpus (corpus IDF).
+
 Pipeline per PDF:
 1. Extract text
 2. Detect topics
 3. Detect theme
 4. Generate triples
-5. Validate triples
+5. Validate triples (+ normalize occurredOn dates)
 
 Then:
 6. Merge all validated triples into one graph
 7. Visualize graph as HTML
 8. Export RDF (TTL, JSON-LD, NT)
+9. Retrain the local theme classifier on the recorded LLM theme decisions
 
 This script is for batch/offline processing.
 """
@@ -22,11 +26,15 @@ import os
 
 from pipeline.pdf_reader import process_pdf
 from pipeline.topic_detector import detect_topics
-from pipeline.theme_detector import detect_theme
+from pipeline.topic_candidates import fit_corpus, file_hash
+from pipeline.theme_detector import detect_theme, train_theme_classifier
 from pipeline.triple_generator import generate_triples
 from pipeline.triple_validator import validate_triples
+from pipeline.temporal import normalize_temporal
 from kg.graph_builder import build_graph_from_triples, merge_graphs
-from kg.graph_visualiser import visualize_graph
+from kg.triple_store import TripleStore, StringDictionary
+from kg.graph_visualiser import visualize_graph, cached_layout
+from kg.snapshot import save_snapshot
 from pipeline.rdf_exporter import export_rdf
 
 
@@ -35,21 +43,25 @@ UPLOAD_DIR = "uploads"
 
 def run_pipeline_for_all_pdfs():
     all_graphs = []
+    all_stores = []
+    strings = StringDictionary()  # shared across PDFs → cheap concat
     summary = []
 
     print("\n🔍 Looking for PDF files in /uploads...")
 
-    for filename in os.listdir(UPLOAD_DIR):
-        if not filename.lower().endswith(".pdf"):
-            continue
-
-        pdf_path = os.path.join(UPLOAD_DIR, filename)
+    # 1. Extract all texts, then fit topic candidates on the corpus
+    pdf_paths = {
+        filename: os.path.join(UPLOAD_DIR, filename)
+        for filename in sorted(os.listdir(UPLOAD_DIR))
+        if filename.lower().endswith(".pdf")
+    }
+    texts = {filename: process_pdf(path) for filename, path in pdf_paths.items()}
+    fit_corpus(list(texts.values()), doc_ids=[file_hash(path) for path in pdf_paths.values()])
+    print(f"   ✔ Extracted {len(texts)} texts, topic IDF fitted")
+
+    for filename, text in texts.items():
         print(f"\n📄 Processing: {filename}")
 
-        # 1. Extract text
-        text = process_pdf(pdf_path)
-        print("   ✔ Extracted text")
-
         # 2. Detect topics
         topic_result = detect_topics(text)
         topics = topic_result["topics"][:2]  # pick first 2 automatically
@@ -67,7 +79,12 @@ def run_pipeline_for_all_pdfs():
 
         # 5. Validate triples
         validated = validate_triples(triples, text)
-        valid_triples = validated["valid"] + validated["repaired"]
+        valid_triples = TripleStore.from_dicts(
+            normalize_temporal(validated["valid"] + validated["repaired"]),
+            theme=theme,
+            source=filename,
+            strings=strings
+        )
         print(f"   ✔ Valid triples: {len(valid_triples)}")
 
         # 6. Build graph for this PDF
@@ -79,6 +96,7 @@ def run_pipeline_for_all_pdfs():
         )
 
         all_graphs.append(G)
+        all_stores.append(valid_triples)
 
         summary.append({
             "file": filename,
@@ -91,25 +109,36 @@ def run_pipeline_for_all_pdfs():
     print("\n🔄 Merging all graphs...")
     full_graph = merge_graphs(all_graphs)
 
+    # Binary snapshot → the Flask app reloads it instead of rebuilding
+    snap = save_snapshot(full_graph)
+    print(f"💾 KG snapshot saved: {snap['path']} ({snap['edges']} edges, {snap['bytes']} bytes)")
+
+    # Layout for /kg/graph_data and the viewer (the app only reads it)
+    placed = cached_layout(full_graph, "kg")
+    print(f"📐 Layout saved: {len(placed)} nodes")
+
     # 8. Visualize
     print("🌐 Generating graph visualization...")
-    visualize_graph(full_graph)
+    visualize_graph(full_graph, layout="kg")
 
     # 9. Export RDF
     print("📦 Exporting RDF...")
     paths = export_rdf(
-        triples=[
-            t  # flatten triple lists
-            for G in all_graphs
-            for u, v, attrs in G.edges(data=True)
-            for t in [{"subject": u, "predicate": attrs["predicate"], "object": v, "span": attrs["span"]}]
-        ],
-        tbox="dbo:Entity"  # generic for multi-file scenarios
+        triples=TripleStore.concat(all_stores, strings).dedup(),
+        tbox_class="dbo:Entity"  # generic for multi-file scenarios
     )
 
     print("📄 RDF exported:")
-    for fmt, path in paths.items():
-        print(f"  → {fmt}: {path}")
+    for fmt, info in paths.items():
+        print(f"  → {fmt}: {info['path']} ({info['bytes']} bytes, {info['seconds']}s)")
+
+    # 10. Local theme tier: the next run resolves similar texts without the LLM
+    print("🧠 Training local theme classifier...")
+    try:
+        model = train_theme_classifier()
+        print(f"  → labels: {model.labels}")
+    except ValueError as e:
+        print(f"  → skipped: {e}")
 
     print("\n📊 Summary:")
     for item in summary:
@@ -0,0 +1,10 @@
+"""
+Shared test setup.
+
+Several pipeline modules build the OpenAI client at import time; the tests
+never call the API, so a placeholder key is enough to import them.
+"""
+
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
@@ -0,0 +1,75 @@
+"""
+Centrality, structure and caching tests for kg/analytics.py.
+"""
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from kg import analytics
+from kg.graph_builder import build_graph_from_triples, IncrementalGraph
+
+
+TRIPLES = [
+    {"subject": "معركة الكرامة", "predicate": "occurredIn", "object": "الكرامة", "span": "..."},
+    {"subject": "معركة الكرامة", "predicate": "occurredOn", "object": "1968-03-21", "span": "..."},
+    {"subject": "معركة الكرامة", "predicate": "hasParticipant", "object": "الجيش الأردني", "span": "..."},
+    {"subject": "أحداث أيلول", "predicate": "hasParticipant", "object": "الجيش الأردني", "span": "..."},
+    {"subject": "أحداث أيلول", "predicate": "hasParticipant", "object": "وصفي التل", "span": "..."},
+    {"subject": "أحداث أيلول", "predicate": "occurredIn", "object": "عمان", "span": "..."},
+    {"subject": "مهرجان جرش", "predicate": "locatedIn", "object": "جرش", "span": "..."},
+]
+
+
+@pytest.fixture
+def G():
+    return build_graph_from_triples(TRIPLES, "event", "dbo:Event", source_file="a.pdf")
+
+
+def test_pagerank_matches_networkx(G):
+    ranks = analytics.pagerank(G)
+    expected = nx.pagerank(nx.DiGraph(G), alpha=0.85, tol=1e-10)
+    assert sum(ranks.values()) == pytest.approx(1.0)
+    np.testing.assert_allclose([ranks[n] for n in G], [expected[n] for n in G], atol=1e-6)
+
+
+def test_degree_components_and_communities(G):
+    assert analytics.degree(G)["الجيش الأردني"] == {"in": 2, "out": 0, "total": 2}
+    assert analytics.degree(G)["أحداث أيلول"]["out"] == 3
+
+    parts = analytics.components(G)
+    assert [len(c) for c in parts] == [7, 2]
+    assert set(parts[1]) == {"مهرجان جرش", "جرش"}
+
+    found = analytics.communities(G)
+    assert sorted(n for c in found for n in c) == sorted(G.nodes())
+    assert any(set(c) == {"مهرجان جرش", "جرش"} for c in found)
+
+
+def test_label_propagation_separates_cliques():
+    A = nx.to_scipy_sparse_array(nx.disjoint_union(nx.complete_graph(5), nx.complete_graph(5)), format="csr")
+    labels = analytics._label_propagation(A)
+    assert len(set(labels[:5])) == 1 and len(set(labels[5:])) == 1
+    assert labels[0] != labels[5]
+
+
+def test_top_k_roles_and_metrics(G):
+    figures = analytics.top_k(G, "pagerank", k=5, role="figure")
+    assert {r["node"] for r in figures} == {"الجيش الأردني", "وصفي التل"}
+    assert figures[0]["node"] == "الجيش الأردني"
+    events = analytics.top_k(G, "degree", k=5, role="event")
+    assert sorted((r["node"], r["score"]) for r in events) == [("أحداث أيلول", 3), ("معركة الكرامة", 3)]
+    assert all(r["role"] != "date" for r in analytics.top_k(G, "betweenness", k=20))
+    with pytest.raises(ValueError):
+        analytics.top_k(G, "closeness")
+
+
+def test_results_are_cached_until_the_graph_changes():
+    kg = IncrementalGraph()
+    kg.add_source("a.pdf", TRIPLES[:3], "event", "dbo:Event")
+    first = analytics.pagerank(kg.G)
+    assert analytics.pagerank(kg.G) is first
+
+    kg.add_source("b.pdf", TRIPLES[3:], "event", "dbo:Event")
+    assert analytics.pagerank(kg.G) is not first
+    assert "وصفي التل" in analytics.pagerank(kg.G)
@@ -0,0 +1,194 @@
+"""
+Endpoint tests for new_app.py (Flask test client, no LLM calls).
+
+new_app resolves triples/ relative to the working directory, so every
+test runs inside its own tmp_path with a fresh, empty KG.
+"""
+
+import io
+import os
+
+import pytest
+
+import pipeline.topic_candidates as tc
+from kg import graph_visualiser
+from kg.graph_builder import build_graph_from_triples, merge_graphs, IncrementalGraph
+from kg.query import KGIndex
+from kg.snapshot import save_snapshot
+
+
+KARAMEH = [
+    {"subject": "معركة الكرامة", "predicate": "occurredIn", "object": "الكرامة", "span": "..."},
+    {"subject": "معركة الكرامة", "predicate": "occurredOn", "object": "1968-03-21", "span": "..."},
+]
+
+
+@pytest.fixture
+def app_module(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    import new_app
+
+    with new_app.KG_LOCK:
+        new_app.KG_STATE.update(kg=IncrementalGraph(), index=KGIndex(), timeline=None)
+        new_app.KG_STATE["graph"] = new_app.KG_STATE["kg"].G
+    return new_app
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+
+def test_ego_network_after_snapshot_reload_and_add(app_module, client):
+    save_snapshot(merge_graphs([build_graph_from_triples(KARAMEH, "event", "dbo:Event", source_file="a.pdf")]))
+    app_module.load_kg_snapshot()
+
+    response = client.post("/kg/add_triples", json={
+        "source": "b.pdf", "theme": "event", "tbox": "dbo:Event",
+        "triples": [{"subject": "معركة الكرامة", "predicate": "hasParticipant", "object": "الملك الحسين", "span": "..."}]
+    })
+    assert response.status_code == 200
+
+    for rank in ("weight", "pagerank"):
+        response = client.post("/kg/ego_network", json={"node": "الكرامة", "hops": 2, "rank": rank})
+        assert response.status_code == 200
+        result = response.get_json()
+        assert {n["id"] for n in result["nodes"]} == {"الكرامة", "معركة الكرامة", "1968-03-21", "الملك الحسين"}
+        assert all(isinstance(e["weight"], int) for e in result["edges"])
+
+
+def test_detect_topics_rejects_unknown_mode(client):
+    for payload in ({"text": "نص", "mode": "fastest"}, {"text": "نص", "mode": "fastest", "async": True}):
+        response = client.post("/detect_topics", json=payload)
+        assert response.status_code == 400
+        assert response.get_json()["error"].startswith("❌")
+
+
+def test_detect_topics_fast_mode_runs_locally(client):
+    response = client.post("/detect_topics", json={"text": "الأمن المائي في الشرق الأوسط", "mode": "fast"})
+    assert response.status_code == 200
+    assert response.get_json()["keywords"]
+
+
+# ------------------------------------------------------
+# Timeline and ego network
+# ------------------------------------------------------
+EVENTS = [
+    {"subject": "حرب حزيران", "predicate": "occurredOn", "object": "5 حزيران 1967", "span": "..."},
+    {"subject": "حرب حزيران", "predicate": "occurredIn", "object": "الضفة الغربية", "span": "..."},
+    {"subject": "معركة الكرامة", "predicate": "occurredOn", "object": "1968-03-21", "span": "..."},
+    {"subject": "معركة الكرامة", "predicate": "occurredIn", "object": "الكرامة", "span": "..."},
+    {"subject": "معركة الكرامة", "predicate": "hasParticipant", "object": "الملك الحسين", "span": "..."},
+    {"subject": "أحداث أيلول", "predicate": "occurredOn", "object": "أيلول 1970", "span": "..."},
+    {"subject": "أحداث أيلول", "predicate": "hasParticipant", "object": "الملك الحسين", "span": "..."},
+    {"subject": "أحداث أيلول", "predicate": "hasParticipant", "object": "وصفي التل", "span": "..."},
+]
+
+
+def _add(client, triples, source="a.pdf", theme="event"):
+    response = client.post("/kg/add_triples", json={
+        "source": source, "theme": theme, "tbox": "dbo:Event", "triples": triples
+    })
+    assert response.status_code == 200
+
+
+def test_timeline_range_place_and_refresh(client):
+    _add(client, EVENTS)
+
+    result = client.post("/kg/timeline", json={"start": "1967", "end": "1969"}).get_json()
+    assert [r["event"] for r in result["results"]] == ["حرب حزيران", "معركة الكرامة"]
+    assert result["total"] == 2
+
+    # place labels match after Arabic normalization
+    result = client.post("/kg/timeline", json={"start": "1960", "end": "1980", "place": "الضفه الغربيه"}).get_json()
+    assert [r["event"] for r in result["results"]] == ["حرب حزيران"]
+
+    page = client.post("/kg/timeline", json={"start": "1960", "offset": 1, "limit": 1}).get_json()
+    assert [r["event"] for r in page["results"]] == ["معركة الكرامة"]
+    assert (page["total"], page["offset"], page["limit"]) == (3, 1, 1)
+
+    # the cached index follows the graph version
+    _add(client, [{"subject": "معاهدة السلام", "predicate": "occurredOn", "object": "1994-10-26", "span": "..."}], source="b.pdf")
+    result = client.post("/kg/timeline", json={"start": "1990"}).get_json()
+    assert [r["event"] for r in result["results"]] == ["معاهدة السلام"]
+
+    response = client.post("/kg/timeline", json={"start": "قبل زمن بعيد"})
+    assert response.status_code == 400
+
+
+def test_ego_network_filters_and_caps(client):
+    _add(client, EVENTS)
+    _add(client, [{"subject": "مهرجان جرش", "predicate": "hasParticipant", "object": "الملك الحسين", "span": "..."}],
+         source="b.pdf", theme="cultural")
+
+    def ego(**payload):
+        response = client.post("/kg/ego_network", json={"node": "الملك الحسين", **payload})
+        assert response.status_code == 200
+        return response.get_json()
+
+    one_hop = {n["id"] for n in ego(hops=1)["nodes"]}
+    assert one_hop == {"الملك الحسين", "معركة الكرامة", "أحداث أيلول", "مهرجان جرش"}
+
+    # date range: events dated outside it (and their dates) are skipped
+    dated = {n["id"] for n in ego(hops=2, start="1970", end="1971")["nodes"]}
+    assert "أحداث أيلول" in dated and "معركة الكرامة" not in dated and "1968-03-21" not in dated
+
+    assert {n["id"] for n in ego(hops=1, theme="cultural")["nodes"]} == {"الملك الحسين", "مهرجان جرش"}
+    assert {n["id"] for n in ego(hops=1, source="b.pdf")["nodes"]} == {"الملك الحسين", "مهرجان جرش"}
+    assert all(e["predicate"] == "hasParticipant" for e in ego(hops=2, predicate="hasParticipant")["edges"])
+
+    capped = ego(hops=2, max_nodes=2)
+    assert len(capped["nodes"]) == 2 and capped["truncated"]
+
+
+def test_ego_network_errors(client):
+    _add(client, EVENTS)
+    assert client.post("/kg/ego_network", json={}).status_code == 400
+    assert client.post("/kg/ego_network", json={"node": "لا أحد"}).status_code == 404
+    assert client.post("/kg/ego_network", json={"node": "الملك الحسين", "rank": "nope"}).status_code == 400
+    assert client.post("/kg/ego_network", json={"node": "الملك الحسين", "start": "غير معروف"}).status_code == 400
+
+
+def test_graph_data_reads_layout_without_computing_it(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(graph_visualiser, "_LAYOUTS", {})
+    _add(client, EVENTS)
+
+    result = client.get("/kg/graph_data?layout=kg").get_json()
+    assert result["nodes"] and all("x" not in n for n in result["nodes"])
+    assert not (tmp_path / "triples" / "layouts").exists()
+
+    # the snapshot path computes and persists the layout; views only read it
+    assert client.post("/kg/snapshot", json={"action": "save"}).get_json()["layout_nodes"] == result["total"]
+    assert (tmp_path / "triples" / "layouts" / "kg.json").exists()
+    result = client.get("/kg/graph_data?layout=kg").get_json()
+    assert all("x" in n for n in result["nodes"])
+    assert all("x" not in n for n in client.get("/kg/graph_data").get_json()["nodes"])
+
+
+def test_visualize_graph_serves_viewer(client, tmp_path):
+    response = client.post("/visualize_graph", json={"source": "a.pdf", "theme": "event", "triples": EVENTS})
+    assert response.status_code == 200
+    assert b"/kg/graph_data" in response.data
+    assert not (tmp_path / "graph_visualization.html").exists()
+    assert client.get("/kg/graph_data").get_json()["total"] > 0
+
+
+def test_extract_text_survives_idf_errors_and_counts_uploads_once(app_module, client, monkeypatch):
+    os.makedirs(app_module.app.config["UPLOAD_FOLDER"], exist_ok=True)
+    monkeypatch.setattr(tc, "_ENGINE", None)
+    monkeypatch.setattr(app_module, "process_pdf", lambda path: "الأمن المائي في الشرق الأوسط")
+
+    def upload(name):
+        return client.post("/extract_text", data={"file": (io.BytesIO(b"%PDF same bytes"), name)})
+
+    assert upload("a.pdf").status_code == 200
+    assert upload("a-copy.pdf").status_code == 200
+    assert tc.get_engine().n_docs == 1
+
+    def broken(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(app_module, "add_to_corpus", broken)
+    response = upload("b.pdf")
+    assert response.status_code == 200
+    assert response.get_json()["text"] == "الأمن المائي في الشرق الأوسط"
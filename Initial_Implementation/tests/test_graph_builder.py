@@ -0,0 +1,159 @@
+"""
+Merge and incremental-update tests for kg/graph_builder.py.
+"""
+
+from kg.graph_builder import build_graph_from_triples, merge_graphs, IncrementalGraph
+
+
+KARAMEH = {"subject": "معركة الكرامة", "predicate": "occurredIn", "object": "الكرامة", "span": "..."}
+JERASH = {"subject": "مهرجان جرش", "predicate": "heldIn", "object": "جرش", "span": "..."}
+
+
+def _doc(source, triples, theme="event"):
+    return build_graph_from_triples(triples, theme, "dbo:Event", source_file=source)
+
+
+def test_merge_aggregates_sources_and_provenance():
+    G = merge_graphs([
+        _doc("a.pdf", [KARAMEH]),
+        _doc("b.pdf", [KARAMEH, JERASH], theme="cultural"),
+        _doc("a.pdf", [KARAMEH]),
+    ])
+
+    edge = G.edges["معركة الكرامة", "الكرامة", "occurredIn"]
+    assert edge["sources"] == ["a.pdf", "b.pdf"]
+    assert edge["themes"] == ["cultural", "event"]
+    assert edge["count"] == len(edge["provenance"]) == 2
+
+    node = G.nodes["معركة الكرامة"]
+    assert node["sources"] == ["a.pdf", "b.pdf"]
+    assert node["count"] == 2
+    assert G.nodes["جرش"]["count"] == 1
+
+
+def test_merge_is_stable_when_remerged():
+    G = merge_graphs([_doc("a.pdf", [KARAMEH]), _doc("b.pdf", [KARAMEH, JERASH])])
+    again = merge_graphs([G, _doc("b.pdf", [JERASH])])
+
+    assert dict(again.nodes(data=True)) == dict(G.nodes(data=True))
+    assert list(again.edges(keys=True, data=True)) == list(G.edges(keys=True, data=True))
+
+
+def test_merge_counts_match_incremental_graph():
+    merged = merge_graphs([_doc("a.pdf", [KARAMEH]), _doc("b.pdf", [KARAMEH, JERASH])])
+
+    kg = IncrementalGraph()
+    kg.add_source("a.pdf", [KARAMEH], "event", "dbo:Event")
+    kg.add_source("b.pdf", [KARAMEH, JERASH], "event", "dbo:Event")
+
+    for node in merged.nodes():
+        assert merged.nodes[node]["count"] == kg.G.nodes[node]["count"]
+        assert merged.nodes[node]["sources"] == kg.G.nodes[node]["sources"]
+
+
+def test_tree_merge_matches_single_pass():
+    docs = [_doc(f"{i}.pdf", [KARAMEH, JERASH] if i % 2 else [KARAMEH], theme=("event", "cultural")[i % 2]) for i in range(5)]
+
+    flat = merge_graphs(docs)
+    tree = merge_graphs(docs, parallel=True, workers=2, fan_in=2)
+
+    assert dict(tree.nodes(data=True)) == dict(flat.nodes(data=True))
+    assert list(tree.edges(keys=True, data=True)) == list(flat.edges(keys=True, data=True))
+    assert tree.edges["معركة الكرامة", "الكرامة", "occurredIn"]["count"] == 5
+
+
+def test_merge_empty():
+    assert merge_graphs([]).number_of_nodes() == 0
+
+
+def test_wrapping_a_reloaded_graph_rebuilds_bookkeeping(tmp_path):
+    import networkx as nx
+    from kg.graph_builder import export_graph
+
+    G = merge_graphs([_doc("a.pdf", [KARAMEH]), _doc("b.pdf", [KARAMEH, JERASH])])
+    # GraphML keeps lists as JSON strings and counts as whatever was written
+    H = nx.read_graphml(export_graph(G, folder=str(tmp_path))["graphml"])
+
+    kg = IncrementalGraph(H)
+    edge = kg.G.edges["معركة الكرامة", "الكرامة", "occurredIn"]
+    assert isinstance(edge["provenance"], list) and edge["count"] == 2
+    assert kg.sources() == ["a.pdf", "b.pdf"]
+
+    kg.add_source("c.pdf", [KARAMEH], "event", "dbo:Event")
+    assert edge["count"] == 3 and kg.G.nodes["الكرامة"]["count"] == 3
+
+    changes = kg.remove_source("b.pdf")
+    assert changes["removed"] == {("مهرجان جرش", "جرش", "heldIn")}
+    assert "جرش" not in kg.G
+
+
+# ------------------------------------------------------
+# IncrementalGraph change sets
+# ------------------------------------------------------
+HUSSEIN = {"subject": "معركة الكرامة", "predicate": "hasParticipant", "object": "الملك الحسين", "span": "..."}
+KARAMEH_KEY = ("معركة الكرامة", "الكرامة", "occurredIn")
+JERASH_KEY = ("مهرجان جرش", "جرش", "heldIn")
+HUSSEIN_KEY = ("معركة الكرامة", "الملك الحسين", "hasParticipant")
+
+
+def _patched_index(index, kg, changes):
+    """What new_app.apply_kg_changes does with a change set."""
+    for u, v, key in changes["removed"]:
+        index.remove_fact(u, key, v)
+    for u, v, key in changes["added"] | changes["updated"]:
+        index.add_fact(u, kg.G.edges[u, v, key]["predicate"], v, kg.G.edges[u, v, key])
+    return index
+
+
+def _facts(index):
+    return {(s, p, o) for s, ps in index.spo.items() for p, os_ in ps.items() for o in os_}
+
+
+def test_add_remove_upsert_change_sets():
+    from kg.query import KGIndex
+
+    kg = IncrementalGraph()
+    index = KGIndex()
+
+    changes = kg.add_source("a.pdf", [KARAMEH, JERASH], "event", "dbo:Event")
+    assert changes == {"added": {KARAMEH_KEY, JERASH_KEY}, "updated": set(), "removed": set()}
+    _patched_index(index, kg, changes)
+
+    changes = kg.add_source("b.pdf", [KARAMEH], "event", "dbo:Event")
+    assert changes == {"added": set(), "updated": {KARAMEH_KEY}, "removed": set()}
+    _patched_index(index, kg, changes)
+    assert kg.G.edges[KARAMEH_KEY]["sources"] == ["a.pdf", "b.pdf"]
+
+    # a.pdf now mentions Karameh and Hussein, no longer Jerash
+    changes = kg.upsert_source("a.pdf", [KARAMEH, HUSSEIN], "event", "dbo:Event")
+    assert changes == {"added": {HUSSEIN_KEY}, "updated": {KARAMEH_KEY}, "removed": {JERASH_KEY}}
+    _patched_index(index, kg, changes)
+    assert "جرش" not in kg.G and "مهرجان جرش" not in kg.G
+
+    changes = kg.remove_source("b.pdf")
+    assert changes == {"added": set(), "updated": {KARAMEH_KEY}, "removed": set()}
+    _patched_index(index, kg, changes)
+    assert kg.G.edges[KARAMEH_KEY]["sources"] == ["a.pdf"]
+    assert kg.G.nodes["الكرامة"]["count"] == 1
+
+    assert _facts(index) == _facts(KGIndex.from_graph(kg.G))
+    # every mutation bumped the version (derived caches are invalidated)
+    assert kg.version >= 4
+
+
+def test_upsert_with_identical_triples_only_updates():
+    kg = IncrementalGraph()
+    kg.add_source("a.pdf", [KARAMEH], "event", "dbo:Event")
+
+    changes = kg.upsert_source("a.pdf", [KARAMEH], "event", "dbo:Event")
+    assert changes == {"added": set(), "updated": {KARAMEH_KEY}, "removed": set()}
+    assert kg.G.edges[KARAMEH_KEY]["count"] == 1
+
+
+def test_removing_unknown_source_changes_nothing():
+    kg = IncrementalGraph()
+    kg.add_source("a.pdf", [KARAMEH], "event", "dbo:Event")
+    version = kg.version
+
+    assert kg.remove_source("missing.pdf") == {"added": set(), "updated": set(), "removed": set()}
+    assert kg.version == version
@@ -0,0 +1,84 @@
+"""
+Level-of-detail, force layout and graph-data paging tests for
+kg/graph_visualiser.py.
+"""
+
+import networkx as nx
+import pytest
+
+from kg import graph_visualiser
+from kg.graph_visualiser import level_of_detail, force_layout, cached_layout, graph_data
+
+
+def _hubs():
+    """Two linked hubs, five leaves on each, one parallel relation."""
+    G = nx.MultiDiGraph()
+    G.add_edge("a", "b", predicate="relatedTo")
+    G.add_edge("a", "b", predicate="hasOutcome")
+    for hub in ("a", "b"):
+        for i in range(5):
+            G.add_edge(hub, f"{hub}{i}", predicate="hasParticipant")
+    return G
+
+
+@pytest.fixture(autouse=True)
+def layout_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(graph_visualiser, "LAYOUT_DIR", str(tmp_path / "layouts"))
+    monkeypatch.setattr(graph_visualiser, "_LAYOUTS", {})
+
+
+def test_level_of_detail_folds_leaves_and_collapses_relations():
+    H = level_of_detail(_hubs())
+    assert set(H.nodes()) == {"a", "b", "cluster:a", "cluster:b"}
+    assert H.nodes["cluster:a"]["members"] == [f"a{i}" for i in range(5)]
+    assert H.edges["a", "b"]["count"] == 2
+    assert H.edges["a", "b"]["predicates"] == {"relatedTo": 1, "hasOutcome": 1}
+
+    ranks = graph_visualiser.pagerank(_hubs())
+    top = level_of_detail(_hubs(), top_k=3, min_degree=1)
+    assert set(top.nodes()) == set(sorted(ranks, key=ranks.get, reverse=True)[:3])
+
+
+def test_force_layout_is_deterministic_and_respects_fixed_nodes():
+    G = nx.Graph(_hubs())
+    pos = force_layout(G)
+    assert pos == force_layout(G)
+    assert all(0.0 <= c <= 1.0 for p in pos.values() for c in p)
+    assert force_layout(nx.Graph()) == {} and force_layout(nx.path_graph(1)) == {0: (0.5, 0.5)}
+
+    start = {"a": (0.25, 0.5), "b": (0.75, 0.5)}
+    moved = force_layout(G, iterations=5, pos=start, fixed={"a", "b"})
+    assert moved["a"] == (0.25, 0.5) and moved["b"] == (0.75, 0.5)
+    assert moved["a0"] != pos["a0"]
+
+
+def test_cached_layout_reuses_and_extends_stored_positions():
+    G = nx.Graph(_hubs())
+    first = cached_layout(G, "kg")
+    assert set(first) == set(G)
+
+    G.add_edge("a", "a5")
+    second = cached_layout(G, "kg")
+    # old nodes keep their place, the new one lands near its neighbor
+    assert all(second[n] == first[n] for n in first)
+    assert abs(second["a5"][0] - first["a"][0]) < 0.5
+
+    # persisted: a fresh process reads the same positions
+    graph_visualiser._LAYOUTS.clear()
+    assert graph_visualiser.load_layout("kg") == pytest.approx(second)
+
+
+def test_graph_data_pages_build_the_induced_subgraph():
+    G = _hubs()
+    pages = [graph_data(G, offset=offset, limit=4) for offset in range(0, G.number_of_nodes(), 4)]
+
+    assert sum(len(p["nodes"]) for p in pages) == G.number_of_nodes()
+    edges = [e["id"] for p in pages for e in p["edges"]]
+    assert len(edges) == len(set(edges)) == G.number_of_edges()
+    assert all("x" not in n for p in pages for n in p["nodes"])
+
+    expanded = graph_data(G, expand="a", limit=3)
+    assert expanded["nodes"][0]["id"] == "a" and len(expanded["nodes"]) == 4
+    assert all(e["from"] == "a" or e["to"] == "a" for e in expanded["edges"])
+    with pytest.raises(KeyError):
+        graph_data(G, expand="missing")
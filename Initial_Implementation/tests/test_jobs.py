@@ -0,0 +1,137 @@
+"""
+Background job queue tests (pipeline/jobs.py + the /jobs endpoints),
+with stub runners instead of LLM stages.
+"""
+
+import threading
+import time
+
+import pytest
+
+from pipeline.jobs import JobQueue, QueueFull
+
+
+def _wait(queue, job_id, status="done", timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job["status"] == status:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} is {queue.get(job_id)['status']}, expected {status}")
+
+
+def _count_words(params, progress):
+    words = params["text"].split()
+    for i in range(len(words)):
+        progress("count", done=i + 1, total=len(words))
+    return {"words": len(words)}
+
+
+@pytest.fixture
+def queue(tmp_path):
+    q = JobQueue(db_path=str(tmp_path / "jobs.sqlite3"), workers=1, max_pending=2)
+    q.register("count_words", ["count"], _count_words)
+    return q
+
+
+def test_job_runs_and_reports_progress(queue):
+    job = _wait(queue, queue.submit("count_words", {"text": "حرب حزيران عام 1967"}))
+    assert job["result"] == {"words": 4}
+    assert job["stages"]["count"] == {"status": "done", "done": 4, "total": 4}
+    assert queue.stats()["pending"] == 0
+
+
+def test_runner_error_is_recorded(queue):
+    def fail(params, progress):
+        raise RuntimeError("LLM unavailable")
+
+    queue.register("fail", ["call"], fail)
+    job = _wait(queue, queue.submit("fail", {}), status="error")
+    assert job["error"] == "LLM unavailable"
+
+
+def test_queue_full_and_unknown_kind(queue):
+    release = threading.Event()
+    queue.register("block", ["wait"], lambda params, progress: release.wait(5))
+    try:
+        queue.submit("block", {})
+        queue.submit("block", {})
+        with pytest.raises(QueueFull):
+            queue.submit("block", {})
+    finally:
+        release.set()
+    with pytest.raises(ValueError):
+        queue.submit("nope", {})
+
+
+def test_restart_marks_unfinished_jobs_interrupted(tmp_path):
+    db = str(tmp_path / "jobs.sqlite3")
+    release = threading.Event()
+    first = JobQueue(db_path=db, workers=1, max_pending=4)
+    first.register("block", ["wait"], lambda params, progress: release.wait(5))
+    running = first.submit("block", {})
+    queued = first.submit("block", {})
+    _wait(first, running, status="running")
+
+    # A new process opens the same database
+    second = JobQueue(db_path=db)
+    try:
+        assert second.get(running)["status"] == "interrupted"
+        assert second.get(queued)["status"] == "interrupted"
+        assert second.get(running)["finished"] is not None
+    finally:
+        release.set()
+
+
+# ------------------------------------------------------
+# Endpoints
+# ------------------------------------------------------
+@pytest.fixture
+def app_jobs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    import new_app
+
+    q = JobQueue(db_path=str(tmp_path / "jobs.sqlite3"), workers=1, max_pending=1)
+    q.register("pipeline", ["count"], _count_words)
+    q.register("detect_topics", ["topics"], lambda params, progress: {"topics": [params["text"]]})
+    monkeypatch.setattr(new_app, "JOBS", q)
+    return new_app.app.test_client(), q
+
+
+def test_submit_returns_202_and_job_can_be_polled(app_jobs):
+    client, q = app_jobs
+
+    response = client.post("/jobs", json={"kind": "pipeline", "params": {"text": "معركة الكرامة"}})
+    assert response.status_code == 202
+    body = response.get_json()
+    assert body["status"] == "queued" and body["status_url"] == f"/jobs/{body['job_id']}"
+
+    _wait(q, body["job_id"])
+    job = client.get(body["status_url"]).get_json()
+    assert job["status"] == "done" and job["result"] == {"words": 2}
+    assert "result" not in client.get(body["status_url"] + "?result=0").get_json()
+    assert [j["id"] for j in client.get("/jobs").get_json()["jobs"]] == [body["job_id"]]
+    assert client.get("/jobs/unknown").status_code == 404
+
+
+def test_async_flag_on_pipeline_endpoint(app_jobs):
+    client, q = app_jobs
+    response = client.post("/detect_topics", json={"text": "تراث", "mode": "fast", "async": True})
+    assert response.status_code == 202
+    assert _wait(q, response.get_json()["job_id"])["result"] == {"topics": ["تراث"]}
+
+
+def test_saturated_queue_answers_429(app_jobs):
+    client, q = app_jobs
+    release = threading.Event()
+    q.register("pipeline", ["wait"], lambda params, progress: release.wait(5))
+    try:
+        assert client.post("/jobs", json={}).status_code == 202
+        response = client.post("/jobs", json={})
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "30"
+        assert response.get_json()["pending"] == 1
+    finally:
+        release.set()
+    assert client.post("/jobs", json={"kind": "nope"}).status_code == 400
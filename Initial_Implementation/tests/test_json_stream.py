@@ -0,0 +1,68 @@
+"""
+Incremental JSON array parser (pipeline/json_stream.py): the same
+elements must come out however the completion is chunked.
+"""
+
+import json
+
+import pytest
+
+from pipeline.json_stream import JSONArrayStreamParser, iter_json_array, parse_json_array
+
+
+ELEMENTS = [
+    {"subject": "معركة الكرامة", "predicate": "occurredIn", "object": "الكرامة [الأردن]", "span": "قال \"نعم\" {x}"},
+    {"subject": "a\\b", "predicate": "p", "object": ["nested", {"k": "]"}], "span": ""},
+    12.5,
+    True,
+    None,
+    "plain",
+]
+RAW = "```json\n" + json.dumps(ELEMENTS, ensure_ascii=False, indent=1) + "\n```\nDone."
+
+
+def _chunks(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, len(RAW)])
+def test_any_chunking_yields_the_same_elements(size):
+    parser = JSONArrayStreamParser()
+    out = []
+    for chunk in _chunks(RAW, size):
+        out.extend(parser.feed(chunk))
+
+    assert out == ELEMENTS
+    assert parser.done and parser.errors == 0
+
+
+def test_elements_are_yielded_as_soon_as_complete():
+    parser = JSONArrayStreamParser()
+    assert parser.feed('{"triples": [{"a": 1}, {"b"') == [{"a": 1}]
+    assert parser.feed(': 2}') == [{"b": 2}]
+    assert parser.feed("]}") == []
+    assert parser.done
+    assert parser.feed('[{"c": 3}]') == []
+
+
+def test_truncated_response_keeps_the_valid_prefix():
+    text = json.dumps(ELEMENTS[:2], ensure_ascii=False)[:-1] + ', {"subject": "c", "pred'
+    assert parse_json_array(text) == ELEMENTS[:2]
+
+
+def test_invalid_elements_are_counted_and_skipped():
+    parser = JSONArrayStreamParser()
+    assert parser.feed('[{"a": 1,}, {"b": 2}, tru]') == [{"b": 2}]
+    assert parser.errors == 2
+
+
+def test_iter_stops_at_the_closing_bracket():
+    consumed = []
+
+    def chunks():
+        for c in ['[1, ', '2]', ' trailing', '[3]']:
+            consumed.append(c)
+            yield c
+
+    assert list(iter_json_array(chunks())) == [1, 2]
+    assert consumed == ['[1, ', '2]']
@@ -0,0 +1,47 @@
+"""
+Hashed n-gram classifier tests for pipeline/local_classifier.py.
+"""
+
+import numpy as np
+import pytest
+
+from pipeline.local_classifier import (
+    HashedLinearClassifier, hash_features, append_history, load_history, train_from_history
+)
+
+
+SPORT = ["انطلقت المباراة النهائية في الملعب", "سجل اللاعب هدفين في المباراة", "فاز الفريق بالبطولة"]
+FOOD = ["طبخنا المنسف مع اللبن والارز", "وصفة الكنافة بالجبن والقطر", "يقدم المطبخ الاطباق بالزيت"]
+
+
+def test_hash_features_are_stable_and_normalized():
+    X = hash_features(SPORT + [""], n_features=2 ** 12)
+    assert X.shape == (4, 2 ** 12)
+    np.testing.assert_allclose(np.sqrt(X.multiply(X).sum(axis=1)).A.ravel(), [1, 1, 1, 0], rtol=1e-5)
+    assert (hash_features(SPORT, 2 ** 12) != X[:3]).nnz == 0
+
+
+def test_fit_predict_and_round_trip(tmp_path):
+    clf = HashedLinearClassifier().fit(SPORT + FOOD, ["sport"] * 3 + ["food"] * 3)
+    assert clf.labels == ["food", "sport"]
+    assert [label for label, _ in clf.predict(["المباراة في الملعب", "المنسف والكنافة"])] == ["sport", "food"]
+    assert clf.predict([]) == []
+
+    loaded = HashedLinearClassifier.load(clf.save(str(tmp_path / "m.npz")))
+    np.testing.assert_allclose(loaded.predict_proba(SPORT), clf.predict_proba(SPORT))
+
+
+def test_train_from_history(tmp_path):
+    history, model = str(tmp_path / "h.jsonl"), str(tmp_path / "m.npz")
+    append_history(history, SPORT[0], "sport")
+    with pytest.raises(ValueError):
+        train_from_history(history, model)
+
+    for text in SPORT[1:]:
+        append_history(history, text, "sport")
+    for text in FOOD:
+        append_history(history, text, "food", max_chars=10)
+    assert [e["text"] for e in load_history(history)][3] == FOOD[0][:10]
+
+    assert train_from_history(history, model).labels == ["food", "sport"]
+    assert HashedLinearClassifier.load(model).labels == ["food", "sport"]
@@ -0,0 +1,77 @@
+"""
+Index, paging and neighborhood tests for kg/query.py.
+"""
+
+from kg.graph_builder import build_graph_from_triples
+from kg.query import KGIndex
+
+
+TRIPLES = [
+    {"subject": "احداث ايلول", "predicate": "occurredIn", "object": "عمّان", "span": "..."},
+    {"subject": "احداث ايلول", "predicate": "hasParticipant", "object": "الجيش الاردني", "span": "..."},
+    {"subject": "معركه الكرامه", "predicate": "hasParticipant", "object": "الجيش الاردني", "span": "..."},
+    {"subject": "معركه الكرامه", "predicate": "occurredIn", "object": "الكرامه", "span": "..."},
+    {"subject": "الكرامه", "predicate": "locatedIn", "object": "الاغوار", "span": "..."},
+]
+
+
+def _index():
+    return KGIndex.from_graph(build_graph_from_triples(TRIPLES, "event", "dbo:Event", source_file="a.pdf"))
+
+
+def _facts(result):
+    return [(r["subject"], r["predicate"], r["object"]) for r in result["results"]]
+
+
+def test_match_patterns_and_normalized_labels():
+    index = _index()
+    assert index.count_match() == 5
+    assert index.count_match(p="hasParticipant") == 2
+    assert _facts(index.match(p="occurredIn", o="عمان")) == [("احداث ايلول", "occurredIn", "عمّان")]
+    assert sorted(_facts(index.match(o="الجيش الاردني", p="*"))) == sorted([
+        ("احداث ايلول", "hasParticipant", "الجيش الاردني"),
+        ("معركه الكرامه", "hasParticipant", "الجيش الاردني"),
+    ])
+    assert index.match(s="لا أحد")["total"] == 0
+
+
+def test_match_paging_covers_every_fact_once():
+    index = _index()
+    pages = [index.match(offset=offset, limit=2) for offset in (0, 2, 4)]
+    assert [len(page["results"]) for page in pages] == [2, 2, 1]
+    assert all(page["total"] == 5 for page in pages)
+    assert len({fact for page in pages for fact in _facts(page)}) == 5
+
+
+def test_neighborhood_hops_filter_and_paging():
+    index = _index()
+    one = index.neighborhood("معركه الكرامه", hops=1)
+    assert one["total"] == 2 and one["nodes"] == 3
+
+    two = index.neighborhood("معركه الكرامه", hops=2)
+    assert ("الكرامه", "locatedIn", "الاغوار") in _facts(two)
+    assert ("احداث ايلول", "hasParticipant", "الجيش الاردني") in _facts(two)
+    assert index.neighborhood("معركه الكرامه", hops=5)["total"] == two["total"]
+
+    assert _facts(index.neighborhood("معركه الكرامه", hops=2, predicate="occurredIn")) == [
+        ("معركه الكرامه", "occurredIn", "الكرامه")
+    ]
+    page = index.neighborhood("معركه الكرامه", hops=2, offset=1, limit=2)
+    assert _facts(page) == _facts(two)[1:3]
+
+
+def test_remove_fact_drops_unused_aliases():
+    index = _index()
+    index.remove_fact("احداث ايلول", "occurredIn", "عمّان")
+    assert index.resolve("عمان") == set()
+    assert "عمان" not in index.aliases
+
+    # still used by another fact → alias kept until its last use goes
+    index.remove_fact("احداث ايلول", "hasParticipant", "الجيش الاردني")
+    assert index.resolve("الجيش الأردني") == {"الجيش الاردني"}
+    index.remove_fact("معركه الكرامه", "hasParticipant", "الجيش الاردني")
+    assert index.resolve("الجيش الأردني") == set()
+    assert index.resolve("hasParticipant") == set()
+
+    index.add_fact("احداث ايلول", "occurredIn", "عمّان")
+    assert index.resolve("عمان") == {"عمّان"}
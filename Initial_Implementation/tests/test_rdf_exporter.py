@@ -0,0 +1,114 @@
+"""
+Canonical IRI and serialization tests for pipeline/rdf_exporter.py.
+"""
+
+import gzip
+
+import pytest
+import rdflib
+
+import pipeline.rdf_exporter as rdf_exporter
+from pipeline.rdf_exporter import ONTOLOGY_NS, RDF_TYPE, canonical_iri, expand_iri, export_rdf
+
+
+TRIPLES = [
+    {"subject": "معركة الكرامة", "predicate": "followedBy", "object": "احداث ايلول", "span": "..."},
+    {"subject": "احداث ايلول", "predicate": "occurredIn", "object": "عمان", "span": "..."},
+    {"subject": "أحداث أيلول", "predicate": "hasParticipant", "object": "وصفي التل", "span": "..."},
+]
+
+
+def test_iri_depends_on_normalized_label_only():
+    assert canonical_iri("احداث ايلول") == canonical_iri("  أحداث أيلول ")
+    assert canonical_iri("احداث ايلول") != canonical_iri("معركة الكرامة")
+
+
+def _parse(path, fmt="nt"):
+    return set(rdflib.Graph().parse(path, format=fmt))
+
+
+def test_subject_and_object_share_one_iri(tmp_path):
+    path = export_rdf(TRIPLES, "dbo:Event", formats=["nt"], folder=str(tmp_path))["nt"]["path"]
+    graph = rdflib.Graph().parse(path, format="nt")
+    event = rdflib.URIRef(canonical_iri("احداث ايلول"))
+    battle = rdflib.URIRef(canonical_iri("معركة الكرامة"))
+    rdf_type = rdflib.URIRef(RDF_TYPE)
+
+    assert set(graph.objects(battle, rdflib.URIRef(ONTOLOGY_NS + "followedBy"))) == {event}
+    assert len(set(graph.predicates(event, None)) - {rdf_type, rdflib.RDFS.label}) == 2
+    # typed once, as a subject; objects that are never subjects stay untyped
+    assert list(graph.objects(event, rdf_type)) == [rdflib.URIRef("http://dbpedia.org/ontology/Event")]
+    assert not list(graph.objects(rdflib.URIRef(canonical_iri("عمان")), rdf_type))
+
+
+def test_output_independent_of_input_order(tmp_path):
+    forward = export_rdf(TRIPLES * 2, "dbo:Event", folder=str(tmp_path / "f"))
+    backward = export_rdf(list(reversed(TRIPLES)), "dbo:Event", folder=str(tmp_path / "b"))
+
+    for fmt, rdf_format in (("nt", "nt"), ("ttl", "turtle"), ("jsonld", "json-ld")):
+        assert _parse(forward[fmt]["path"], rdf_format) == _parse(backward[fmt]["path"], rdf_format)
+    # duplicates inside the window are written once
+    with open(forward["nt"]["path"], encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert len(lines) == len(set(lines))
+
+
+def test_streams_a_one_shot_iterator(tmp_path):
+    paths = export_rdf(iter(TRIPLES), "dbo:Event", folder=str(tmp_path), gzip_output=True)
+    assert all(info["path"].endswith(".gz") and info["bytes"] > 0 for info in paths.values())
+    plain = export_rdf(TRIPLES, "dbo:Event", formats=["nt"], folder=str(tmp_path / "plain"))
+    with gzip.open(paths["nt"]["path"], "rb") as f:
+        assert _parse(f, "nt") == _parse(plain["nt"]["path"])
+
+
+def test_expand_iri():
+    assert expand_iri("dbo:Event") == "http://dbpedia.org/ontology/Event"
+    assert expand_iri("HistoricalEvent") == ONTOLOGY_NS + "HistoricalEvent"
+    assert expand_iri("http://example.org/x#Y") == "http://example.org/x#Y"
+    with pytest.raises(ValueError):
+        expand_iri("nope:Event")
+
+
+def test_exports_parse_and_agree(tmp_path):
+    paths = export_rdf(TRIPLES, "HistoricalEvent", formats=["ttl", "nt"], folder=str(tmp_path))
+
+    nt = rdflib.Graph().parse(paths["nt"]["path"], format="nt")
+    ttl = rdflib.Graph().parse(paths["ttl"]["path"], format="turtle")
+    assert set(nt) == set(ttl)
+
+    event = rdflib.URIRef(canonical_iri("احداث ايلول"))
+    assert (event, rdflib.URIRef(RDF_TYPE), rdflib.URIRef(ONTOLOGY_NS + "HistoricalEvent")) in nt
+    assert len(set(nt.subjects(rdflib.URIRef(RDF_TYPE), None))) == 2
+
+
+@pytest.mark.parametrize("gzip_output", [False, True])
+def test_writer_threads_match_the_sequential_pass(tmp_path, monkeypatch, gzip_output):
+    monkeypatch.setattr(rdf_exporter, "EXPORT_BATCH", 2)
+    triples = TRIPLES * 3 + [
+        {"subject": f"حدث {i}", "predicate": "occurredIn", "object": "عمان", "span": "..."} for i in range(20)
+    ]
+    targets = {fmt: str(tmp_path / "{}" / f"graph.{fmt}") for fmt in ("ttl", "jsonld", "nt")}
+    results = {}
+    for parallel in (False, True):
+        paths = {fmt: path.format(parallel) for fmt, path in targets.items()}
+        results[parallel] = rdf_exporter._write_formats(
+            triples, "dbo:Event", "event", paths, gzip_output, "", parallel
+        )
+
+    opener = gzip.open if gzip_output else open
+    for fmt in targets:
+        with opener(results[False][fmt]["path"], "rb") as a, opener(results[True][fmt]["path"], "rb") as b:
+            assert a.read() == b.read()
+
+
+def test_writer_thread_error_is_raised(tmp_path, monkeypatch):
+    monkeypatch.setattr(rdf_exporter, "EXPORT_BATCH", 1)
+    monkeypatch.setattr(rdf_exporter, "EXPORT_QUEUE", 1)
+
+    def fail(self, block):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(rdf_exporter.NTriplesWriter, "write", fail)
+    targets = {fmt: str(tmp_path / f"graph.{fmt}") for fmt in ("ttl", "nt")}
+    with pytest.raises(OSError, match="disk full"):
+        rdf_exporter._write_formats(TRIPLES * 10, "dbo:Event", "event", targets, parallel=True)
@@ -0,0 +1,125 @@
+"""
+Round-trip tests for the binary KG snapshot (kg/snapshot.py).
+"""
+
+import json
+
+import networkx as nx
+import numpy as np
+
+import kg.snapshot as snapshot
+from kg.graph_builder import build_graph_from_triples, merge_graphs, IncrementalGraph
+from kg.snapshot import save_snapshot, load_snapshot
+
+
+def _merged_graph():
+    return merge_graphs([
+        build_graph_from_triples(
+            [{"subject": "معركة الكرامة", "predicate": "occurredIn", "object": "الكرامة", "span": "..."}],
+            "event", "dbo:Event", source_file="a.pdf"
+        ),
+        build_graph_from_triples(
+            [
+                {"subject": "معركة الكرامة", "predicate": "occurredIn", "object": "الكرامة", "span": "..."},
+                {"subject": "مهرجان جرش", "predicate": "heldIn", "object": "جرش", "span": "..."},
+            ],
+            "cultural", "dbo:Event", source_file="b.pdf"
+        ),
+    ])
+
+
+def test_round_trip_keeps_attribute_types(tmp_path):
+    G = _merged_graph()
+    G.nodes["جرش"]["score"] = 0.25
+    G.nodes["جرش"]["flag"] = True
+    G.graph["version"] = 7
+
+    save_snapshot(G, str(tmp_path / "snap"))
+    H = load_snapshot(str(tmp_path / "snap")).to_graph()
+
+    assert isinstance(H, nx.MultiDiGraph)
+    assert dict(H.nodes(data=True)) == dict(G.nodes(data=True))
+    assert sorted(H.edges(keys=True, data=True), key=str) == sorted(G.edges(keys=True, data=True), key=str)
+    assert H.graph["version"] == 7
+
+    for _, _, attrs in H.edges(data=True):
+        assert isinstance(attrs["count"], int)
+        assert isinstance(attrs["provenance"], list)
+    assert isinstance(H.nodes["جرش"]["score"], float)
+    assert H.nodes["جرش"]["flag"] is True
+
+
+def test_reloaded_graph_merges_again(tmp_path):
+    G = _merged_graph()
+    save_snapshot(G, str(tmp_path / "snap"))
+    H = load_snapshot(str(tmp_path / "snap")).to_graph()
+
+    merged = merge_graphs([H, H])
+    assert all(isinstance(a["count"], int) for _, _, a in merged.edges(data=True))
+
+
+def test_subset_includes_facts_shared_by_several_sources(tmp_path):
+    save_snapshot(_merged_graph(), str(tmp_path / "snap"))
+    snap = load_snapshot(str(tmp_path / "snap"))
+
+    only_a = snap.to_graph(source="a.pdf")
+    assert set(only_a.edges()) == {("معركة الكرامة", "الكرامة")}
+
+    only_b = snap.to_graph(source="b.pdf")
+    assert set(only_b.edges()) == {("معركة الكرامة", "الكرامة"), ("مهرجان جرش", "جرش")}
+
+
+def test_non_string_edge_keys_survive(tmp_path):
+    G = nx.MultiDiGraph()
+    G.add_edge("a", "b", predicate="p")
+    G.add_edge("a", "b", predicate="p")
+
+    save_snapshot(G, str(tmp_path / "snap"))
+    H = load_snapshot(str(tmp_path / "snap")).to_graph()
+    assert sorted(H.edges(keys=True)) == [("a", "b", 0), ("a", "b", 1)]
+
+
+def test_columns_are_typed_and_aggregates_derived(tmp_path):
+    save_snapshot(_merged_graph(), str(tmp_path / "snap"))
+    snap = load_snapshot(str(tmp_path / "snap"))
+
+    assert snap.meta["kinds"]["nodes"]["count"] == "int"
+    assert snap.columns["nodes.count"].dtype == np.int64
+    assert snap.meta["kinds"]["nodes"]["sources"] == "list"
+    # edge sources / themes / count come from the provenance columns
+    assert not set(snap.meta["kinds"]["edges"]) & {"provenance", "sources", "themes", "count"}
+    assert "json" not in set(snap.meta["kinds"]["nodes"].values()) | set(snap.meta["kinds"]["edges"].values())
+
+    bare = snap.to_graph(aggregates=False)
+    attrs = bare.edges["معركة الكرامة", "الكرامة", "occurredIn"]
+    assert "count" not in attrs and len(attrs["provenance"]) == 2
+    wrapped = IncrementalGraph(bare).G.edges["معركة الكرامة", "الكرامة", "occurredIn"]
+    assert (wrapped["count"], wrapped["sources"]) == (2, ["a.pdf", "b.pdf"])
+
+
+def test_json_values_are_parsed_once_per_distinct_value(tmp_path, monkeypatch):
+    G = nx.MultiDiGraph()
+    for i in range(50):
+        G.add_edge(f"s{i}", "o", key="p", predicate="p", weight=0.5, meta={"kind": "x"})
+    G.add_edge("o", "s0", key="p", predicate="p")  # unset on one row → stored as JSON
+    save_snapshot(G, str(tmp_path / "snap"))
+    snap = load_snapshot(str(tmp_path / "snap"))
+
+    calls = []
+    loads = json.loads
+    monkeypatch.setattr(snapshot.json, "loads", lambda s, **kw: calls.append(s) or loads(s, **kw))
+    H = snap.to_graph()
+
+    assert calls.count("0.5") == 1
+    values = [a["meta"] for _, _, a in H.edges(data=True) if "meta" in a]
+    assert values[0] == {"kind": "x"}
+    assert len({id(v) for v in values}) == 50  # mutable values are not shared
+
+
+def test_subset_rebuilds_only_the_selected_provenance(tmp_path):
+    save_snapshot(_merged_graph(), str(tmp_path / "snap"))
+    only_b = load_snapshot(str(tmp_path / "snap")).to_graph(source="b.pdf")
+
+    attrs = only_b.edges["مهرجان جرش", "جرش", "heldIn"]
+    assert [p["source"] for p in attrs["provenance"]] == ["b.pdf"]
+    assert attrs["count"] == 1 and attrs["themes"] == ["cultural"]
@@ -0,0 +1,105 @@
+"""
+Timeout, row-limit and persistence tests for kg/sparql_store.py, run
+against both backends.
+"""
+
+import threading
+import time
+
+import pytest
+
+import kg.sparql_store as sparql_store
+from kg.sparql_store import SparqlStore
+
+
+@pytest.fixture(params=["oxigraph", "rdflib"])
+def store(request, tmp_path, monkeypatch):
+    if request.param == "oxigraph":
+        pytest.importorskip("pyoxigraph")
+    else:
+        monkeypatch.setattr(sparql_store, "ox", None)
+    return SparqlStore(str(tmp_path / "store"))
+
+
+def _write_nt(path, n):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            f.write(f"<http://example.org/resource/e{i}> <http://example.org/ontology/p> "
+                    f"<http://example.org/resource/o{i}> .\n")
+    return str(path)
+
+
+def _query_threads():
+    return [t for t in threading.enumerate() if t.name == "sparql-query"]
+
+
+def _wait_for_workers(timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while _query_threads() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return _query_threads()
+
+
+def test_max_rows_is_exact(store, tmp_path):
+    store.load_source("a.pdf", _write_nt(tmp_path / "a.nt", 20))
+    rows = list(store.query("SELECT ?s WHERE { ?s ?p ?o }", max_rows=5))
+
+    assert rows[0] == {"head": ["s"]}
+    assert len(rows) - 1 == 5
+
+
+def test_timeout_raises(store, tmp_path):
+    store.load_source("a.pdf", _write_nt(tmp_path / "a.nt", 200))
+    cross = "SELECT * WHERE { ?a ?b ?c . ?d ?e ?f . ?g ?h ?i }"
+
+    with pytest.raises(TimeoutError):
+        for _ in store.query(cross, timeout=0.3, max_rows=10 ** 9):
+            pass
+    assert not _wait_for_workers()
+    assert store.load_source("b.pdf", _write_nt(tmp_path / "b.nt", 1)) == 1
+
+
+def test_abandoned_query_releases_worker(store, tmp_path):
+    # More rows than the queue holds, and nobody reads them
+    store.load_source("a.pdf", _write_nt(tmp_path / "a.nt", 3000))
+    rows = store.query("SELECT ?s WHERE { ?s ?p ?o }", max_rows=10 ** 6)
+    assert next(rows) == {"head": ["s"]}
+    time.sleep(0.3)
+    rows.close()
+
+    assert not _wait_for_workers()
+    # the store is usable again (the rdflib lock was released)
+    assert store.load_source("b.pdf", _write_nt(tmp_path / "b.nt", 1)) == 1
+
+
+def test_rdflib_store_persists_per_document(tmp_path, monkeypatch):
+    monkeypatch.setattr(sparql_store, "ox", None)
+    store = SparqlStore(str(tmp_path / "store"))
+    store.load_source("a.pdf", _write_nt(tmp_path / "a.nt", 3))
+    store.load_source("b.pdf", _write_nt(tmp_path / "b.nt", 2))
+    store.remove_source("a.pdf")
+
+    reopened = SparqlStore(store.path)
+    assert reopened.sources() == ["b.pdf"]
+    rows = list(reopened.query("SELECT ?s WHERE { ?s ?p ?o }"))
+    assert len(rows) - 1 == 2
+
+
+def test_load_is_not_blocked_by_a_running_query(store, tmp_path):
+    store.load_source("a.pdf", _write_nt(tmp_path / "a.nt", 3000))
+    rows = store.query("SELECT ?s WHERE { ?s ?p ?o }", max_rows=10 ** 6, timeout=30)
+    assert next(rows) == {"head": ["s"]}
+
+    start = time.monotonic()
+    assert store.load_source("b.pdf", _write_nt(tmp_path / "b.nt", 1)) == 1
+    assert time.monotonic() - start < 5
+
+    if store.backend == "rdflib":
+        # rows after the load would mix two store states
+        with pytest.raises(RuntimeError):
+            for _ in rows:
+                pass
+    else:
+        # oxigraph reads the snapshot the query started on
+        assert sum(1 for _ in rows) == 3000
+    assert not _wait_for_workers()
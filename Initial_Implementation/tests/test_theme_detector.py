@@ -0,0 +1,129 @@
+"""
+Rule-based and local tiers of pipeline/theme_detector.py (no LLM calls).
+"""
+
+import pytest
+
+import pipeline.theme_detector as theme_detector
+from pipeline.local_classifier import append_history
+from pipeline.text_normalizer import clean_text
+from pipeline.theme_detector import rule_based_theme, rule_based_theme_scored, score_themes
+
+
+@pytest.mark.parametrize("text, theme", [
+    ("اندلعت الحرب", "event"),
+    ("حربهم الأخيرة", "event"),
+    ("wars and battles", "event"),
+    ("الفنون والتراث", "cultural"),
+])
+def test_keyword_with_clitics_and_suffixes(text, theme):
+    assert score_themes(clean_text(text))[theme] > 0
+
+
+@pytest.mark.parametrize("text", ["warning signs", "artificial lakes", "فنادق عمان"])
+def test_keyword_prefix_of_longer_word_does_not_match(text):
+    assert score_themes(clean_text(text)) == {"event": 0, "cultural": 0}
+
+
+def test_single_generic_hit_is_left_to_the_next_tier():
+    assert rule_based_theme_scored(clean_text("عقد اجتماع في عمان")) == ("event", 0.5)
+    assert rule_based_theme(clean_text("عقد اجتماع في عمان")) is None
+
+
+@pytest.mark.parametrize("text, theme, confidence", [
+    ("اندلعت الحرب", "event", 2 / 3),                   # one strong keyword
+    ("عقد اجتماع واتفاق في عمان", "event", 2 / 3),      # two generic keywords
+    ("التقاليد والعادات والتراث في حرب", "cultural", 2 / 3),
+])
+def test_enough_evidence_clears_the_threshold(text, theme, confidence):
+    assert rule_based_theme_scored(clean_text(text)) == (theme, pytest.approx(confidence))
+    assert rule_based_theme(clean_text(text)) == theme
+
+
+def test_mixed_hits_need_a_clear_margin():
+    assert rule_based_theme(clean_text("حرب وتراث")) is None
+    assert rule_based_theme_scored(clean_text("التقاليد والعادات في حرب")) == ("cultural", pytest.approx(4 / 7))
+    assert rule_based_theme(clean_text("التقاليد والعادات في حرب")) is None
+    assert rule_based_theme_scored("") == (None, 0.0)
+
+
+# No theme keywords: only the local classifier can resolve these
+SPORT = ["انطلقت المباراة النهائية في الملعب", "سجل اللاعب هدفين في المباراة", "فاز الفريق بالبطولة"]
+FOOD = ["طبخنا المنسف مع اللبن والارز", "وصفة الكنافة بالجبن والقطر", "يقدم المطبخ الاطباق بالزيت"]
+
+
+@pytest.fixture
+def local_tier(tmp_path, monkeypatch):
+    monkeypatch.setattr(theme_detector, "THEME_MODEL_PATH", str(tmp_path / "theme_classifier.npz"))
+    monkeypatch.setattr(theme_detector, "THEME_HISTORY_PATH", str(tmp_path / "theme_history.jsonl"))
+    monkeypatch.setattr(theme_detector, "_LOCAL_MODEL", {"model": None, "mtime": None})
+
+    def no_llm(*args):
+        raise AssertionError("LLM called")
+    monkeypatch.setattr(theme_detector, "llm_theme_detector", no_llm)
+    monkeypatch.setattr(theme_detector, "llm_batch_theme_detector", no_llm)
+
+
+def test_trained_classifier_resolves_without_llm(local_tier):
+    with pytest.raises(AssertionError, match="LLM called"):
+        theme_detector.detect_theme(SPORT[0])
+
+    for text in SPORT:
+        append_history(theme_detector.THEME_HISTORY_PATH, clean_text(text), "event")
+    for text in FOOD:
+        append_history(theme_detector.THEME_HISTORY_PATH, clean_text(text), "cultural")
+    assert theme_detector.train_theme_classifier().labels == ["cultural", "event"]
+
+    result = theme_detector.detect_theme(SPORT[1])
+    assert (result["theme"], result["source"]) == ("event", "local")
+    assert result["confidence"] >= theme_detector.LOCAL_CONFIDENCE_THRESHOLD
+    assert theme_detector.detect_theme(FOOD[2])["theme"] == "cultural"
+
+
+
+@pytest.fixture
+def tiers(tmp_path, monkeypatch):
+    """Stub local / LLM tiers that record what they were asked."""
+    calls = {"local": [], "llm": []}
+    monkeypatch.setattr(theme_detector, "_SEGMENT_THEME_CACHE", theme_detector.OrderedDict())
+    monkeypatch.setattr(theme_detector, "THEME_HISTORY_PATH", str(tmp_path / "theme_history.jsonl"))
+    monkeypatch.setattr(theme_detector, "SEGMENT_BATCH_SIZE", 2)
+
+    def local(texts):
+        calls["local"].append(list(texts))
+        return [("cultural", 0.95) if text in FOOD else (None, 0.0) for text in texts]
+
+    def llm(segments):
+        calls["llm"].append(list(segments))
+        return ["other"] * len(segments)
+
+    monkeypatch.setattr(theme_detector, "local_theme_predictions", local)
+    monkeypatch.setattr(theme_detector, "llm_batch_theme_detector", llm)
+    return calls
+
+
+def test_segment_themes_cache_rule_local_llm_order(tiers):
+    segments = ["اندلعت الحرب على الحدود", FOOD[0], SPORT[0], SPORT[1], SPORT[2]]
+    results = theme_detector.detect_segment_themes(segments)
+
+    assert [r["source"] for r in results] == ["rule_based", "local", "llm", "llm", "llm"]
+    assert [r["theme"] for r in results] == ["event", "cultural", "other", "other", "other"]
+    # the local tier only sees what the rules left, the LLM only what both left, in batches
+    assert tiers["local"] == [segments[1:]]
+    assert tiers["llm"] == [SPORT[:2], SPORT[2:]]
+
+    # second pass: every segment comes from the cache
+    assert theme_detector.detect_segment_themes(segments) == results
+    assert len(tiers["local"]) == 1 and len(tiers["llm"]) == 2
+
+
+def test_segment_theme_cache_is_bounded_lru(tiers, monkeypatch):
+    monkeypatch.setattr(theme_detector, "SEGMENT_CACHE_SIZE", 2)
+    theme_detector.detect_segment_themes([SPORT[0], SPORT[1]])
+    theme_detector.detect_segment_themes([SPORT[0]])          # refresh SPORT[0]
+    theme_detector.detect_segment_themes([SPORT[2]])          # evicts SPORT[1]
+    assert len(theme_detector._SEGMENT_THEME_CACHE) == 2
+
+    tiers["llm"].clear()
+    theme_detector.detect_segment_themes([SPORT[0], SPORT[1]])
+    assert tiers["llm"] == [[SPORT[1]]]
@@ -0,0 +1,73 @@
+"""
+Corpus IDF tests for pipeline/topic_candidates.py.
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+import pipeline.topic_candidates as tc
+from pipeline.topic_candidates import TopicCandidateEngine
+
+
+DOCS = [
+    "الأمن المائي قضية أساسية في الشرق الأوسط.",
+    "التغير المناخي يهدد الأمن المائي في المنطقة.",
+    "مهرجان جرش للثقافة والفنون في الأردن.",
+]
+
+
+@pytest.fixture(autouse=True)
+def fresh_engine(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(tc, "_ENGINE", None)
+
+
+def test_partial_fit_matches_fit():
+    full = TopicCandidateEngine().fit(DOCS)
+    incremental = TopicCandidateEngine().fit(DOCS[:1]).partial_fit(DOCS[1:])
+
+    assert incremental.terms == full.terms
+    assert np.allclose(incremental.idf, full.idf)
+
+
+def test_uploads_are_persisted_and_reloaded(monkeypatch):
+    for doc in DOCS:
+        tc.add_to_corpus([doc])
+    expected = tc.suggest_topics(DOCS[1], top_k=4)
+
+    # A new process reads the persisted document frequencies
+    monkeypatch.setattr(tc, "_ENGINE", None)
+    assert tc.get_engine().n_docs == 3
+    assert tc.suggest_topics(DOCS[1], top_k=4) == expected
+
+
+def test_suggest_topics_never_refits(monkeypatch):
+    tc.fit_corpus(DOCS)
+
+    def refit(*args, **kwargs):
+        raise AssertionError("suggest_topics refitted the engine")
+
+    monkeypatch.setattr(TopicCandidateEngine, "fit", refit)
+    monkeypatch.setattr(TopicCandidateEngine, "partial_fit", refit)
+    assert "الامن المائي" in tc.suggest_topics(DOCS[0] + " " + DOCS[1])
+
+    # No corpus yet: uniform IDF, still no fitting
+    os.remove(tc.CORPUS_MODEL)
+    monkeypatch.setattr(tc, "_ENGINE", None)
+    assert tc.suggest_topics(DOCS[2])
+
+def test_reuploaded_document_is_counted_once(monkeypatch):
+    tc.add_to_corpus(DOCS[:2], doc_ids=["h0", "h1"])
+    df = tc.get_engine().df.copy()
+    mtime = os.path.getmtime(tc.CORPUS_MODEL)
+
+    engine = tc.add_to_corpus([DOCS[0], DOCS[0]], doc_ids=["h0", "h0"])
+    assert engine is tc.get_engine()
+    assert engine.n_docs == 2 and np.array_equal(engine.df, df)
+    assert os.path.getmtime(tc.CORPUS_MODEL) == mtime
+
+    # IDs survive a reload
+    monkeypatch.setattr(tc, "_ENGINE", None)
+    assert tc.add_to_corpus([DOCS[1], DOCS[2]], doc_ids=["h1", "h2"]).n_docs == 3
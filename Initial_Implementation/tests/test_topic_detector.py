@@ -0,0 +1,45 @@
+"""
+Map-reduce tests for pipeline/topic_detector.py, with a stub LLM call.
+"""
+
+import json
+import re
+import threading
+
+import pipeline.topic_detector as topic_detector
+
+
+CHUNKS = [
+    "الأمن المائي قضية أساسية في الشرق الأوسط.",
+    "مهرجان جرش للثقافة والفنون في الأردن.",
+    "التغير المناخي يهدد الزراعة في المنطقة.",
+]
+
+
+def test_map_calls_run_concurrently_with_per_chunk_hints(monkeypatch):
+    monkeypatch.setattr(topic_detector, "MAX_SINGLE_PROMPT_CHARS", 50)
+    monkeypatch.setattr(topic_detector, "MAP_CHUNK_CHARS", 50)
+    monkeypatch.setattr(topic_detector, "MAP_WORKERS", len(CHUNKS))
+
+    # every map call waits until all of them are in flight
+    barrier = threading.Barrier(len(CHUNKS), timeout=5)
+    prompts = []
+
+    def request(prompt):
+        prompts.append(prompt)
+        if "المواضيع المرشحة" in prompt:  # reduce
+            return {"topics": ["نهائي"], "keywords": []}
+        barrier.wait()
+        return {"topics": ["موضوع"], "keywords": ["كلمة"]}
+
+    monkeypatch.setattr(topic_detector, "_request_topics_and_keywords", request)
+    result = topic_detector.extract_topics_and_keyphrases(" ".join(CHUNKS))
+
+    assert result == {"topics": ["نهائي"], "keywords": ["كلمه"]}
+    map_prompts = [p for p in prompts if "المواضيع المرشحة" not in p]
+    assert len(map_prompts) == len(CHUNKS)
+    for prompt in map_prompts:
+        hints = json.loads(re.search(r"تجاهلها\):\n(.*)\n", prompt).group(1))
+        content = prompt.rsplit("النص:", 1)[1]
+        # hints come from the chunk in the same prompt only
+        assert hints and all(word in content for hint in hints for word in hint.split())
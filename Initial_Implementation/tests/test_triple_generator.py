@@ -0,0 +1,19 @@
+"""
+pipeline/triple_generator.py must import without an OpenAI key (the
+theme detector and the client are only needed for LLM calls).
+"""
+
+import os
+import subprocess
+import sys
+
+
+def test_imports_without_openai_key():
+    env = {k: v for k, v in os.environ.items() if k != "OPENAI_API_KEY"}
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-c", "import pipeline.triple_generator, sys; "
+                               "sys.exit('pipeline.theme_detector' in sys.modules)"],
+        cwd=root, env=env, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
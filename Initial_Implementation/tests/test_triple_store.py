@@ -0,0 +1,55 @@
+"""
+The columnar TripleStore paths must agree with the dict paths of
+validate_triples and build_graph_from_triples.
+"""
+
+import copy
+
+import networkx as nx
+
+from kg.graph_builder import build_graph_from_triples
+from kg.triple_store import TripleStore
+from pipeline.triple_validator import validate_triples
+
+
+# Already in clean_text() form, so spans match the cleaned text
+TEXT = "وقعت معركه الكرامه في الكرامه عام 1968، وشارك فيها الملك الحسين."
+
+TRIPLES = [
+    {"subject": "معركه الكرامه", "predicate": "occurredIn", "object": "الكرامه", "span": "وقعت معركه الكرامه في الكرامه"},
+    {"subject": "معركه الكرامه", "predicate": "occurredIn", "object": "الكرامه", "span": "وقعت معركه الكرامه في الكرامه"},
+    {"subject": "معركه  الكرامه!", "predicate": "hasParticipant", "object": "الملك الحسين", "span": "وشارك فيها الملك الحسين"},
+    {"subject": "معركه الكرامه", "predicate": "locatedIn", "object": "الكرامه", "span": "وقعت معركه الكرامه في الكرامه"},
+    {"subject": "معركه الكرامه", "predicate": "occurredOn", "object": "1967", "span": "عام 1968"},
+    {"subject": "معركه الكرامه", "predicate": "occurredOn", "object": "1968", "span": ""},
+]
+
+
+def _key(t):
+    return (t["subject"], t["predicate"], t["object"], t["span"])
+
+
+def test_validate_store_matches_dict_path():
+    expected = validate_triples(copy.deepcopy(TRIPLES), TEXT, auto_repair=False)
+    result = validate_triples(TripleStore.from_dicts(TRIPLES), TEXT, auto_repair=False)
+
+    for part in ("valid", "invalid"):
+        assert [_key(t) for t in result[part]] == [_key(t) for t in expected[part]]
+    assert [t["subject"] for t in result["valid"]] == ["معركه الكرامه", "معركه الكرامه"]
+
+
+def test_build_graph_from_store_matches_dict_path():
+    rows = TRIPLES + [{**TRIPLES[0], "span": "another mention", "theme": "cultural"}]
+    expected = build_graph_from_triples(rows, "event", "dbo:Event", source_file="a.pdf")
+    G = build_graph_from_triples(
+        TripleStore.from_dicts(rows), "event", "dbo:Event", source_file="a.pdf"
+    )
+
+    assert list(G.nodes(data=True)) == list(expected.nodes(data=True))
+    assert list(G.edges(keys=True, data=True)) == list(expected.edges(keys=True, data=True))
+    assert len(G.edges["معركه الكرامه", "الكرامه", "occurredIn"]["provenance"]) == 2
+
+
+def test_build_graph_from_empty_store():
+    G = build_graph_from_triples(TripleStore(), "event", "dbo:Event")
+    assert isinstance(G, nx.MultiDiGraph) and not G.number_of_nodes()